@@ -1,15 +1,13 @@
-import streamlit as st
-
-st.title("✅ App is working")
-st.write("Streamlit loaded successfully.")
-
 """
 Main FinApp CLI application
 Kenyan Investment Recommendation System
 """
 
+import math
+import os
 import sys
-import json
+import threading
+import time
 from datetime import datetime
 from typing import Dict
 from src.modules import (
@@ -17,6 +15,8 @@ from src.modules import (
     RiskAnalyzer,
     RecommendationEngine,
 )
+from src.modules.instrumentation import METRICS_ENABLED, profiling, write_openmetrics
+from src.modules.settings import get_settings
 
 class FinAppCLI:
     """Command-line interface for FinApp investment advisor"""
@@ -26,6 +26,39 @@ class FinAppCLI:
         self.market_data = None
         self.risk_analyzer = None
         self.recommendation_engine = None
+        self._prefetch_thread = None
+        self._prefetch = {}
+    
+    def start_prefetch(self):
+        """Start fetching the market data snapshot in the background, while the prompts are shown"""
+        prefetch = self._prefetch = {'started': time.perf_counter()}
+        
+        def fetch():
+            try:
+                prefetch['data'] = self.data_collector.get_all_market_data()
+            except Exception as e:  # re-raised when the snapshot is joined
+                prefetch['error'] = e
+            prefetch['finished'] = time.perf_counter()
+        
+        self._prefetch_thread = threading.Thread(target=fetch, name='market-data-prefetch', daemon=True)
+        self._prefetch_thread.start()
+    
+    def _join_prefetch(self) -> Dict:
+        """Wait for the prefetched snapshot (or fetch it now if none was started)"""
+        if self._prefetch_thread is None:
+            return self.data_collector.get_all_market_data()
+        
+        waiting_since = time.perf_counter()
+        self._prefetch_thread.join()
+        waited = time.perf_counter() - waiting_since
+        self._prefetch_thread, prefetch = None, self._prefetch
+        if 'error' in prefetch:
+            raise prefetch['error']
+        
+        fetch_time = prefetch['finished'] - prefetch['started']
+        print(f"⏱  Fetched in {fetch_time:.2f}s while you were typing; "
+              f"waited {waited:.2f}s, {max(fetch_time - waited, 0.0):.2f}s hidden")
+        return prefetch['data']
     
     def print_header(self):
         """Print application header"""
@@ -55,25 +88,31 @@ class FinAppCLI:
         print("\n" + "-"*80)
         print("STEP 1: PROVIDE YOUR INVESTMENT DETAILS")
         print("-"*80 + "\n")
+        settings = get_settings()
         
         # Amount
         while True:
             try:
                 amount_str = input("Investment Amount (KES): ").strip()
                 amount = int(amount_str)
-                if amount < 100:
-                    print("❌ Minimum investment is KES 100. Please try again.")
+                if amount < settings.min_investment:
+                    print(f"❌ Minimum investment is KES {settings.min_investment:,}. Please try again.")
                     continue
                 break
             except ValueError:
                 print("❌ Please enter a valid number.")
         
         # Duration
+        min_months = settings.min_investment_duration_months
+        max_months = settings.max_investment_duration_months
         while True:
             try:
-                duration = int(input("Investment Duration (months, minimum 6): ").strip())
-                if duration < 6:
-                    print("❌ Minimum duration is 6 months.")
+                duration = int(input(f"Investment Duration (months, minimum {min_months}): ").strip())
+                if duration < min_months:
+                    print(f"❌ Minimum duration is {min_months} months.")
+                    continue
+                if duration > max_months:
+                    print(f"❌ Maximum duration is {max_months} months.")
                     continue
                 break
             except ValueError:
@@ -99,11 +138,29 @@ class FinAppCLI:
             else:
                 print("❌ Please select 1, 2, or 3.")
         
-        return {
+        # Optional goal
+        while True:
+            try:
+                target_str = input("\nTarget value in KES (optional, press Enter to skip): ").strip()
+            except EOFError:  # scripted runs that stop after the required answers
+                target_str = ''
+            if not target_str:
+                target = None
+                break
+            try:
+                target = int(target_str)
+                break
+            except ValueError:
+                print("❌ Please enter a valid number.")
+        
+        user_input = {
             'amount': amount,
             'duration_months': duration,
             'risk_appetite': risk,
         }
+        if target:
+            user_input['target_value'] = target
+        return user_input
     
     def initialize_analysis(self):
         """Fetch market data and initialize analyzers"""
@@ -112,7 +169,7 @@ class FinAppCLI:
         print("-"*80)
         
         print("\n📊 Fetching latest Kenyan market data...")
-        self.market_data = self.data_collector.get_all_market_data()
+        self.market_data = self._join_prefetch()
         
         print("✓ Treasury yields updated")
         print("✓ Money market rates updated")
@@ -207,6 +264,9 @@ class FinAppCLI:
         print(f"{'Initial Investment:':<25} KES {user_input['amount']:,.0f}")
         print(f"{'Expected Earnings:':<25} KES {primary['earnings']:,.0f}")
         print(f"{'Final Value:':<25} KES {primary['final_value']:,.0f}")
+        print(f"{'After Costs:':<25} KES {primary['net_final_value']:,.0f} "
+              f"({primary['net_return']:.2f}% p.a. net, KES {primary['costs']:,.0f} in fees and penalties)")
+        print(f"{'Break-even:':<25} {self._format_break_even(primary['break_even_months'])}")
         print(f"{'Investment Period:':<25} {user_input['duration_months']} months")
         
         print(f"\n✨ PROS:")
@@ -230,14 +290,72 @@ class FinAppCLI:
         print(f"\n   🔴 WORST CASE: {scenarios['worst_case']['description']}")
         print(f"      Return: {scenarios['worst_case']['return_percent']}% | Final Value: KES {scenarios['worst_case']['final_value']:,.0f}")
         
+        # Bills and deposits outlived by the horizon are rolled over at rates not yet known
+        from src.modules.contributions import CATEGORY_INSTRUMENTS
+        from src.modules.ladder_simulator import RUNGS
+        instrument = CATEGORY_INSTRUMENTS.get(primary['category'])
+        if instrument in RUNGS and user_input['duration_months'] > min(RUNGS[instrument]):
+            print(f"\n🔁 ROLLOVER (laddered across {', '.join(f'{m}m' for m in RUNGS[instrument])} "
+                  f"rungs, rates reset at each maturity):")
+            rollover = self.recommendation_engine.simulate_rollover(user_input, instrument)
+            for name, label in (('best_case', 'BEST (95th pct)'), ('base_case', 'BASE (median)'),
+                                ('worst_case', 'WORST (5th pct)')):
+                print(f"   • {label}: Return {rollover[name]['return_percent']:.2f}% | "
+                      f"Final Value: KES {rollover[name]['final_value']:,.0f}")
+        
+        # The market inputs the projection leans on most
+        print(f"\n📐 SENSITIVITY (each input moved on its own, first-order effect):")
+        table = self.recommendation_engine.recommendation_sensitivities(user_input, recommendation)
+        for row in [row for row in table.rows(0) if row['real_return_change']][:3]:
+            print(f"   • {row['input']} {row['value']:g} → {row['value'] + row['move']:g}: "
+                  f"Final Value KES {row['final_value_change']:+,.0f}, real return {row['real_return_change']:+.2f} pts")
+        
         # Display alternatives
         print(f"\n🔄 ALTERNATIVE OPTIONS:")
         for i, alt in enumerate(recommendation['alternatives'], 1):
             print(f"\n   {i}. {alt['instrument']}")
             print(f"      Category: {alt['category']}")
             print(f"      Return: {alt['expected_return']}% | Final Value: KES {alt['final_value']:,.0f}")
+            print(f"      After Costs: KES {alt['net_final_value']:,.0f} ({alt['net_return']:.2f}% p.a.) | "
+                  f"Break-even: {self._format_break_even(alt['break_even_months'])}")
             print(f"      Risk: {alt['risk_rating']} | Liquidity: {alt['liquidity']}")
     
+    @staticmethod
+    def _format_break_even(months: float) -> str:
+        """Holding period before selling out returns the amount invested"""
+        if math.isnan(months):
+            return "not reached at the expected return"
+        if months == 0:
+            return "immediate (no entry or exit costs)"
+        return f"{months:.0f} months to earn back trading costs"
+    
+    def display_goal_plan(self, user_input: Dict):
+        """Display what it takes to reach the user's target value"""
+        target = user_input['target_value']
+        amount = user_input['amount']
+        months = user_input['duration_months']
+        risk = user_input['risk_appetite']
+        print(f"\n🎯 GOAL: KES {target:,.0f}")
+        
+        # Expected outcome and a bad (5th percentile) outcome, each solved in one batched call
+        amounts = self.recommendation_engine.required_amounts(target, months, risk)
+        prudent_amounts = self.recommendation_engine.required_amounts(target, months, risk, percentile=5)
+        durations = self.recommendation_engine.required_durations(target, amount, risk)
+        prudent_durations = self.recommendation_engine.required_durations(target, amount, risk, percentile=5)
+        
+        print(f"   • Invest KES {amounts:,.0f} for {months} months "
+              f"(KES {prudent_amounts:,.0f} to reach it in 19 out of 20 outcomes)")
+        if durations == 0:
+            print(f"   • KES {amount:,.0f} already meets the target")
+        elif math.isnan(durations):
+            print(f"   • KES {amount:,.0f} does not reach the target within "
+                  f"{self.recommendation_engine.goal_solver.max_months} months")
+        else:
+            prudent = ("out of reach" if math.isnan(prudent_durations)
+                       else f"{prudent_durations:.0f} months")
+            print(f"   • Or keep KES {amount:,.0f} invested for {durations:.0f} months "
+                  f"({prudent} to reach it in 19 out of 20 outcomes)")
+    
     def display_action_steps(self, user_input: Dict):
         """Display specific action steps to invest"""
         print("\n" + "="*80)
@@ -257,10 +375,11 @@ class FinAppCLI:
             print("   5. Await confirmation of allocation")
             print("   6. Funds will be deposited to your account on settlement date")
         elif 'Money Market' in instrument:
-            print("   1. Choose a money market fund provider:")
-            print("      • Barclays Money Market Fund")
-            print("      • Equity Money Market Fund")
-            print("      • Stanchart Money Market Fund")
+            print("   1. Choose a money market fund provider (best net-of-fee yield first):")
+            for fund in self.recommendation_engine.rank_money_market_funds(
+                    user_input['amount'], user_input['duration_months']):
+                print(f"      • {fund.display_name}: {fund.net_yield:.2f}% net "
+                      f"(min KES {fund.min_investment:,.0f}) → KES {fund.projected_value:,.0f}")
             print("   2. Visit their website or mobile app")
             print("   3. Complete KYC registration (ID, proof of address)")
             print("   4. Link your bank account")
@@ -292,17 +411,28 @@ class FinAppCLI:
         
         print(f"\n⏰ TIMELINE:")
         print(f"   • Minimum holding period: {user_input['duration_months']} months")
-        print(f"   • Expected maturity/review date: {self._calculate_maturity_date(user_input['duration_months'])}")
+        print(f"   • Expected maturity/review date: "
+              f"{self._calculate_maturity_date(user_input['duration_months'], instrument)}")
         print(f"   • Set reminder to reassess or reinvest")
     
-    def _calculate_maturity_date(self, months: int) -> str:
-        """Calculate approximate maturity date"""
-        from datetime import datetime, timedelta
-        future_date = datetime.now() + timedelta(days=months*30)
-        return future_date.strftime("%B %d, %Y")
+    def _calculate_maturity_date(self, months: int, instrument: str = '') -> str:
+        """Maturity on the Kenyan business-day calendar; bills run from the next auction's settlement"""
+        from src.modules.market_calendar import default_calendar  # deferred: keeps numpy out of CLI startup
+        
+        calendar = default_calendar()
+        today = datetime.now().date()
+        if instrument.endswith('Treasury Bill'):
+            tenor_days = int(instrument.split('-')[0])
+            maturity = calendar.treasury_bill_dates(today, tenor_days)[2]
+        else:
+            maturity = calendar.maturity_dates(today, months=months)
+        return maturity.item().strftime("%B %d, %Y")
     
     def run(self):
         """Run the complete investment advisor workflow"""
+        # Market data loads while the user answers the prompts
+        self.start_prefetch()
+        
         self.print_header()
         self.print_disclaimer()
         
@@ -320,6 +450,8 @@ class FinAppCLI:
         
         # Step 4: Recommendation
         self.display_recommendation(user_input)
+        if user_input.get('target_value'):
+            self.display_goal_plan(user_input)
         
         # Step 5: Action steps
         self.display_action_steps(user_input)
@@ -346,20 +478,22 @@ class FinAppCLI:
             }
         }
         
-        filename = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        filepath = f"data/{filename}"
+        from src.modules.report_journal import DEFAULT_JOURNAL_PATH, ReportJournal
         
         try:
-            with open(filepath, 'w') as f:
-                json.dump(report, f, indent=2, default=str)
-            print(f"\n📄 Report saved to: {filepath}")
+            with ReportJournal(DEFAULT_JOURNAL_PATH) as journal:
+                journal.append(report)
+            print(f"\n📄 Report saved to: {DEFAULT_JOURNAL_PATH}")
         except Exception as e:
             print(f"⚠️  Could not save report: {e}")
 
 if __name__ == "__main__":
     app = FinAppCLI()
     try:
-        app.run()
+        with profiling():
+            app.run()
+        if METRICS_ENABLED:
+            write_openmetrics(os.environ.get('FINAPP_METRICS_OUTPUT', 'data/metrics.prom'))
     except KeyboardInterrupt:
         print("\n\n⚠️  Application interrupted by user.")
         sys.exit(0)
@@ -0,0 +1,94 @@
+"""
+Demonstrates circuit breakers against a flapping upstream
+
+A local stub serves market data while /treasury alternates between healthy
+and hanging-then-failing windows. The same polling loop is run with the
+legacy behaviour (no breaker, empty data on failure) and with per-source
+breakers plus last-good fallback, and availability and latency are compared.
+
+Usage:
+    python benchmarks/flapping_upstream.py [--seconds 6]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from src.modules import KenyanMarketDataCollector
+from src.modules.data_collector import SOURCES as SECTIONS
+from stub_server import FaultInjectingHandler, start_stub_server
+
+
+class LegacyCollector(KenyanMarketDataCollector):
+    """Pre-breaker behaviour: every call hits the upstream, failures yield {}"""
+
+    def __init__(self, base_url, timeout):
+        super().__init__(base_url=base_url, timeout=timeout, failure_threshold=10 ** 9)
+
+    def _fallback(self, source, error):
+        super()._fallback(source, error)
+        return {}
+
+
+def poll(collector, seconds: float, interval: float) -> dict:
+    latencies, complete = [], 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        data = collector.get_all_market_data()
+        latencies.append(time.perf_counter() - started)
+        complete += all(data[section] for section in SECTIONS)
+        time.sleep(interval)
+    latencies.sort()
+    return {
+        'rounds': len(latencies),
+        'availability': complete / len(latencies),
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Circuit breaker demo against a flapping stub")
+    parser.add_argument('--seconds', type=float, default=6.0)
+    parser.add_argument('--interval', type=float, default=0.02)
+    parser.add_argument('--timeout', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    FaultInjectingHandler.period = 1.0
+    FaultInjectingHandler.hang = 0.5
+    server, url = start_stub_server(FaultInjectingHandler)
+    try:
+        # Warm both collectors while the upstream is healthy so the
+        # breaker variant has a last good snapshot to fall back on
+        FaultInjectingHandler.started = time.monotonic()
+        legacy = LegacyCollector(url, args.timeout)
+        guarded = KenyanMarketDataCollector(base_url=url, timeout=args.timeout,
+                                            failure_threshold=1, reset_timeout=0.5)
+        guarded.get_all_market_data()
+
+        results = {
+            'legacy (no breaker)': poll(legacy, args.seconds, args.interval),
+            'circuit breaker + last good': poll(guarded, args.seconds, args.interval),
+        }
+    finally:
+        server.shutdown()
+
+    print(f"Flapping /treasury: {FaultInjectingHandler.period}s up / {FaultInjectingHandler.period}s down, "
+          f"{FaultInjectingHandler.hang}s hang when down, client timeout {args.timeout}s\n")
+    print(f"{'mode':<30} {'rounds':>7} {'available':>10} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<30} {r['rounds']:>7} {r['availability']:>10.1%} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['max_ms']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Incremental re-scoring of a large book after a single-tenor auction update
+
+Usage:
+    python benchmarks/incremental_rescoring.py [--users 1000000] [--tenor 364_day_tb]
+
+Builds the dependency index for a synthetic book, bumps one treasury tenor
+and reports how many users the change set touches and how long re-scoring
+only those users takes, against an estimate for re-scoring everyone.
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from src.modules import KenyanMarketDataCollector
+from src.modules.incremental import IncrementalScorer, snapshot_diff
+from src.modules.stress_testing import UserBook
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental re-scoring demo")
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--tenor', default='364_day_tb')
+    parser.add_argument('--bump', type=float, default=0.25, help="Yield change in percentage points")
+    args = parser.parse_args(argv)
+
+    market_data = KenyanMarketDataCollector().get_all_market_data()
+    book = UserBook.synthetic(args.users)
+
+    started = time.perf_counter()
+    scorer = IncrementalScorer(market_data, book)
+    print(f"Dependency index for {args.users:,} users in {len(scorer.signatures):,} groups: "
+          f"{time.perf_counter() - started:.2f}s")
+
+    sample = min(args.users, 20_000)
+    started = time.perf_counter()
+    scorer.score(range(sample))
+    per_user = (time.perf_counter() - started) / sample
+
+    updated = copy.deepcopy(market_data)
+    updated['treasury'][args.tenor]['yield'] += args.bump
+    changes = snapshot_diff(market_data, updated)
+
+    started = time.perf_counter()
+    rescored = scorer.apply(updated, changes)
+    elapsed = time.perf_counter() - started
+    print(f"Change set: {sorted(changes)}")
+    print(f"Re-scored {len(rescored):,} of {args.users:,} users ({len(rescored) / args.users:.1%}) "
+          f"in {elapsed:.2f}s; a full re-score would take ~{per_user * args.users:.0f}s")
+    if len(rescored):
+        months = book.months[rescored]
+        print(f"Affected durations: {months.min():.0f}-{months.max():.0f} months")
+
+
+if __name__ == '__main__':
+    main()
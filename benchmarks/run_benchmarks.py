@@ -0,0 +1,421 @@
+"""
+Performance benchmarks for FinApp hot paths
+
+Usage:
+    python benchmarks/run_benchmarks.py                    # run and compare to baseline
+    python benchmarks/run_benchmarks.py --update-baseline  # record a new baseline
+    python benchmarks/run_benchmarks.py -k recommendation  # run a subset
+
+Results are written to benchmarks/results/latest.json. The run fails (exit
+code 1) when a benchmark's batch throughput (best of three batches) or peak
+allocation is worse than the committed baseline by more than --threshold.
+Each benchmark is measured in --runs fresh processes, so one benchmark's heap
+and caches never slow the next. Each run also times a fixed reference
+workload around the benchmark; the run with the median throughput relative
+to it is reported, and the baseline throughput is scaled by how much faster
+or slower the host runs the reference now, so neither a single noisy run nor
+a busy shared machine reads as a regression. Single-call latency is recorded
+for reference; per-call timings are too noisy on shared machines to gate on.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from src.modules import (
+    KenyanMarketDataCollector,
+    RiskAnalyzer,
+    RecommendationEngine,
+)
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results', 'latest.json')
+
+# name -> (factory returning a zero-argument callable, batch size, allowed slowdown)
+BENCHMARKS: Dict[str, tuple] = {}
+
+
+def benchmark(name: str, batch: int = 1000, threshold: float = 0.0):
+    """Register a benchmark factory; `threshold` loosens the regression gate for noisy cases"""
+    def register(factory: Callable[[Dict], Callable]):
+        BENCHMARKS[name] = (factory, batch, threshold)
+        return factory
+    return register
+
+
+USER_INPUTS = {
+    'low': {'amount': 50000, 'duration_months': 6, 'risk_appetite': 'Low'},
+    'medium': {'amount': 100000, 'duration_months': 12, 'risk_appetite': 'Medium'},
+    'high': {'amount': 25000, 'duration_months': 36, 'risk_appetite': 'High'},
+}
+
+for _profile, _user_input in USER_INPUTS.items():
+    @benchmark(f"generate_recommendation[{_profile}]")
+    def _recommendation(ctx, user_input=_user_input):
+        engine = ctx['engine']
+        return lambda: engine.generate_recommendation(user_input)
+
+for _method in ('analyze_treasury_risk', 'analyze_money_market_risk', 'analyze_fixed_deposit_risk',
+                'analyze_equity_risk', 'analyze_reit_risk'):
+    @benchmark(_method)
+    def _risk(ctx, method=_method):
+        analyze = getattr(ctx['analyzer'], method)
+        return lambda: analyze(50000, 12)
+
+
+@benchmark("get_risk_profile")
+def _risk_profile(ctx):
+    analyzer = ctx['analyzer']
+    return lambda: analyzer.get_risk_profile("Money Market Fund", 50000, 12)
+
+
+@benchmark("calculate_final_value", batch=100000)
+def _final_value(ctx):
+    engine = ctx['engine']
+    return lambda: engine.calculate_final_value(50000, 16.5, 24)
+
+
+@benchmark("treasury_yields[360 horizons]")
+def _yield_curve(ctx):
+    import numpy as np
+    engine = ctx['engine']
+    horizons = np.arange(1, 361)
+    return lambda: engine.treasury_yields(horizons)
+
+
+@benchmark("ladder_simulation[10k paths x 30y]", batch=3)
+def _ladder(ctx):
+    from src.modules import RolloverSimulator
+    simulator = RolloverSimulator(ctx['market_data'], seed=0)
+    return lambda: simulator.simulate(100000, 360, 'treasury', paths=10_000)
+
+
+@benchmark("required_amounts[10k goals]", batch=5)
+def _goal_solver(ctx):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    targets = rng.uniform(1e4, 1e7, 10_000)
+    months = rng.integers(6, 121, 10_000)
+    risk = rng.integers(0, 3, 10_000)
+    solver = ctx['engine'].goal_solver
+    return lambda: solver.required_amounts(targets, months, risk)
+
+
+@benchmark("savings_plan_values[100k users]", batch=5)
+def _savings_plans(ctx):
+    import numpy as np
+    from src.modules import savings_plan_values
+    rng = np.random.default_rng(0)
+    initial = rng.uniform(1e3, 1e6, 100_000)
+    monthly = rng.uniform(0, 1e4, 100_000)
+    rates = rng.uniform(5, 20, 100_000)
+    months = rng.integers(6, 361, 100_000)
+    periods = rng.choice([1, 3, 6], 100_000)
+    return lambda: savings_plan_values(initial, monthly, rates, months, periods)
+
+
+@benchmark("maturity_dates[100k deposits]", batch=5)
+def _maturity_dates(ctx):
+    import numpy as np
+    from src.modules import default_calendar
+    rng = np.random.default_rng(0)
+    starts = np.datetime64('2026-01-01') + rng.integers(0, 3650, 100_000).astype('timedelta64[D]')
+    months = rng.integers(6, 361, 100_000)
+    calendar = default_calendar()
+    return lambda: calendar.maturity_dates(starts, months=months)
+
+
+@benchmark("net_projections[100k users x 5 instruments]", batch=5)
+def _net_projections(ctx):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    amounts = rng.uniform(1e3, 1e6, 100_000)
+    months = rng.integers(6, 361, 100_000)
+    engine = ctx['engine']
+    return lambda: engine.net_projections(amounts, months)
+
+
+@benchmark("rank_instruments[100k users x 5 instruments]", batch=5)
+def _rank_instruments(ctx):
+    from src.modules.stress_testing import UserBook
+    book = UserBook.synthetic(100_000)
+    engine = ctx['engine']
+    return lambda: engine.rank_instruments(book.amounts, book.months, book.risk)
+
+
+@benchmark("sensitivities[100k users]", batch=1)
+def _sensitivities(ctx):
+    from src.modules.stress_testing import UserBook
+    book = UserBook.synthetic(100_000)
+    engine = ctx['engine']
+    return lambda: engine.sensitivities(book.amounts, book.months, book.risk)
+
+
+@benchmark("bond_reprice[60 bonds x 100 scenarios]", batch=20)
+def _bond_reprice(ctx):
+    import numpy as np
+    from src.modules import BondSet
+    rng = np.random.default_rng(0)
+    bonds = BondSet(rng.uniform(8, 18, 60), rng.uniform(0.25, 25, 60))
+    yields = rng.uniform(12, 18, 60)
+    shifts = np.linspace(-500, 500, 100)
+    return lambda: bonds.reprice(yields, shifts)
+
+
+@benchmark("equity_basket[66 counters]", batch=200)
+def _equity_basket(ctx):
+    import numpy as np
+    from src.modules import EquityBasketBuilder
+    rng = np.random.default_rng(0)
+    nse = {'nse_20_index': {'volatility': 18.0}, 'top_stocks': {
+        f"COUNTER{i}": {'price': float(rng.uniform(1, 400)), 'change_6m': float(rng.normal(10, 8)),
+                        'dividend_yield': float(rng.uniform(0, 8)), 'beta': float(rng.uniform(0.5, 1.5)),
+                        'volatility': float(rng.uniform(20, 50))}
+        for i in range(66)
+    }}
+    # A fresh builder per call, so covariance setup is included
+    return lambda: EquityBasketBuilder(nse).build(250000, max_holdings=10)
+
+
+@benchmark("shared_snapshot_current[unchanged]", batch=100000)
+def _shared_snapshot(ctx):
+    from src.modules import SnapshotPublisher, SnapshotReader
+    publisher = SnapshotPublisher(f"finapp-bench-{os.getpid()}")
+    ctx.setdefault('cleanup', []).append(publisher.close)
+    publisher.publish(ctx['market_data'])
+    reader = SnapshotReader(publisher.name)
+    ctx['cleanup'].append(reader.close)
+    return reader.current
+
+
+@benchmark("apply_delta[one tenor]", batch=10000)
+def _apply_delta(ctx):
+    from src.modules.snapshot_distribution import apply_delta, snapshot_delta
+    old = ctx['market_data']
+    new = {**old, 'treasury': {**old['treasury'], '91_day_tb': {**old['treasury']['91_day_tb'], 'yield': 1.0}}}
+    delta = snapshot_delta(old, new)
+    return lambda: apply_delta(old, delta)
+
+
+@benchmark("columnar_export[10k recommendations]", batch=3)
+def _columnar_export(ctx):
+    import tempfile
+    from src.modules.columnar_export import export_recommendations
+    from src.modules.stress_testing import RISK_LEVELS, UserBook
+    book = UserBook.synthetic(10_000)
+    user_inputs = [{'amount': float(amount), 'duration_months': int(months), 'risk_appetite': RISK_LEVELS[risk]}
+                   for amount, months, risk in zip(book.amounts, book.months, book.risk)]
+    recommendations = [ctx['engine'].generate_recommendation(user_input) for user_input in user_inputs]
+    directory = tempfile.TemporaryDirectory()
+    ctx.setdefault('cleanup', []).append(directory.cleanup)
+    path = os.path.join(directory.name, 'recommendations.fcol')
+    return lambda: export_recommendations(path, recommendations, user_inputs)
+
+
+@benchmark("get_all_market_data[simulated]")
+def _market_data(ctx):
+    collector = KenyanMarketDataCollector()
+    return collector.get_all_market_data
+
+
+@benchmark("get_all_market_data[local_stub]", batch=100, threshold=1.0)
+def _market_data_stub(ctx):
+    from stub_server import start_stub_server
+    server, url = start_stub_server()
+    ctx.setdefault('cleanup', []).append(server.shutdown)
+    collector = KenyanMarketDataCollector(base_url=url)
+    return collector.get_all_market_data
+
+
+def measure(fn: Callable, batch: int, repeats: int) -> Dict:
+    """Single-call latency, batch throughput and peak allocation for fn"""
+    for _ in range(min(batch, 50)):
+        fn()
+
+    gc.collect()
+    gc.disable()
+    try:
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+
+        # Best of three batches keeps scheduler noise out of the throughput figure
+        batch_seconds = float('inf')
+        for _ in range(3):
+            started = time.perf_counter()
+            for _ in range(batch):
+                fn()
+            batch_seconds = min(batch_seconds, time.perf_counter() - started)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'median_us': statistics.median(samples) * 1e6,
+        'p95_us': samples[int(len(samples) * 0.95) - 1] * 1e6,
+        'batch_size': batch,
+        'throughput_per_s': batch / batch_seconds,
+        'peak_alloc_kib': peak / 1024,
+    }
+
+
+def reference_workload():
+    """Fixed mix of interpreter and numpy work, to tell how fast the host is running"""
+    total = 0
+    for i in range(2_000):
+        total += i * i
+    return float(np.sort(np.arange(20_000.0)[::-1]).sum()) + total
+
+
+def reference_throughput(batch: int = 50) -> float:
+    """Calls of reference_workload per second, best of five batches"""
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(batch):
+            reference_workload()
+        best = min(best, time.perf_counter() - started)
+    return batch / best
+
+
+def measure_one(name: str, repeats: int) -> Dict:
+    """Measure one benchmark in this process"""
+    collector = KenyanMarketDataCollector()
+    market_data = collector.get_all_market_data()
+    ctx = {
+        'market_data': market_data,
+        'engine': RecommendationEngine(market_data, {}),
+        'analyzer': RiskAnalyzer(market_data),
+    }
+    factory, batch, _ = BENCHMARKS[name]
+    try:
+        fn = factory(ctx)
+        # Timed on both sides of the measurement, so a slow patch on either side does not skew it
+        before = reference_throughput()
+        result = measure(fn, batch, repeats)
+        return {**result, 'reference_per_s': max(before, reference_throughput())}
+    finally:
+        for cleanup in ctx.get('cleanup', []):
+            cleanup()
+
+
+def measure_isolated(name: str, repeats: int) -> Dict:
+    """Measure one benchmark in a fresh interpreter"""
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--measure', name, '--repeats', str(repeats)],
+        capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(f"{name} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def run(selected=None, repeats: int = 200, runs: int = 3) -> Dict:
+    results = {}
+    for name in BENCHMARKS:
+        if selected and not any(s in name for s in selected):
+            continue
+        # The median run by throughput relative to the reference workload
+        samples = sorted((measure_isolated(name, repeats) for _ in range(runs)),
+                         key=lambda sample: sample['throughput_per_s'] / sample['reference_per_s'])
+        results[name] = samples[len(samples) // 2]
+        r = results[name]
+        print(f"{name:<45} {r['median_us']:>10.2f} us  {r['throughput_per_s']:>12,.0f}/s  "
+              f"{r['peak_alloc_kib']:>8.1f} KiB")
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> list:
+    """Return a list of regression messages"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        allowed = max(threshold, BENCHMARKS[name][2])
+        # The baseline's throughput on the host as fast as it is running now
+        speed = current['reference_per_s'] / base['reference_per_s'] if 'reference_per_s' in base else 1.0
+        if current['throughput_per_s'] < base['throughput_per_s'] * speed / (1 + allowed):
+            regressions.append(f"{name}: throughput {current['throughput_per_s']:,.0f}/s vs baseline "
+                               f"{base['throughput_per_s']:,.0f}/s ({base['throughput_per_s'] * speed:,.0f}/s "
+                               f"at this host's current speed)")
+        # Allocation is deterministic, so the extra KiB only absorbs interpreter noise
+        if current['peak_alloc_kib'] > base['peak_alloc_kib'] * (1 + allowed) + 1:
+            regressions.append(f"{name}: peak allocation {current['peak_alloc_kib']:.1f} KiB vs baseline "
+                               f"{base['peak_alloc_kib']:.1f} KiB")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-k', dest='selected', action='append', help="Only run benchmarks matching this text")
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=3,
+                        help="Fresh processes per benchmark; the median run is reported")
+    parser.add_argument('--measure', metavar='NAME', help=argparse.SUPPRESS)  # one run, as JSON, for run()
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed slowdown relative to baseline (0.25 = 25%%)")
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure_one(args.measure, args.repeats)))
+        return 0
+
+    results = run(args.selected, args.repeats, args.runs)
+    document = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'w') as f:
+        json.dump(document, f, indent=2)
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("\nNo baseline found; run with --update-baseline to create one")
+        return 0
+
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for message in regressions:
+            print(f"   {message}")
+        return 1
+    print(f"\n✓ No regressions beyond {args.threshold:.0%} of baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Simulates a leader/follower cluster distributing market data snapshots
+
+One leader process fetches (simulated data, with a treasury yield nudged
+every round) and publishes deltas over the TCP channel; follower processes
+apply them. The leader drops a share of deltas per follower to force gap
+resyncs, and one follower joins late. At the end every follower's snapshot
+is compared with the leader's, and propagation latency (publish to apply,
+same host clock) is reported per follower.
+
+Usage:
+    python benchmarks/snapshot_cluster.py [--followers 4] [--seconds 5] [--loss 0.05]
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from src.modules import KenyanMarketDataCollector
+from src.modules.shared_snapshot import json_default
+from src.modules.snapshot_distribution import (
+    SnapshotFollower,
+    SnapshotLeader,
+    TcpFollowerChannel,
+    TcpLeaderChannel,
+    encode_frame,
+)
+
+TENORS = ('91_day_tb', '182_day_tb', '364_day_tb')
+
+
+def fingerprint(market_data) -> str:
+    return hashlib.sha256(json.dumps(market_data, sort_keys=True, default=json_default).encode()).hexdigest()[:16]
+
+
+class LossyLeaderChannel(TcpLeaderChannel):
+    """Drops each delta to each follower with probability `loss`"""
+
+    def __init__(self, loss: float, **kwargs):
+        super().__init__(**kwargs)
+        self.loss = loss
+        self.dropped = 0
+
+    def broadcast(self, message):
+        frame = encode_frame(message)
+        for client in self.clients():
+            if message['type'] == 'delta' and random.random() < self.loss:
+                self.dropped += 1
+                continue
+            self.send(client, frame)
+
+
+def run_leader(ready, done, results, seconds: float, interval: float, heartbeat: float, loss: float):
+    collector = KenyanMarketDataCollector()
+    rounds = iter(range(10 ** 9))
+
+    def fetch():
+        data = collector.get_all_market_data()
+        i = next(rounds)
+        tenor = TENORS[i % len(TENORS)]
+        data['treasury'] = dict(data['treasury'])
+        data['treasury'][tenor] = {**data['treasury'][tenor], 'yield': round(15 + (i % 40) * 0.05, 2)}
+        return data
+
+    channel = LossyLeaderChannel(loss, port=0)
+    leader = SnapshotLeader(channel, fetch, interval=interval, heartbeat=heartbeat)
+    ready.put(channel.address)
+    leader.start()
+    time.sleep(seconds)
+    leader.stop(close_channel=False)  # keep answering resyncs, and heartbeat below
+    deadline = time.monotonic() + 3 * heartbeat
+    while time.monotonic() < deadline:
+        leader.send_heartbeat()
+        time.sleep(heartbeat / 2)
+    results.put({'role': 'leader', 'version': leader.version, 'fetches': leader.fetches,
+                 'dropped': channel.dropped, 'fingerprint': fingerprint(leader.snapshot)})
+    done.wait()
+    channel.close()
+
+
+def run_follower(name: str, address, delay: float, stop, results, heartbeat: float):
+    time.sleep(delay)
+    latencies = []
+
+    def on_update(version, message):
+        latencies.append(time.time() - message['sent_at'])
+
+    follower = SnapshotFollower(TcpFollowerChannel(address), heartbeat=heartbeat, on_update=on_update).start()
+    stop.wait()
+    follower.stop()
+    latencies.sort()
+    results.put({
+        'role': name,
+        'version': follower.version,
+        'applied': follower.deltas_applied,
+        'resyncs': follower.resyncs,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else float('nan'),
+        'p99_ms': latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000 if latencies else float('nan'),
+        'max_ms': latencies[-1] * 1000 if latencies else float('nan'),
+        'fingerprint': fingerprint(follower.market_data) if follower.market_data else None,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Leader/follower snapshot distribution demo")
+    parser.add_argument('--followers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--interval', type=float, default=0.05, help="Seconds between leader fetches")
+    parser.add_argument('--heartbeat', type=float, default=0.25)
+    parser.add_argument('--loss', type=float, default=0.05, help="Share of deltas dropped per follower")
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context('spawn')
+    ready, results = context.Queue(), context.Queue()
+    leader_done, followers_stop = context.Event(), context.Event()
+    leader = context.Process(target=run_leader, args=(ready, leader_done, results, args.seconds,
+                                                      args.interval, args.heartbeat, args.loss))
+    leader.start()
+    address = ready.get(timeout=30)
+
+    # The last follower joins halfway through and starts from a full snapshot
+    followers = [
+        context.Process(target=run_follower, args=(
+            f"follower-{i}", address, args.seconds / 2 if i == args.followers - 1 else 0.0,
+            followers_stop, results, args.heartbeat))
+        for i in range(args.followers)
+    ]
+    for process in followers:
+        process.start()
+
+    leader_result = results.get(timeout=args.seconds + 60)
+    followers_stop.set()
+    rows = sorted((results.get(timeout=30) for _ in followers), key=lambda row: row['role'])
+    leader_done.set()
+    for process in followers + [leader]:
+        process.join()
+
+    print(f"Leader: {leader_result['fetches']} upstream fetches, {leader_result['version']} versions, "
+          f"{leader_result['dropped']} deltas dropped on purpose")
+    print(f"\n{'node':<12} {'version':>8} {'applied':>8} {'resyncs':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8}  consistent")
+    for row in rows:
+        print(f"{row['role']:<12} {row['version']:>8} {row['applied']:>8} {row['resyncs']:>8} "
+              f"{row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f}  "
+              f"{'yes' if row['fingerprint'] == leader_result['fingerprint'] else 'NO'}")
+    print(f"\nWithout distribution every node polls upstream: "
+          f"~{leader_result['fetches'] * (args.followers + 1):,} fetches instead of {leader_result['fetches']:,}")
+    return 0 if all(row['fingerprint'] == leader_result['fingerprint'] for row in rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Startup cost of the CLI and the Streamlit entry point, via python -X importtime
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--top 15]
+
+Each scenario runs in a fresh interpreter. Reported figures are the median
+wall time to reach the scenario's ready point and the cumulative import time
+of the slowest top-level imports from the last run.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    # Everything the CLI does before showing the first input() prompt
+    'cli_first_prompt': "import app; cli = app.FinAppCLI()",
+    # Module-level imports the Streamlit script needs for its first render
+    'streamlit_first_render_imports': (
+        "from src.modules import KenyanMarketDataCollector, RecommendationEngine, RiskAnalyzer; "
+        "KenyanMarketDataCollector().get_all_market_data()"
+    ),
+    'package_import': "import src.modules",
+}
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def run_once(code: str):
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        # Only top-level imports (one space of indentation) are reported
+        if match and len(match.group(3)) == 1:
+            imports.append((int(match.group(2)), match.group(4)))
+    return elapsed, imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FinApp startup benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    for name, code in SCENARIOS.items():
+        timings = []
+        for _ in range(args.runs):
+            elapsed, imports = run_once(code)
+            timings.append(elapsed)
+        total_imports_ms = sum(us for us, _ in imports) / 1000
+        print(f"\n{name}: median {statistics.median(timings) * 1000:.1f} ms wall "
+              f"({total_imports_ms:.1f} ms in imports)")
+        for us, module in sorted(imports, reverse=True)[:args.top]:
+            print(f"   {us / 1000:>8.1f} ms  {module}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Local HTTP stub that serves simulated market data for benchmarks
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.modules import KenyanMarketDataCollector
+from src.modules.data_collector import SOURCES
+
+
+def simulated_payloads() -> Dict[str, bytes]:
+    """Encode every simulated source once, keyed by URL path"""
+    data = KenyanMarketDataCollector().get_all_market_data()
+    return {
+        f"/{source}": json.dumps(data[source], default=str).encode('utf-8')
+        for source in SOURCES
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves pre-encoded JSON payloads"""
+
+    payloads: Dict[str, bytes] = {}
+
+    def do_GET(self):
+        body = self.payloads.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FaultInjectingHandler(StubHandler):
+    """
+    Stub whose paths in `flapping` alternate between healthy and failing
+    every `period` seconds. While failing, a request hangs for `hang`
+    seconds and then returns 503, like an overloaded upstream.
+    """
+
+    flapping = {'/treasury'}
+    period = 1.0
+    hang = 0.5
+    started = time.monotonic()
+
+    def is_down(self) -> bool:
+        return self.path in self.flapping and int((time.monotonic() - self.started) / self.period) % 2 == 1
+
+    def do_GET(self):
+        if self.is_down():
+            time.sleep(self.hang)
+            try:
+                self.send_error(503)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client already timed out
+            return
+        super().do_GET()
+
+
+def start_stub_server(handler=StubHandler, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub on a background thread; returns (server, base_url)"""
+    if not handler.payloads:
+        handler.payloads = simulated_payloads()
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    server, url = start_stub_server(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"Serving simulated market data at {url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,11 +1,94 @@
-"""FinApp modules package"""
+"""FinApp modules package
 
-from .data_collector import KenyanMarketDataCollector
-from .risk_analyzer import RiskAnalyzer
-from .recommendation_engine import RecommendationEngine
+Submodules are imported on first attribute access (PEP 562), so importing
+the package does not pull in requests, numpy or any module that is not used.
+"""
 
-__all__ = [
-    'KenyanMarketDataCollector',
-    'RiskAnalyzer', 
-    'RecommendationEngine',
-]
+import importlib
+from typing import TYPE_CHECKING
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    'KenyanMarketDataCollector': 'data_collector',
+    'RiskAnalyzer': 'risk_analyzer',
+    'RecommendationEngine': 'recommendation_engine',
+    'ColumnarReportReader': 'columnar_export',
+    'ColumnarReportWriter': 'columnar_export',
+    'export_recommendations': 'columnar_export',
+    'YieldCurve': 'yield_curve',
+    'curve_for_snapshot': 'yield_curve',
+    'RolloverSimulator': 'ladder_simulator',
+    'LadderResult': 'ladder_simulator',
+    'FixedDepositAllocator': 'fd_allocator',
+    'FixedDepositPlan': 'fd_allocator',
+    'MoneyMarketRanker': 'mmf_ranker',
+    'FundQuote': 'mmf_ranker',
+    'EquityBasketBuilder': 'equity_basket',
+    'EquityBasket': 'equity_basket',
+    'StressTester': 'stress_testing',
+    'Scenario': 'stress_testing',
+    'UserBook': 'stress_testing',
+    'IncrementalScorer': 'incremental',
+    'snapshot_diff': 'incremental',
+    'GoalSolver': 'goal_solver',
+    'SavingsProjection': 'contributions',
+    'project_schedule': 'contributions',
+    'savings_plan_values': 'contributions',
+    'Settings': 'settings',
+    'get_settings': 'settings',
+    'MarketCalendar': 'market_calendar',
+    'default_calendar': 'market_calendar',
+    'BondSet': 'bond_pricing',
+    'par_bond': 'bond_pricing',
+    'CostModel': 'costs',
+    'CostProjection': 'costs',
+    'SnapshotPublisher': 'shared_snapshot',
+    'SnapshotReader': 'shared_snapshot',
+    'SnapshotFollower': 'snapshot_distribution',
+    'SnapshotLeader': 'snapshot_distribution',
+    'SuitabilityModel': 'suitability',
+    'SensitivityAnalyzer': 'sensitivity',
+    'SensitivityTable': 'sensitivity',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from .data_collector import KenyanMarketDataCollector
+    from .risk_analyzer import RiskAnalyzer
+    from .recommendation_engine import RecommendationEngine
+    from .columnar_export import (
+        ColumnarReportReader,
+        ColumnarReportWriter,
+        export_recommendations,
+    )
+    from .yield_curve import YieldCurve, curve_for_snapshot
+    from .ladder_simulator import LadderResult, RolloverSimulator
+    from .fd_allocator import FixedDepositAllocator, FixedDepositPlan
+    from .mmf_ranker import FundQuote, MoneyMarketRanker
+    from .equity_basket import EquityBasket, EquityBasketBuilder
+    from .stress_testing import Scenario, StressTester, UserBook
+    from .incremental import IncrementalScorer, snapshot_diff
+    from .goal_solver import GoalSolver
+    from .contributions import SavingsProjection, project_schedule, savings_plan_values
+    from .settings import Settings, get_settings
+    from .market_calendar import MarketCalendar, default_calendar
+    from .bond_pricing import BondSet, par_bond
+    from .costs import CostModel, CostProjection
+    from .shared_snapshot import SnapshotPublisher, SnapshotReader
+    from .snapshot_distribution import SnapshotFollower, SnapshotLeader
+    from .suitability import SuitabilityModel
+    from .sensitivity import SensitivityAnalyzer, SensitivityTable
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
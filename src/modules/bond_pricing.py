@@ -0,0 +1,158 @@
+"""
+Coupon schedules, pricing, yield to maturity and rate risk for treasury bonds
+"""
+
+import functools
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .yield_curve import tenor_in_years
+
+COUPON_FREQUENCY = 2  # Kenyan treasury bonds pay semi-annually
+FACE_VALUE = 100.0
+
+
+@dataclass
+class BondRisk:
+    """Price and rate sensitivities per bond (and per scenario, when yields are 2-D)"""
+    dirty_price: np.ndarray
+    clean_price: np.ndarray
+    macaulay_duration: np.ndarray  # years
+    modified_duration: np.ndarray  # percent price change per 1 point of yield
+    convexity: np.ndarray
+    dv01: np.ndarray  # price change per 100 face for a 1bp fall in yield
+
+    def price_change(self, shift: float) -> np.ndarray:
+        """Approximate percent price change for a yield shift in percentage points"""
+        return -self.modified_duration * shift + 0.5 * self.convexity * (shift / 100) ** 2 * 100
+
+
+class BondSet:
+    """
+    A batch of fixed-coupon bonds laid out on one cash-flow grid.
+
+    Each bond's remaining coupons (and its redemption) sit in one row of a
+    (bonds, periods) matrix, padded with zeros, so pricing any number of
+    yield scenarios is a single broadcast multiply and sum. Yields are
+    quoted in percent, compounded at the coupon frequency. A bond part way
+    through a coupon period accrues interest, which separates the dirty
+    (cash) price from the quoted clean price.
+    """
+
+    def __init__(self, coupons, years_to_maturity, frequency: int = COUPON_FREQUENCY,
+                 face: float = FACE_VALUE, names: Optional[List[str]] = None):
+        self.coupons = np.atleast_1d(np.asarray(coupons, dtype=float))
+        self.years = np.atleast_1d(np.asarray(years_to_maturity, dtype=float))
+        self.frequency = frequency
+        self.face = face
+        self.names = names
+
+        periods = np.ceil(self.years * frequency - 1e-9).astype(np.intp)
+        elapsed = periods - self.years * frequency  # fraction of the current period already run
+        grid = np.arange(max(int(periods.max()), 1))
+        live = grid < periods[:, None]
+
+        self.payment_coupon = self.coupons / 100 * face / frequency
+        self.times = np.where(live, (grid + 1 - elapsed[:, None]) / frequency, 0.0)  # years
+        self.cash_flows = np.where(live, self.payment_coupon[:, None], 0.0)
+        self.cash_flows[np.arange(len(periods)), np.maximum(periods - 1, 0)] += face
+        self.accrued = self.payment_coupon * elapsed
+        self.periods = periods
+        self.elapsed = elapsed
+
+    @classmethod
+    def from_treasury_data(cls, treasury: Dict) -> 'BondSet':
+        """Every bond in a treasury snapshot; bonds without a 'coupon' are taken to trade at par"""
+        bonds = [(key, data) for key, data in treasury.items()
+                 if key.endswith('_bond') and tenor_in_years(key) is not None]
+        if not bonds:
+            raise ValueError("No treasury bonds in the snapshot")
+        return cls([data.get('coupon', data['yield']) for _, data in bonds],
+                   [tenor_in_years(key) for key, _ in bonds], names=[key for key, _ in bonds])
+
+    def __len__(self) -> int:
+        return len(self.coupons)
+
+    def schedule(self, index: int):
+        """(times in years, cash flows per 100 face) of one bond's remaining payments"""
+        live = self.cash_flows[index] > 0
+        return self.times[index][live], self.cash_flows[index][live]
+
+    def _discount(self, yields) -> np.ndarray:
+        """Discount factors, shape yields.shape + (periods,)"""
+        per_period = 1 + np.asarray(yields, dtype=float)[..., None] / 100 / self.frequency
+        return per_period ** (-self.frequency * self.times)
+
+    def dirty_prices(self, yields) -> np.ndarray:
+        """Cash price per 100 face; `yields` is (bonds,) or (scenarios, bonds)"""
+        # The coupons are a level annuity, so the grid sum has a closed form:
+        # v^-a * (c * (v - v^(n+1)) / (1 - v) + face * v^n), v = 1 / (1 + y/f)
+        rate = np.asarray(yields, dtype=float) / 100 / self.frequency
+        v = 1 / (1 + rate)
+        v_n = v ** self.periods
+        with np.errstate(divide='ignore', invalid='ignore'):
+            annuity = np.where(rate != 0, (1 - v_n) / rate, self.periods)
+        return (self.payment_coupon * annuity + self.face * v_n) * v ** -self.elapsed
+
+    def clean_prices(self, yields) -> np.ndarray:
+        return self.dirty_prices(yields) - self.accrued
+
+    def reprice(self, yields, shifts_bp) -> np.ndarray:
+        """Clean prices under parallel yield shifts, shape (len(shifts_bp), bonds)"""
+        shocked = np.asarray(yields, dtype=float)[None, :] + np.asarray(shifts_bp, dtype=float)[:, None] / 100
+        return self.clean_prices(shocked)
+
+    def yields(self, prices, clean: bool = True, tol: float = 1e-10, max_iter: int = 50) -> np.ndarray:
+        """Yield to maturity (percent) for each price, by Newton's method on all bonds at once"""
+        target = np.asarray(prices, dtype=float) + (self.accrued if clean else 0.0)
+        y = np.broadcast_to(self.coupons, target.shape).copy()
+        for _ in range(max_iter):
+            discount = self._discount(y)
+            value = (self.cash_flows * discount).sum(axis=-1)
+            # dP/dy = -sum(t * cf * df) / (1 + y/f), per percentage point
+            slope = -(self.times * self.cash_flows * discount).sum(axis=-1) / (1 + y / 100 / self.frequency) / 100
+            step = (value - target) / slope
+            y = np.maximum(y - step, -100 * self.frequency + 1e-6)
+            if np.all(np.abs(step) < tol):
+                break
+        return y
+
+    def risk(self, yields) -> BondRisk:
+        """Price, durations, convexity and DV01 at `yields` ((bonds,) or (scenarios, bonds))"""
+        yields = np.asarray(yields, dtype=float)
+        discount = self._discount(yields)
+        flows = self.cash_flows * discount
+        dirty = flows.sum(axis=-1)
+        per_period = 1 + yields / 100 / self.frequency
+        macaulay = (self.times * flows).sum(axis=-1) / dirty
+        modified = macaulay / per_period
+        convexity = ((self.times * (self.times + 1 / self.frequency) * flows).sum(axis=-1)
+                     / (dirty * per_period ** 2))
+        return BondRisk(dirty, dirty - self.accrued, macaulay, modified, convexity, modified * dirty / 10_000)
+
+
+@dataclass(frozen=True)
+class ParBond:
+    """A bond bought at par on issue, as the engine recommends for long horizons"""
+    yield_percent: float
+    years: float
+    effective_annual_yield: float  # percent, with coupons reinvested at the yield
+    coupon_per_100: float  # each semi-annual payment per 100 invested
+    modified_duration: float
+    convexity: float
+
+
+@functools.lru_cache(maxsize=1024)
+def par_bond(yield_percent: float, years: float, frequency: int = COUPON_FREQUENCY) -> ParBond:
+    """Analytics for a par bond of `years` at `yield_percent`, cached per (yield, years)"""
+    bonds = BondSet([yield_percent], [years], frequency)
+    risk = bonds.risk([yield_percent])
+    return ParBond(
+        yield_percent, years,
+        ((1 + yield_percent / 100 / frequency) ** frequency - 1) * 100,
+        float(bonds.payment_coupon[0]),
+        float(risk.modified_duration[0]),
+        float(risk.convexity[0]),
+    )
@@ -0,0 +1,92 @@
+"""
+Circuit breakers and structured errors for market data sources
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised when a source is skipped because its circuit is open"""
+
+
+class MarketDataUnavailableError(Exception):
+    """Raised when required market data sections are missing"""
+
+    def __init__(self, sources: List[str], errors: Optional[List[Dict]] = None):
+        self.sources = sources
+        self.errors = errors or []
+        super().__init__(f"Market data unavailable for: {', '.join(sources)}")
+
+
+@dataclass
+class FetchError:
+    """Structured description of a failed fetch"""
+    source: str
+    error_type: str
+    message: str
+    circuit_state: str
+    served_stale: bool
+    stale_since: Optional[str] = None
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+
+class CircuitBreaker:
+    """
+    Per-source circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are rejected immediately. Once `reset_timeout` seconds have passed
+    a single probe is let through (half-open); its outcome closes the
+    circuit or re-opens it for another timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Whether a call to the source should be attempted now"""
+        if self.state == self.CLOSED:
+            return True
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        if self.state == self.CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
@@ -0,0 +1,276 @@
+"""
+Columnar storage for bulk recommendation exports
+"""
+
+import json
+import struct
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+MAGIC = b'FINCOL01'
+MAX_ALTERNATIVES = 3
+# magic, record count, footer offset, schema length
+_PREAMBLE = struct.Struct('<8sQQI')
+_ALIGN = 64
+
+# String columns are dictionary-encoded; the vocabulary lives in the footer
+CATEGORICAL_FIELDS = (
+    'risk_appetite',
+    'primary_instrument',
+    'primary_category',
+    'primary_risk_rating',
+    'primary_liquidity',
+    'primary_duration_fit',
+    'alt_instrument',
+    'alt_category',
+    'alt_risk_rating',
+    'alt_liquidity',
+    'macro_outlook',
+)
+
+SCENARIOS = ('best_case', 'base_case', 'worst_case')
+
+# After-cost projections (costs.option_costs) stored for the primary and
+# each alternative; NaN for reports written before the engine had them
+NET_FIELDS = ('net_return', 'net_final_value', 'costs', 'break_even_months')
+
+RECOMMENDATION_DTYPE = np.dtype([
+    ('amount', '<f8'),
+    ('duration_months', '<u2'),
+    ('risk_appetite', '<u2'),
+    ('primary_instrument', '<u2'),
+    ('primary_category', '<u2'),
+    ('primary_risk_rating', '<u2'),
+    ('primary_liquidity', '<u2'),
+    ('primary_duration_fit', '<u2'),
+    ('primary_expected_return', '<f8'),
+    ('primary_final_value', '<f8'),
+    ('primary_earnings', '<f8'),
+    *((f'primary_{name}', '<f8') for name in NET_FIELDS),
+    ('n_alternatives', 'u1'),
+    ('alt_instrument', '<u2', (MAX_ALTERNATIVES,)),
+    ('alt_category', '<u2', (MAX_ALTERNATIVES,)),
+    ('alt_risk_rating', '<u2', (MAX_ALTERNATIVES,)),
+    ('alt_liquidity', '<u2', (MAX_ALTERNATIVES,)),
+    ('alt_expected_return', '<f8', (MAX_ALTERNATIVES,)),
+    ('alt_final_value', '<f8', (MAX_ALTERNATIVES,)),
+    *((f'alt_{name}', '<f8', (MAX_ALTERNATIVES,)) for name in NET_FIELDS),
+    ('scenario_return', '<f8', (len(SCENARIOS),)),
+    ('scenario_value', '<f8', (len(SCENARIOS),)),
+    ('macro_inflation', '<f8'),
+    ('macro_cbr', '<f8'),
+    ('macro_outlook', '<u2'),
+])
+
+
+class _Vocabulary:
+    """Maps repeated strings to small integer codes"""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values = list(values or [''])
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value: Optional[str]) -> int:
+        value = '' if value is None else str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            if code > 0xFFFF:
+                raise ValueError("Too many distinct strings for a columnar export")
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class ColumnarReportWriter:
+    """
+    Streams recommendations into a flat, fixed-width record file.
+
+    Pros/cons and scenario descriptions are static text derived from the
+    instrument, so only the numeric projections and the labels are stored.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 8192):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.vocabulary = _Vocabulary()
+        self.count = 0
+        self._rows = []
+        self._file = open(path, 'wb')
+        self._header_size = self._write_header()
+
+    def _write_header(self) -> int:
+        schema = json.dumps({
+            'version': 2,
+            'descr': np.lib.format.dtype_to_descr(RECOMMENDATION_DTYPE),
+            'max_alternatives': MAX_ALTERNATIVES,
+            'scenarios': list(SCENARIOS),
+        }).encode('utf-8')
+        size = _PREAMBLE.size + len(schema)
+        size += -size % _ALIGN
+        self._file.write(_PREAMBLE.pack(MAGIC, 0, 0, len(schema)))
+        self._file.write(schema.ljust(size - _PREAMBLE.size, b' '))
+        return size
+
+    def append(self, recommendation: Dict, user_input: Dict):
+        """Add one recommendation as returned by generate_recommendation"""
+        encode = self.vocabulary.encode
+        primary = recommendation['primary_recommendation']
+        macro = recommendation.get('macro_context', {})
+        scenarios = recommendation['scenarios']
+
+        alternatives = recommendation['alternatives'][:MAX_ALTERNATIVES]
+        padding = [0] * (MAX_ALTERNATIVES - len(alternatives))
+        alt_values = padding and [0.0] * len(padding)
+
+        self._rows.append((
+            user_input['amount'],
+            user_input['duration_months'],
+            encode(user_input['risk_appetite']),
+            encode(primary['instrument']),
+            encode(primary['category']),
+            encode(primary['risk_rating']),
+            encode(primary['liquidity']),
+            encode(primary['duration_fit']),
+            primary['expected_return'],
+            primary['final_value'],
+            primary['earnings'],
+            *(primary.get(name, np.nan) for name in NET_FIELDS),
+            len(alternatives),
+            [encode(alt['instrument']) for alt in alternatives] + padding,
+            [encode(alt['category']) for alt in alternatives] + padding,
+            [encode(alt['risk_rating']) for alt in alternatives] + padding,
+            [encode(alt['liquidity']) for alt in alternatives] + padding,
+            [alt['expected_return'] for alt in alternatives] + alt_values,
+            [alt['final_value'] for alt in alternatives] + alt_values,
+            *([alt.get(name, np.nan) for alt in alternatives] + alt_values for name in NET_FIELDS),
+            [scenarios[name]['return_percent'] for name in SCENARIOS],
+            [scenarios[name]['final_value'] for name in SCENARIOS],
+            macro.get('inflation', np.nan),
+            macro.get('cbr', np.nan),
+            encode(macro.get('outlook')),
+        ))
+        if len(self._rows) == self.chunk_size:
+            self.flush()
+
+    def write_records(self, records: np.ndarray):
+        """Append rows that are already in RECOMMENDATION_DTYPE layout"""
+        self.flush()
+        records = np.ascontiguousarray(records, dtype=RECOMMENDATION_DTYPE)
+        self._file.write(records.tobytes())
+        self.count += len(records)
+
+    def flush(self):
+        """Write buffered rows to disk"""
+        if self._rows:
+            self._file.write(np.array(self._rows, dtype=RECOMMENDATION_DTYPE).tobytes())
+            self.count += len(self._rows)
+            self._rows = []
+
+    def close(self):
+        """Write the vocabulary footer and finalise the header"""
+        if self._file.closed:
+            return
+        self.flush()
+        footer_offset = self._file.tell()
+        self._file.write(json.dumps(self.vocabulary.values).encode('utf-8'))
+        self._file.seek(0)
+        self._file.write(struct.pack('<8sQQ', MAGIC, self.count, footer_offset))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ColumnarReportReader:
+    """Memory-mapped, read-only view over a columnar export"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, count, footer_offset, schema_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a FinApp columnar export")
+            schema = json.loads(f.read(schema_len))
+            f.seek(footer_offset)
+            self.vocabulary = np.array(json.loads(f.read()), dtype=object)
+
+        header_size = _PREAMBLE.size + schema_len
+        header_size += -header_size % _ALIGN
+        self.dtype = np.dtype([
+            (field[0], field[1]) if len(field) == 2 else (field[0], field[1], tuple(field[2]))
+            for field in schema['descr']
+        ])
+        self.records = np.memmap(path, dtype=self.dtype, mode='r',
+                                 offset=header_size, shape=(count,)) if count else \
+            np.zeros(0, dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a column, decoding dictionary-encoded strings"""
+        values = self.records[name]
+        if name in CATEGORICAL_FIELDS:
+            return self.vocabulary[values]
+        return values
+
+    def iter_recommendations(self) -> Iterator[Dict]:
+        """Rebuild the core recommendation dicts (without pros/cons text)"""
+        vocab = self.vocabulary
+        # Version 1 exports predate the after-cost fields
+        net = [name for name in NET_FIELDS if f'primary_{name}' in self.dtype.names]
+        for row in self.records:
+            n_alt = int(row['n_alternatives'])
+            yield {
+                'user_input': {
+                    'amount': float(row['amount']),
+                    'duration_months': int(row['duration_months']),
+                    'risk_appetite': vocab[row['risk_appetite']],
+                },
+                'primary_recommendation': {
+                    'instrument': vocab[row['primary_instrument']],
+                    'category': vocab[row['primary_category']],
+                    'expected_return': float(row['primary_expected_return']),
+                    'final_value': float(row['primary_final_value']),
+                    'earnings': float(row['primary_earnings']),
+                    'risk_rating': vocab[row['primary_risk_rating']],
+                    'liquidity': vocab[row['primary_liquidity']],
+                    'duration_fit': vocab[row['primary_duration_fit']],
+                    **{name: float(row[f'primary_{name}']) for name in net},
+                },
+                'alternatives': [
+                    {
+                        'instrument': vocab[row['alt_instrument'][i]],
+                        'category': vocab[row['alt_category'][i]],
+                        'expected_return': float(row['alt_expected_return'][i]),
+                        'final_value': float(row['alt_final_value'][i]),
+                        'risk_rating': vocab[row['alt_risk_rating'][i]],
+                        'liquidity': vocab[row['alt_liquidity'][i]],
+                        **{name: float(row[f'alt_{name}'][i]) for name in net},
+                    } for i in range(n_alt)
+                ],
+                'scenarios': {
+                    name: {
+                        'return_percent': float(row['scenario_return'][i]),
+                        'final_value': float(row['scenario_value'][i]),
+                    } for i, name in enumerate(SCENARIOS)
+                },
+                'macro_context': {
+                    'inflation': float(row['macro_inflation']),
+                    'cbr': float(row['macro_cbr']),
+                    'outlook': vocab[row['macro_outlook']],
+                },
+            }
+
+
+def export_recommendations(path: str, recommendations: List[Dict], user_inputs: List[Dict]) -> int:
+    """Write a batch of recommendations to a columnar export file"""
+    with ColumnarReportWriter(path) as writer:
+        for recommendation, user_input in zip(recommendations, user_inputs):
+            writer.append(recommendation, user_input)
+    return writer.count
@@ -0,0 +1,139 @@
+"""
+Savings plan projections: lump sums plus regular or irregular contributions
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .settings import get_settings
+from .stress_testing import INSTRUMENTS, StressTester, risk_codes
+
+# Months between the dates a new deposit can be put to work in each instrument:
+# bills are bought at the next 91-day rollover, deposits at the next 6-month
+# term, funds and shares straight away
+CREDIT_PERIOD_MONTHS = {
+    'treasury': 3,
+    'money_market': 1,
+    'fixed_deposit': 6,
+    'equity': 1,
+    'reit': 1,
+}
+
+# Investment.category -> instrument key
+CATEGORY_INSTRUMENTS = {
+    'Government Securities': 'treasury',
+    'Money Market Funds': 'money_market',
+    'Bank Fixed Deposits': 'fixed_deposit',
+    'NSE Equities': 'equity',
+    'Real Estate Investment Trusts': 'reit',
+}
+
+
+def _check_horizon(months):
+    limit = get_settings().max_investment_duration_months
+    if np.any(np.asarray(months) > limit):
+        raise ValueError(f"Horizons are limited to MAX_INVESTMENT_DURATION_MONTHS={limit} months")
+
+
+def savings_plan_values(initial, monthly, return_percent, months, credit_period=1) -> np.ndarray:
+    """
+    Value after `months` of `initial` invested now plus `monthly` paid in at
+    the start of every month, in closed form. Returns are effective annual
+    (as in calculate_final_value); a contribution earns nothing until the
+    next credit date, a multiple of `credit_period` months. All arguments
+    broadcast against each other.
+    """
+    _check_horizon(months)
+    initial, monthly, rate, months, period = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (initial, monthly, return_percent, months, credit_period)))
+    g = (1 + rate / 100) ** (1 / 12)
+    # Deposits in months 1..K*p start earning at p, 2p, ..., K*p, p at a time;
+    # those after K*p wait past the horizon and are returned at face value
+    periods = np.floor(np.maximum(months - 1, 0) / period)
+    step = g ** period
+    with np.errstate(divide='ignore', invalid='ignore'):
+        series = np.where(np.isclose(step, 1), periods, (step ** periods - 1) / (step - 1))
+    invested = np.where(months > 0, g ** months, 0.0)
+    invested = invested + period * g ** (months - periods * period) * series
+    idle = np.maximum(months - 1 - periods * period, 0)
+    return initial * g ** months + monthly * (invested + idle)
+
+
+def primary_plan_values(returns: StressTester, initial, monthly, months, risk_appetites) -> np.ndarray:
+    """
+    savings_plan_values for a batch of users, each in the instrument
+    recommended for their opening amount, horizon and risk appetite, at the
+    return the engine quotes for it; NaN where no instrument is eligible
+    """
+    from .suitability import best_instruments, instrument_minimums, offered_returns  # suitability imports this module
+
+    initial, monthly, months, codes = np.broadcast_arrays(
+        np.asarray(initial, dtype=float), np.asarray(monthly, dtype=float),
+        np.asarray(months, dtype=float), risk_codes(risk_appetites))
+    shape = initial.shape
+    initial, monthly, months, codes = (a.ravel() for a in (initial, monthly, months, codes))
+    rates = offered_returns(returns, initial, months, codes)
+    instruments = best_instruments(initial, months, codes, rates, returns.inflation, instrument_minimums(returns))
+    held = instruments >= 0
+    rates = np.where(held, rates[np.arange(instruments.size), instruments], np.nan)
+    periods = np.where(held, np.array([CREDIT_PERIOD_MONTHS[name] for name in INSTRUMENTS])[instruments], 1)
+    return savings_plan_values(initial, monthly, rates, months, periods).reshape(shape)
+
+
+@dataclass
+class SavingsProjection:
+    """Month-by-month balances of a batch of savings plans"""
+    balances: np.ndarray  # shape (plans, months + 1); column t is the value at month t
+    contributions: np.ndarray  # net amount paid in per plan
+
+    @property
+    def final_values(self) -> np.ndarray:
+        return self.balances[:, -1]
+
+    @property
+    def earnings(self) -> np.ndarray:
+        return self.final_values - self.contributions
+
+    @property
+    def overdrawn(self) -> np.ndarray:
+        """Plans whose withdrawals exceed the balance at some point"""
+        return (self.balances < -1e-6).any(axis=1)
+
+
+def project_schedule(cashflows, return_percent, credit_period=1) -> SavingsProjection:
+    """
+    Project arbitrary schedules: cashflows[:, t] is paid in (or, if negative,
+    taken out) at the start of month t, so column 0 holds the opening amount.
+    `return_percent` is effective annual, either one rate per plan or one per
+    plan and month. Deposits wait for the next credit date as in
+    savings_plan_values; withdrawals leave at once.
+    """
+    flows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    plans, months = flows.shape
+    _check_horizon(months)
+    rates = np.asarray(return_percent, dtype=float)
+    rates = np.broadcast_to(rates[:, None] if rates.ndim == 1 else rates, (plans, months))
+    period = np.broadcast_to(np.asarray(credit_period, dtype=np.intp), (plans,))
+
+    # growth[:, t]: growth of one shilling invested at month 0 by month t
+    growth = np.ones((plans, months + 1))
+    np.cumprod((1 + rates / 100) ** (1 / 12), axis=1, out=growth[:, 1:])
+
+    deposits = np.maximum(flows, 0.0)
+    paid_in = np.zeros((plans, months + 1))
+    np.cumsum(deposits, axis=1, out=paid_in[:, 1:])  # paid_in[:, t + 1]: deposits in months 0..t
+    # Deposits invested by month t: those made up to the last credit date at or before t
+    invested = np.empty_like(paid_in)
+    steps = np.arange(months + 1)
+    for p in np.unique(period):
+        rows = period == p
+        credit = np.minimum(steps // p * p + 1, months)
+        credit[-1] = months
+        invested[rows] = paid_in[rows][:, credit]
+    pending = paid_in[:, np.minimum(steps + 1, months)] - invested
+
+    entering = np.diff(invested, axis=1, prepend=0.0)
+    entering[:, :months] += np.minimum(flows, 0.0)
+    balances = growth * np.cumsum(entering / growth, axis=1) + pending
+    return SavingsProjection(balances, flows.sum(axis=1))
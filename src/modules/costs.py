@@ -0,0 +1,149 @@
+"""
+Trading costs, fees and early-break penalties, and the returns left after them
+"""
+
+import functools
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .contributions import CATEGORY_INSTRUMENTS
+from .stress_testing import INSTRUMENTS, StressTester
+
+# Charged on the value of every NSE trade, buying or selling (percent)
+NSE_TRADING_COSTS = {
+    'brokerage': 1.50,  # the maximum commission; brokers may charge less
+    'nse_levy': 0.12,
+    'cma_levy': 0.08,
+    'cds_fee': 0.08,
+    'investor_compensation_fund': 0.01,
+}
+NSE_COST_PER_SIDE = sum(NSE_TRADING_COSTS.values())
+
+# Months of interest a bank keeps when a fixed deposit is broken before its
+# term; never more than the broken term has earned
+FD_BREAK_PENALTY_MONTHS = 3
+
+
+@dataclass(frozen=True)
+class InstrumentCosts:
+    """What holding an instrument costs on top of its quoted return"""
+    entry: float = 0.0  # percent of the amount invested
+    exit: float = 0.0  # percent of the value taken out
+    annual_fee: float = 0.0  # percent a year, where the quoted return is before it
+    break_penalty_months: float = 0.0  # interest forfeited if the horizon ends mid-term
+
+
+INSTRUMENT_COSTS = {
+    # Bought at auction through DhowCSD and held to maturity
+    'treasury': InstrumentCosts(),
+    # No loads; MoneyMarketRanker already quotes yields net of each fund's management fee
+    'money_market': InstrumentCosts(),
+    'fixed_deposit': InstrumentCosts(break_penalty_months=FD_BREAK_PENALTY_MONTHS),
+    'equity': InstrumentCosts(NSE_COST_PER_SIDE, NSE_COST_PER_SIDE),
+    'reit': InstrumentCosts(NSE_COST_PER_SIDE, NSE_COST_PER_SIDE),
+}
+
+
+def deposit_term_months(months) -> np.ndarray:
+    """Fixed deposit term generate_fixed_deposit_option picks for a horizon"""
+    return np.where(np.asarray(months) <= 6, 6, 12)
+
+
+@dataclass
+class CostProjection:
+    """Gross and net outcomes per (user, instrument), in the broadcast shape of the inputs"""
+    amounts: np.ndarray
+    months: np.ndarray
+    gross_values: np.ndarray
+    net_values: np.ndarray
+    net_returns: np.ndarray  # percent a year, effective
+    break_even_months: np.ndarray  # whole months before exiting returns the amount; NaN if never
+
+    @property
+    def costs(self) -> np.ndarray:
+        """KES lost to costs over the horizon"""
+        return self.gross_values - self.net_values
+
+
+class CostModel:
+    """
+    Applies INSTRUMENT_COSTS to projections for any mix of users and
+    instruments at once.
+
+    Instruments are indices into stress_testing.INSTRUMENTS, and every
+    argument broadcasts, so a (users, 1) column of amounts against a row of
+    all instruments prices the whole matrix in one pass. A position is
+    bought net of entry costs, grows at the quoted return less any annual
+    fee, and is sold net of exit costs. Fixed deposits roll at their term;
+    if the horizon ends part way through one, the deposit is broken and up
+    to FD_BREAK_PENALTY_MONTHS of that term's interest is forfeited.
+    """
+
+    def __init__(self, costs: Optional[Dict[str, InstrumentCosts]] = None):
+        costs = [(costs or INSTRUMENT_COSTS)[name] for name in INSTRUMENTS]
+        self.entry = np.array([c.entry for c in costs]) / 100
+        self.exit = np.array([c.exit for c in costs]) / 100
+        self.annual_fee = np.array([c.annual_fee for c in costs]) / 100
+        self.break_penalty_months = np.array([c.break_penalty_months for c in costs], dtype=float)
+
+    def project(self, amounts, months, instruments, gross_returns) -> CostProjection:
+        """Gross and net values, net return and break-even holding period; arguments broadcast"""
+        amounts, months, codes, gross = np.broadcast_arrays(
+            np.asarray(amounts, dtype=float), np.asarray(months, dtype=float),
+            np.asarray(instruments, dtype=np.intp), np.asarray(gross_returns, dtype=float))
+        rate = gross / 100 - self.annual_fee[codes]
+        kept = (1 - self.entry[codes]) * (1 - self.exit[codes])
+        years = months / 12
+
+        # Powers as exponentials of one log per element, which is several times cheaper
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_growth = np.log1p(rate)
+            held = np.exp(years * log_growth)
+            # A broken term earns its months less the forfeited ones, on the balance it started with
+            broken = months % deposit_term_months(months)
+            forfeited = np.minimum(self.break_penalty_months[codes], broken)
+            lost = np.exp((months - broken) / 12 * log_growth) * np.expm1(forfeited / 12 * log_growth)
+            net_growth = kept * (held - lost)
+            net_returns = np.where(months > 0, np.expm1(np.log(net_growth) / years) * 100, 0.0)
+            # Forfeits never touch principal, so only trading costs need earning back
+            needed = np.ceil(12 * -np.log(kept) / log_growth - 1e-9)
+        break_even = np.where(kept >= 1, 0.0, np.where(rate > 0, needed, np.nan))
+        gross_growth = (1 + gross / 100) ** years if self.annual_fee.any() else held
+        return CostProjection(amounts, months, amounts * gross_growth, amounts * net_growth, net_returns, break_even)
+
+_default: Optional[CostModel] = None
+
+
+def default_cost_model() -> CostModel:
+    """CostModel for INSTRUMENT_COSTS, built once per process"""
+    global _default
+    if _default is None:
+        _default = CostModel()
+    return _default
+
+
+@functools.lru_cache(maxsize=4096)
+def option_costs(amount: float, months: int, categories: Tuple[str, ...],
+                 gross_returns: Tuple[float, ...]) -> Tuple[Tuple[float, float, float, float], ...]:
+    """
+    (net return, net value, costs, break-even months) for each of a
+    recommendation's options, identified by Investment.category; cached per
+    distinct recommendation
+    """
+    codes = [INSTRUMENTS.index(CATEGORY_INSTRUMENTS[category]) for category in categories]
+    projection = default_cost_model().project(amount, months, codes, gross_returns)
+    return tuple(zip(projection.net_returns.tolist(), projection.net_values.tolist(),
+                     projection.costs.tolist(), projection.break_even_months.tolist()))
+
+
+def book_projection(returns: StressTester, amounts, months) -> CostProjection:
+    """
+    Net outcomes for every user (rows) in every instrument (columns), at the
+    returns `returns` gives, which are those generate_recommendation quotes
+    """
+    amounts = np.asarray(amounts, dtype=float).ravel()
+    months = np.asarray(months, dtype=float).ravel()
+    gross = returns.base_returns(amounts, months)
+    return default_cost_model().project(amounts[:, None], months[:, None], np.arange(len(INSTRUMENTS)), gross)
@@ -2,127 +2,221 @@
 Module for collecting real-time Kenyan market data
 """
 
-import requests
-import json
+import logging
+import time
+from dataclasses import asdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, FetchError
+from .instrumentation import record_error, timed
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ('treasury', 'money_market', 'fixed_deposits', 'nse', 'reits', 'macro')
 
 class KenyanMarketDataCollector:
     """Collects real-time data on Kenyan investment vehicles"""
     
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None, timeout: float = 5.0,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0):
+        # When base_url is set, each source is fetched as JSON from
+        # {base_url}/{source} instead of using the simulated figures
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.timeout = timeout
         self.treasury_data = {}
         self.money_market_data = {}
         self.nse_data = {}
+        self.reit_data = {}
         self.macro_data = {}
         self.last_updated = None
+        
+        # One breaker per source; failing sources are served from the last
+        # good snapshot until a half-open probe succeeds
+        self.breakers = {
+            source: CircuitBreaker(source, failure_threshold, reset_timeout)
+            for source in SOURCES
+        }
+        self.last_good: Dict[str, Dict] = {}
+        self.last_good_at: Dict[str, float] = {}
+        self.errors: Dict[str, FetchError] = {}
+    
+    def _fetch_remote(self, source: str) -> Dict:
+        """Fetch one source from the configured market data endpoint"""
+        import requests  # deferred: only needed when a live endpoint is configured
+        
+        response = requests.get(f"{self.base_url}/{source}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
     
+    def _guarded_fetch(self, source: str, simulated: Callable[[], Dict]) -> Dict:
+        """Fetch a source through its circuit breaker, falling back to the last good data"""
+        breaker = self.breakers[source]
+        if not breaker.allow_request():
+            return self._fallback(source, CircuitOpenError(f"circuit open for {source}"))
+        
+        try:
+            data = self._fetch_remote(source) if self.base_url else simulated()
+            if not data:
+                raise ValueError(f"empty payload from {source}")
+        except Exception as e:
+            breaker.record_failure()
+            record_error(source, e)
+            return self._fallback(source, e)
+        
+        breaker.record_success()
+        self.last_good[source] = data
+        self.last_good_at[source] = time.time()
+        if self.errors:
+            self.errors.pop(source, None)
+        return data
+    
+    def _fallback(self, source: str, error: Exception) -> Dict:
+        stale = self.last_good.get(source)
+        stale_since = self.last_good_at.get(source)
+        self.errors[source] = FetchError(
+            source=source,
+            error_type=type(error).__name__,
+            message=str(error),
+            circuit_state=self.breakers[source].state,
+            served_stale=stale is not None,
+            stale_since=datetime.fromtimestamp(stale_since).isoformat() if stale_since else None,
+        )
+        if not isinstance(error, CircuitOpenError):
+            logger.warning("Error fetching %s data: %s", source, error)
+        return stale or {}
+    
+    @timed('treasury', kind='fetch')
     def fetch_treasury_data(self) -> Dict:
         """
         Fetch latest Treasury bill and bond yields
         In production, would connect to CBK or market data APIs
         """
-        try:
-            # Simulated Treasury data for demonstration
-            # In production: use CBK Open Data, Kenya Bond API, or similar
-            self.treasury_data = {
-                '91_day_tb': {'yield': 16.85, 'last_updated': datetime.now()},
-                '182_day_tb': {'yield': 17.23, 'last_updated': datetime.now()},
-                '364_day_tb': {'yield': 17.95, 'last_updated': datetime.now()},
-                '2_year_bond': {'yield': 18.10, 'last_updated': datetime.now()},
-                '5_year_bond': {'yield': 17.85, 'last_updated': datetime.now()},
-                '10_year_bond': {'yield': 17.50, 'last_updated': datetime.now()},
-            }
-            return self.treasury_data
-        except Exception as e:
-            print(f"Error fetching Treasury data: {e}")
-            return {}
+        self.treasury_data = self._guarded_fetch('treasury', self._simulated_treasury_data)
+        return self.treasury_data
+    
+    def _simulated_treasury_data(self) -> Dict:
+        # Simulated Treasury data for demonstration
+        # In production: use CBK Open Data, Kenya Bond API, or similar
+        return {
+            '91_day_tb': {'yield': 16.85, 'last_updated': datetime.now()},
+            '182_day_tb': {'yield': 17.23, 'last_updated': datetime.now()},
+            '364_day_tb': {'yield': 17.95, 'last_updated': datetime.now()},
+            '2_year_bond': {'yield': 18.10, 'last_updated': datetime.now()},
+            '5_year_bond': {'yield': 17.85, 'last_updated': datetime.now()},
+            '10_year_bond': {'yield': 17.50, 'last_updated': datetime.now()},
+        }
     
+    @timed('money_market', kind='fetch')
     def fetch_money_market_funds(self) -> Dict:
         """
         Fetch money market fund performance and rates
         """
-        try:
-            # Simulated Money Market Fund data
-            # In production: use CMA, NSE, or fund provider APIs
-            self.money_market_data = {
-                'barclays_mmf': {'yield': 16.5, 'min_investment': 1000},
-                'equity_mmf': {'yield': 16.2, 'min_investment': 1000},
-                'stanchart_mmf': {'yield': 16.4, 'min_investment': 5000},
-                'absa_mmf': {'yield': 16.0, 'min_investment': 1000},
-            }
-            return self.money_market_data
-        except Exception as e:
-            print(f"Error fetching Money Market data: {e}")
-            return {}
+        self.money_market_data = self._guarded_fetch('money_market', self._simulated_money_market_funds)
+        return self.money_market_data
     
+    def _simulated_money_market_funds(self) -> Dict:
+        # Simulated Money Market Fund data
+        # In production: use CMA, NSE, or fund provider APIs
+        return {
+            'barclays_mmf': {'yield': 16.5, 'min_investment': 1000, 'management_fee': 2.0},
+            'equity_mmf': {'yield': 16.2, 'min_investment': 1000, 'management_fee': 1.5},
+            'stanchart_mmf': {'yield': 16.4, 'min_investment': 5000, 'management_fee': 1.0},
+            'absa_mmf': {'yield': 16.0, 'min_investment': 1000, 'management_fee': 1.75},
+        }
+    
+    @timed('fixed_deposits', kind='fetch')
     def fetch_fixed_deposits(self) -> Dict:
         """
         Fetch current fixed deposit rates from major Kenyan banks
         """
-        try:
-            # Simulated FD rates
-            fd_rates = {
-                'barclays': {'6m': 15.5, '12m': 16.0},
-                'equity_bank': {'6m': 15.8, '12m': 16.2},
-                'stanchart': {'6m': 15.3, '12m': 15.8},
-                'co_op_bank': {'6m': 16.2, '12m': 16.5},
-                'abc_bank': {'6m': 15.9, '12m': 16.3},
-            }
-            return fd_rates
-        except Exception as e:
-            print(f"Error fetching FD rates: {e}")
-            return {}
+        return self._guarded_fetch('fixed_deposits', self._simulated_fixed_deposits)
+    
+    def _simulated_fixed_deposits(self) -> Dict:
+        # Simulated FD rates
+        return {
+            'barclays': {'6m': 15.5, '12m': 16.0},
+            'equity_bank': {'6m': 15.8, '12m': 16.2},
+            'stanchart': {'6m': 15.3, '12m': 15.8},
+            'co_op_bank': {'6m': 16.2, '12m': 16.5},
+            'abc_bank': {'6m': 15.9, '12m': 16.3},
+        }
     
+    @timed('nse', kind='fetch')
     def fetch_nse_performance(self) -> Dict:
         """
         Fetch NSE index performance and market data
         """
-        try:
-            # Simulated NSE data
-            # In production: use NSE API or market data providers
-            self.nse_data = {
-                'nse_20_index': {
-                    'current': 8945.32,
-                    '6m_return': 12.5,  # percent
-                    'ytd_return': 18.3,
-                    'pe_ratio': 14.2,
-                },
-                'nasi_index': {
-                    'current': 106234.56,
-                    '6m_return': 8.2,
-                    'ytd_return': 15.7,
-                },
-                'top_stocks': {
-                    'SAFARICOM': {'price': 28.50, 'change_6m': 15.2, 'dividend_yield': 3.5},
-                    'EQUITY': {'price': 45.20, 'change_6m': 22.1, 'dividend_yield': 4.2},
-                    'KCBGROUP': {'price': 38.80, 'change_6m': 18.5, 'dividend_yield': 3.8},
-                    'STANCHART': {'price': 185.00, 'change_6m': 12.3, 'dividend_yield': 2.9},
-                }
+        self.nse_data = self._guarded_fetch('nse', self._simulated_nse_performance)
+        return self.nse_data
+    
+    def _simulated_nse_performance(self) -> Dict:
+        # Simulated NSE data
+        # In production: use NSE API or market data providers
+        return {
+            'nse_20_index': {
+                'current': 8945.32,
+                '6m_return': 12.5,  # percent
+                'ytd_return': 18.3,
+                'pe_ratio': 14.2,
+                'volatility': 18.0,  # annualised, percent
+            },
+            'nasi_index': {
+                'current': 106234.56,
+                '6m_return': 8.2,
+                'ytd_return': 15.7,
+            },
+            'top_stocks': {
+                'SAFARICOM': {'price': 28.50, 'change_6m': 15.2, 'dividend_yield': 3.5,
+                              'beta': 1.10, 'volatility': 28.0, 'lot_size': 100},
+                'EQUITY': {'price': 45.20, 'change_6m': 22.1, 'dividend_yield': 4.2,
+                           'beta': 1.20, 'volatility': 32.0, 'lot_size': 100},
+                'KCBGROUP': {'price': 38.80, 'change_6m': 18.5, 'dividend_yield': 3.8,
+                             'beta': 1.05, 'volatility': 30.0, 'lot_size': 100},
+                'STANCHART': {'price': 185.00, 'change_6m': 12.3, 'dividend_yield': 2.9,
+                              'beta': 0.70, 'volatility': 22.0, 'lot_size': 100},
             }
-            return self.nse_data
-        except Exception as e:
-            print(f"Error fetching NSE data: {e}")
-            return {}
+        }
+    
+    @timed('reits', kind='fetch')
+    def fetch_reits(self) -> Dict:
+        """
+        Fetch listed REIT prices and distribution yields
+        """
+        self.reit_data = self._guarded_fetch('reits', self._simulated_reits)
+        return self.reit_data
+    
+    def _simulated_reits(self) -> Dict:
+        # Simulated REIT data
+        # In production: use NSE or CMA REIT disclosures
+        return {
+            'ilam_fahari_ireit': {'name': 'ILAM Fahari I-REIT', 'price': 11.0, 'change_6m': 4.5,
+                                  'dividend_yield': 8.5, 'min_investment': 1100},
+            'acorn_ireit': {'name': 'Acorn Student Accommodation I-REIT', 'price': 23.5, 'change_6m': 2.0,
+                            'dividend_yield': 10.2, 'min_investment': 5000},
+            'laptrust_imara_ireit': {'name': 'LAPTRUST Imara I-REIT', 'price': 20.0, 'change_6m': 1.5,
+                                     'dividend_yield': 9.8, 'min_investment': 5000000},
+        }
     
+    @timed('macro', kind='fetch')
     def fetch_macro_indicators(self) -> Dict:
         """
         Fetch macro indicators: inflation, interest rates, currency
         """
-        try:
-            self.macro_data = {
-                'inflation_rate': 4.8,  # percent, current
-                'cbr': 10.0,  # Central Bank Rate (policy rate)
-                'base_lending_rate': 13.0,
-                'usd_kes_rate': 127.45,
-                'inflation_outlook': 'stable',  # stable, rising, declining
-                'economic_outlook': 'moderate growth',
-            }
-            return self.macro_data
-        except Exception as e:
-            print(f"Error fetching macro data: {e}")
-            return {}
+        self.macro_data = self._guarded_fetch('macro', self._simulated_macro_indicators)
+        return self.macro_data
+    
+    def _simulated_macro_indicators(self) -> Dict:
+        return {
+            'inflation_rate': 4.8,  # percent, current
+            'cbr': 10.0,  # Central Bank Rate (policy rate)
+            'base_lending_rate': 13.0,
+            'usd_kes_rate': 127.45,
+            'inflation_outlook': 'stable',  # stable, rising, declining
+            'economic_outlook': 'moderate growth',
+        }
     
+    @timed('collector.get_all_market_data')
     def get_all_market_data(self) -> Dict:
         """Fetch all market data in one call"""
         return {
@@ -130,6 +224,8 @@ class KenyanMarketDataCollector:
             'money_market': self.fetch_money_market_funds(),
             'fixed_deposits': self.fetch_fixed_deposits(),
             'nse': self.fetch_nse_performance(),
+            'reits': self.fetch_reits(),
             'macro': self.fetch_macro_indicators(),
+            'errors': [asdict(error) for error in self.errors.values()] if self.errors else [],
             'timestamp': datetime.now().isoformat(),
         }
@@ -0,0 +1,166 @@
+"""
+Board-lot equity baskets built from NSE stock data
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+
+DEFAULT_LOT_SIZE = 100
+DEFAULT_MARKET_VOLATILITY = 20.0  # percent, used when the index quote has none
+
+
+def annualized_change(change_6m):
+    """A six-month price change in percent, compounded to an annual rate in percent"""
+    return ((1 + np.asarray(change_6m, dtype=float) / 100) ** 2 - 1) * 100
+
+
+@dataclass
+class Holding:
+    """Shares of one counter in a basket"""
+    ticker: str
+    shares: int
+    price: float
+    value: float
+    weight: float
+    expected_return: float
+
+
+@dataclass
+class EquityBasket:
+    """A basket of whole board lots with its expected return and risk"""
+    amount: float
+    holdings: List[Holding] = field(default_factory=list)
+    cash: float = 0.0
+    expected_return: float = 0.0  # percent p.a., price change plus dividends, on the invested amount
+    volatility: float = 0.0  # percent p.a.
+
+    @property
+    def invested(self) -> float:
+        return self.amount - self.cash
+
+
+class EquityBasketBuilder:
+    """
+    Builds diversified baskets from one snapshot of `nse` market data.
+
+    Per-counter arrays and the covariance matrix are computed once, when the
+    builder is created. Covariance follows the single-index model: each
+    stock's beta to the NSE 20 times market variance, plus its own residual
+    variance, so it needs only per-stock beta and volatility. Baskets take
+    the `max_holdings` best counters by return per unit of volatility and
+    weight them by inverse variance. A counter's expected return is its
+    six-month price change compounded to a year, (1 + c)^2 - 1, plus its
+    dividend yield, so both are annual. Shares are then rounded down to
+    whole lots, and leftover cash buys further lots for the most underweight
+    names while it can. Built baskets are memoised per amount; treat them as
+    read-only.
+    """
+
+    CACHE_SIZE = 256
+
+    def __init__(self, nse_data: Dict):
+        self._baskets: Dict[tuple, EquityBasket] = {}
+        stocks = nse_data.get('top_stocks', {})
+        self.tickers = list(stocks)
+        self.prices = np.array([s['price'] for s in stocks.values()], dtype=float)
+        self.lot_sizes = np.array([s.get('lot_size', DEFAULT_LOT_SIZE) for s in stocks.values()], dtype=float)
+        self.lot_costs = self.prices * self.lot_sizes
+        change_6m = np.array([s.get('change_6m', 0.0) for s in stocks.values()], dtype=float)
+        dividends = np.array([s.get('dividend_yield', 0.0) for s in stocks.values()], dtype=float)
+        self.expected_returns = annualized_change(change_6m) + dividends
+        market_vol = nse_data.get('nse_20_index', {}).get('volatility', DEFAULT_MARKET_VOLATILITY) / 100
+        betas = np.array([s.get('beta', 1.0) for s in stocks.values()], dtype=float)
+        vols = np.array([s.get('volatility', market_vol * 100) for s in stocks.values()], dtype=float) / 100
+
+        residual = np.maximum(vols ** 2 - (betas * market_vol) ** 2, 0.0)
+        self.covariance = np.outer(betas, betas) * market_vol ** 2 + np.diag(residual)
+        self.variances = np.diag(self.covariance)
+        self.volatilities = np.sqrt(self.variances)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.scores = np.where(self.volatilities > 0, self.expected_returns / (self.volatilities * 100), 0.0)
+
+    def build(self, amount: float, max_holdings: int = 5) -> EquityBasket:
+        """Basket of whole lots for `amount`; counters whose lot costs more than `amount` are skipped"""
+        key = (amount, max_holdings)
+        basket = self._baskets.get(key)
+        if basket is None:
+            if len(self._baskets) >= self.CACHE_SIZE:
+                self._baskets.clear()
+            basket = self._baskets[key] = self._build(amount, max_holdings)
+        return basket
+
+    def expected_returns_for(self, amounts, max_holdings: int = 5) -> np.ndarray:
+        """
+        Expected return (percent p.a.) of the basket `build` gives each amount
+        in an array, NaN where the amount buys no lot. Each distinct amount is
+        allocated once, together with the others that afford the same counters.
+        """
+        shape = np.shape(amounts)
+        amounts, users = np.unique(np.asarray(amounts, dtype=float).ravel(), return_inverse=True)
+        returns = np.full(amounts.shape, np.nan)
+        # Sorted amounts afford the same counters between consecutive lot costs
+        bounds = np.unique(np.searchsorted(amounts, self.lot_costs)).tolist() + [len(amounts)]
+        for start, stop in zip(bounds, bounds[1:]):
+            if start < stop:
+                candidates = self._candidates(amounts[start], max_holdings)
+                lots, _ = self._lots(amounts[start:stop], candidates)
+                returns[start:stop] = self._expected_returns(lots, candidates)
+        return returns[users].reshape(shape)
+
+    def _candidates(self, amount: float, max_holdings: int) -> np.ndarray:
+        """Counters a basket for `amount` is drawn from, in index order"""
+        candidates = np.flatnonzero(self.lot_costs <= amount)
+        if len(candidates) > max_holdings:
+            best = np.argpartition(-self.scores[candidates], max_holdings - 1)[:max_holdings]
+            candidates = np.sort(candidates[best])
+        return candidates
+
+    def _lots(self, amounts: np.ndarray, candidates: np.ndarray):
+        """Whole lots of each candidate (one row per amount) and the cash each amount has left"""
+        costs = self.lot_costs[candidates]
+        inverse = 1 / self.variances[candidates]
+        target = inverse / inverse.sum()
+        goal = amounts[:, None] * target
+        lots = np.floor(goal / costs)
+        cash = amounts - (lots * costs).sum(axis=1)
+
+        # Spend what is left on whole lots for the most underweight names,
+        # one lot per amount per pass
+        rows = np.arange(len(amounts))
+        while True:
+            affordable = costs <= cash[:, None]
+            if not affordable.any():
+                break
+            pick = np.where(affordable, goal - lots * costs, -np.inf).argmax(axis=1)
+            spending = affordable[rows, pick]
+            lots[rows, pick] += spending
+            cash -= costs[pick] * spending
+        return lots, cash
+
+    def _expected_returns(self, lots: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        values = lots * self.lot_costs[candidates]
+        return (values / values.sum(axis=1, keepdims=True) * self.expected_returns[candidates]).sum(axis=1)
+
+    def _build(self, amount: float, max_holdings: int) -> EquityBasket:
+        candidates = self._candidates(amount, max_holdings)
+        if not len(candidates):
+            return EquityBasket(amount, cash=amount)
+        lots, cash = self._lots(np.array([amount], dtype=float), candidates)
+        expected_return = float(self._expected_returns(lots, candidates)[0])
+
+        lots = lots[0]
+        held = lots > 0
+        candidates, lots = candidates[held], lots[held]
+        values = lots * self.lot_costs[candidates]
+        invested = float(values.sum())
+        weights = values / invested
+        volatility = float(np.sqrt(weights @ self.covariance[np.ix_(candidates, candidates)] @ weights)) * 100
+
+        holdings = [
+            Holding(self.tickers[i], int(n * self.lot_sizes[i]), float(self.prices[i]),
+                    float(value), float(weight), float(self.expected_returns[i]))
+            for i, n, value, weight in zip(candidates, lots, values, weights)
+        ]
+        return EquityBasket(amount, holdings, float(cash[0]), expected_return, volatility)
@@ -0,0 +1,110 @@
+"""
+Expected annual return of each instrument for arrays of amounts and horizons.
+
+These are the returns generate_recommendation quotes, so every batch model
+(StressTester and everything built on it) prices users exactly as a
+recommendation would. Each function takes the engine's per-snapshot object
+for its section and returns percent a year, rounded to `decimals` places as
+the engine shows them (None leaves them unrounded, for differentiating).
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from .bond_pricing import COUPON_FREQUENCY
+from .equity_basket import annualized_change
+
+DECIMALS = 2
+
+# Treasury bill per horizon bucket: (longest horizon in months, snapshot key)
+BILLS = ((3, '91_day_tb'), (6, '182_day_tb'), (12, '364_day_tb'))
+BILL_MONTHS = BILLS[-1][0]  # beyond this, a bond priced off the fitted curve
+
+FALLBACK_FD_RATE = 15.8  # when no bank quotes the term
+FD_TERMS = ((6, '6m'), (None, '12m'))  # (longest horizon in months, term quoted)
+
+
+def _round(values: np.ndarray, decimals: Optional[int]) -> np.ndarray:
+    return values if decimals is None else np.round(values, decimals)
+
+
+def treasury_yields(treasury: Dict, curve, months, decimals: Optional[int] = DECIMALS) -> np.ndarray:
+    """
+    Quoted yield per horizon: the bill for its bucket up to BILL_MONTHS, the
+    fitted curve beyond (`curve` is only read if some horizon needs it)
+    """
+    months = np.asarray(months, dtype=float)
+    yields = np.empty(months.shape)
+    below = np.zeros(months.shape, dtype=bool)
+    for limit, key in BILLS:
+        rows = (months <= limit) & ~below
+        if rows.any():
+            yields[rows] = treasury[key]['yield']
+        below |= rows
+    if not below.all():
+        yields[~below] = _round(curve.yield_at_months(months[~below]), decimals)
+    return yields
+
+
+def coupon_compounded(yields, months, decimals: Optional[int] = DECIMALS) -> np.ndarray:
+    """
+    Effective annual return of treasury paper at its quoted yield: bills as
+    quoted, bonds with their semi-annual coupons reinvested
+    """
+    yields = np.asarray(yields, dtype=float)
+    compounded = _round(((1 + yields / 100 / COUPON_FREQUENCY) ** COUPON_FREQUENCY - 1) * 100, decimals)
+    return np.where(np.asarray(months) > BILL_MONTHS, compounded, yields)
+
+
+def treasury_returns(treasury: Dict, curve, months, decimals: Optional[int] = DECIMALS) -> np.ndarray:
+    """Effective annual return of the treasury paper for each horizon"""
+    return coupon_compounded(treasury_yields(treasury, curve, months, decimals), months, decimals)
+
+
+def money_market_returns(ranker, funds: Dict, amounts, decimals: Optional[int] = DECIMALS) -> np.ndarray:
+    """Best net yield open to each amount; the funds' average gross yield where none is"""
+    best = ranker.best_net_yields(np.asarray(amounts, dtype=float))
+    average = sum(fund['yield'] for fund in funds.values()) / len(funds)
+    return _round(np.where(np.isnan(best), average, best), decimals)
+
+
+def fixed_deposit_returns(allocator, amounts, months, decimals: Optional[int] = DECIMALS) -> np.ndarray:
+    """Blended rate of the DCDC-capped split across banks, at the 6m term up to 6 months and 12m beyond"""
+    amounts, months = np.broadcast_arrays(np.asarray(amounts, dtype=float), np.asarray(months, dtype=float))
+    returns = np.empty(amounts.shape)
+    below = np.zeros(amounts.shape, dtype=bool)
+    for limit, term in FD_TERMS:
+        rows = ~below if limit is None else (months <= limit) & ~below
+        if rows.any():
+            try:
+                returns[rows] = _round(allocator.blended_rates(amounts[rows], term), decimals)
+            except ValueError:
+                returns[rows] = FALLBACK_FD_RATE
+        below |= rows
+    return returns
+
+
+def fixed_deposit_term(months: float) -> str:
+    """Deposit term ('6m' or '12m') quoted for a horizon"""
+    return next(term for limit, term in FD_TERMS if limit is None or months <= limit)
+
+
+def equity_returns(builder, nse: Dict, amounts, decimals: Optional[int] = DECIMALS) -> np.ndarray:
+    """
+    Return of the board-lot basket each amount buys; where it buys no lot, the
+    NSE 20's, annualized as a basket's is (six-month change compounded to a
+    year, plus any dividend yield quoted)
+    """
+    baskets = builder.expected_returns_for(amounts)
+    index = nse['nse_20_index']
+    fallback = annualized_change(index['6m_return']) + index.get('dividend_yield', 0.0)
+    return _round(np.where(np.isnan(baskets), fallback, baskets), decimals)
+
+
+def reit_returns(ranker, amounts, decimals: Optional[int] = DECIMALS) -> np.ndarray:
+    """Best net return of the REITs open to each amount; NaN where none is, or without a ranker"""
+    amounts = np.asarray(amounts, dtype=float)
+    if ranker is None:
+        return np.full(amounts.shape, np.nan)
+    return _round(ranker.best_net_yields(amounts), decimals)
@@ -0,0 +1,119 @@
+"""
+Fixed deposit allocation across banks within DCDC deposit cover
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .settings import get_settings
+
+
+@dataclass
+class BankAllocation:
+    """Amount placed with a single bank"""
+    bank: str
+    amount: float
+    rate: float
+    insured: float
+
+
+@dataclass
+class FixedDepositPlan:
+    """Per-bank split of a fixed deposit and its blended yield"""
+    term: str
+    amount: float
+    blended_rate: float
+    allocations: List[BankAllocation] = field(default_factory=list)
+
+    @property
+    def uninsured_amount(self) -> float:
+        return sum(a.amount - a.insured for a in self.allocations)
+
+
+class FixedDepositAllocator:
+    """
+    Greedy allocation of a deposit to the best-paying banks.
+
+    Banks are ranked by rate once per term. An amount is filled into the
+    ranking one coverage limit at a time, which is optimal here because
+    every bank has the same cap. A final slice below the minimum deposit
+    is topped up from the previous bank rather than opened on its own.
+    Only amounts larger than total cover across all banks go uninsured,
+    and that excess sits with the best-rate bank.
+    """
+
+    def __init__(self, fixed_deposits: Dict, coverage_per_bank: Optional[float] = None,
+                 min_deposit: Optional[float] = None):
+        # Defaults: DCDC_MAX_COVERAGE_PER_BANK and MIN_INVESTMENT_FD from config.ini
+        settings = get_settings()
+        self.fixed_deposits = fixed_deposits
+        self.coverage = settings.dcdc_max_coverage_per_bank if coverage_per_bank is None else coverage_per_bank
+        self.min_deposit = settings.min_investment_fd if min_deposit is None else min_deposit
+        self._rankings: Dict[str, List] = {}
+        self._prefix: Dict[str, object] = {}
+
+    def ranking(self, term: str) -> List:
+        """[(bank, rate)] offering `term`, best rate first"""
+        ranked = self._rankings.get(term)
+        if ranked is None:
+            ranked = sorted(
+                ((bank, rates[term]) for bank, rates in self.fixed_deposits.items() if term in rates),
+                key=lambda item: item[1], reverse=True,
+            )
+            if not ranked:
+                raise ValueError(f"No bank quotes a {term} fixed deposit")
+            self._rankings[term] = ranked
+        return ranked
+
+    def allocate(self, amount: float, term: str) -> FixedDepositPlan:
+        """Split `amount` across banks for `term` ('6m' or '12m')"""
+        ranked = self.ranking(term)
+        full, remainder = divmod(amount, self.coverage)
+        full = int(full)
+
+        if full >= len(ranked):
+            amounts = [self.coverage] * len(ranked)
+            amounts[0] += amount - self.coverage * len(ranked)
+        else:
+            amounts = [self.coverage] * full
+            if remainder:
+                if full and remainder < self.min_deposit:
+                    shortfall = min(self.min_deposit, self.coverage) - remainder
+                    amounts[-1] -= shortfall
+                    remainder += shortfall
+                amounts.append(remainder)
+
+        allocations = [
+            BankAllocation(bank, share, rate, min(share, self.coverage))
+            for (bank, rate), share in zip(ranked, amounts)
+        ]
+        blended = sum(a.amount * a.rate for a in allocations) / amount if amount else ranked[0][1]
+        return FixedDepositPlan(term, amount, blended, allocations)
+
+    def blended_rates(self, amounts, term: str):
+        """Blended yield for an array of amounts in one vectorized pass"""
+        import numpy as np
+
+        prefix = self._prefix.get(term)
+        if prefix is None:
+            rates = np.array([rate for _, rate in self.ranking(term)])
+            # prefix[k] = interest from filling the top k banks to the cap
+            prefix = (rates, np.concatenate(([0.0], np.cumsum(rates) * self.coverage)))
+            self._prefix[term] = prefix
+        rates, filled = prefix
+        n = len(rates)
+
+        amounts = np.asarray(amounts, dtype=float)
+        full = np.minimum(amounts // self.coverage, n).astype(np.intp)
+        remainder = amounts - full * self.coverage
+        # Excess above total cover sits with the best bank
+        tail_rate = np.where(full < n, rates[np.minimum(full, n - 1)], rates[0])
+        interest = filled[full] + remainder * tail_rate
+
+        # Undersized last slice is topped up from the previous bank
+        topped = (full > 0) & (full < n) & (remainder > 0) & (remainder < self.min_deposit)
+        shortfall = np.where(topped, min(self.min_deposit, self.coverage) - remainder, 0.0)
+        interest += shortfall * (tail_rate - rates[np.maximum(full - 1, 0)])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(amounts > 0, interest / amounts, rates[0])
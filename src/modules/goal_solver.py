@@ -0,0 +1,178 @@
+"""
+Goal seeking: the amount or duration needed to reach a target value
+"""
+
+from statistics import NormalDist
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .equity_basket import DEFAULT_MARKET_VOLATILITY
+from .instrumentation import timed
+from .ladder_simulator import RolloverSimulator
+from .settings import get_settings
+from .stress_testing import DEFAULT_SCENARIOS, INSTRUMENTS, StressTester, risk_codes
+from .suitability import best_instruments, instrument_minimums, offered_returns
+
+# Months between rate resets when a rate instrument is held over a long horizon
+RESET_MONTHS = {'treasury': 3, 'money_market': 1, 'fixed_deposit': 12}
+REIT_VOLATILITY = 15.0  # percent p.a.
+
+
+class GoalSolver:
+    """
+    Inverts the engine's projection, value = amount * (1 + r)^(months / 12),
+    for whole batches of goals.
+
+    Each goal is held in the instrument suitability.py recommends for its
+    amount, horizon and risk appetite, at the return StressTester.base_returns
+    gives, which is the return the engine quotes. With that return fixed the
+    inverse is closed form; since the instrument and its return can
+    themselves move with the amount (fund minimums, deposit splits, board
+    lots) or horizon (the yield curve), the closed form is iterated a few
+    times, and durations that end up short of the target after rounding to
+    whole months fall back to bisection. Goals no instrument accepts give NaN.
+
+    With `percentile`, goals must be met at that percentile of outcomes
+    rather than at the expected return. Rate instruments are rolled at
+    RolloverSimulator short rates, resetting every RESET_MONTHS, and the
+    percentile of the cumulative rate deviation is tabulated per month once
+    per (reset, percentile). Equities and REITs are lognormal. Amounts stay
+    closed form because value is proportional to amount; durations are
+    found by bisection on whole months for all goals at once.
+    """
+
+    def __init__(self, market_data: Dict, max_months: Optional[int] = None, paths: int = 10_000,
+                 seed: Optional[int] = 0, iterations: int = 4):
+        self.max_months = get_settings().max_investment_duration_months if max_months is None else max_months
+        self.paths = paths
+        self.iterations = iterations
+        self.returns = StressTester(market_data, DEFAULT_SCENARIOS[:1])
+        self.simulator = RolloverSimulator(market_data, seed=seed)
+        self.reference_rate = market_data['treasury']['91_day_tb']['yield']
+        market_vol = market_data.get('nse', {}).get('nse_20_index', {}).get('volatility', DEFAULT_MARKET_VOLATILITY)
+        self.volatilities = {'equity': market_vol, 'reit': REIT_VOLATILITY}
+        self._deviations = None
+        self._rate_tables: Dict[Tuple[int, float], np.ndarray] = {}
+
+    def _goals(self, targets, given, risk_appetites):
+        targets, given, codes = np.broadcast_arrays(
+            np.asarray(targets, dtype=float), np.asarray(given, dtype=float), risk_codes(risk_appetites))
+        return targets.shape, targets.ravel(), given.ravel(), codes.ravel()
+
+    def _rate_table(self, reset_months: int, percentile: float) -> np.ndarray:
+        """Percentile of the cumulative short-rate deviation (pp-years) after 0..max_months months"""
+        key = (reset_months, percentile)
+        table = self._rate_tables.get(key)
+        if table is None:
+            if self._deviations is None:
+                rates = self.simulator.simulate_short_rates(self.reference_rate, self.max_months, self.paths)
+                self._deviations = rates - self.reference_rate
+            locked = self._deviations[:, np.arange(self.max_months) // reset_months * reset_months]
+            cumulative = np.cumsum(locked, axis=1) / 12
+            table = self._rate_tables[key] = np.concatenate(([0.0], np.percentile(cumulative, percentile, axis=0)))
+        return table
+
+    def log_growth(self, amounts: np.ndarray, months: np.ndarray, risk: np.ndarray,
+                   percentile: Optional[float] = None) -> np.ndarray:
+        """
+        log(value / amount) per goal in the instrument recommended for its
+        amount, horizon and risk appetite (an index into RISK_LEVELS), at the
+        expected return or at `percentile` of outcomes; NaN where no
+        instrument is eligible
+        """
+        horizons = np.clip(months, 1, self.max_months)
+        rates = offered_returns(self.returns, amounts, horizons, risk)
+        instruments = best_instruments(amounts, horizons, risk, rates, self.returns.inflation,
+                                       instrument_minimums(self.returns))
+        rates = np.where(instruments >= 0, rates[np.arange(len(amounts)), instruments], np.nan)
+        growth = months / 12 * np.log1p(rates / 100)
+        if percentile is None:
+            return growth
+
+        z = NormalDist().inv_cdf(percentile / 100)
+        steps = np.clip(months, 0, self.max_months).astype(np.intp)
+        for code in np.unique(instruments[instruments >= 0]):
+            rows = instruments == code
+            name = INSTRUMENTS[code]
+            if name in RESET_MONTHS:
+                # First order in the deviation: d log(1 + r) = dr / (1 + r)
+                growth[rows] += self._rate_table(RESET_MONTHS[name], percentile)[steps[rows]] / (100 + rates[rows])
+            else:
+                sigma = self.volatilities[name] / 100
+                years = months[rows] / 12
+                growth[rows] += z * sigma * np.sqrt(years) - sigma ** 2 * years / 2
+        return growth
+
+    @timed('goal.required_amounts')
+    def required_amounts(self, targets, months, risk_appetites, percentile: Optional[float] = None) -> np.ndarray:
+        """
+        Whole-shilling amount reaching each target in `months`, the smallest
+        where returns rise with the amount; NaN where none is found.
+        Arguments broadcast.
+        """
+        shape, targets, months, risk = self._goals(targets, months, risk_appetites)
+        previous = amounts = targets
+        for _ in range(self.iterations):
+            previous, amounts = amounts, targets / np.exp(self.log_growth(amounts, months, risk, percentile))
+        amounts = np.ceil(np.maximum(amounts, previous) - 1e-9)
+
+        # Where returns rise with the amount, the larger of two successive
+        # iterates a and f(a) reaches the target. They can fall (a deposit
+        # spilling into lower-rate banks, a switch of instrument at a fund
+        # minimum, board-lot rounding), so amounts left short are stepped up
+        # to what covers the target at their own return, and checked again
+        check = np.arange(len(amounts))
+        for attempt in range(self.iterations + 1):
+            growth = self.log_growth(amounts[check], months[check], risk[check], percentile)
+            short = amounts[check] * np.exp(growth) < targets[check] * (1 - 1e-12)
+            check, growth = check[short], growth[short]
+            if not len(check) or attempt == self.iterations:
+                break
+            amounts[check] = np.maximum(amounts[check] + 1, np.ceil(targets[check] / np.exp(growth) - 1e-9))
+        amounts[check] = np.nan
+        return amounts.reshape(shape)
+
+    @timed('goal.required_durations')
+    def required_durations(self, targets, amounts, risk_appetites,
+                           percentile: Optional[float] = None) -> np.ndarray:
+        """
+        Whole months for each amount to reach its target; 0 where it already
+        does, NaN where it cannot within max_months. Arguments broadcast.
+        """
+        shape, targets, amounts, risk = self._goals(targets, amounts, risk_appetites)
+        need = np.log(targets / amounts)
+        months = np.zeros(len(targets))
+
+        if percentile is None:
+            guess = np.full(len(targets), 12.0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                for _ in range(self.iterations):
+                    rate = self.log_growth(amounts, np.clip(guess, 1, self.max_months), risk) * 12
+                    rate /= np.clip(guess, 1, self.max_months)
+                    guess = np.where(rate > 0, need / rate * 12, np.inf)
+            months = np.where(need > 0, np.ceil(guess - 1e-9), 0.0)
+            unresolved = (need > 0) & ~(months <= self.max_months)
+            check = (need > 0) & (months <= self.max_months)
+            unresolved[check] = (self.log_growth(amounts[check], months[check], risk[check])
+                                 < need[check] - 1e-12)
+        else:
+            unresolved = need > 0
+
+        if unresolved.any():
+            months[unresolved] = self._bisect(need[unresolved], amounts[unresolved],
+                                              risk[unresolved], percentile)
+        return months.reshape(shape)
+
+    def _bisect(self, need: np.ndarray, amounts: np.ndarray, risk: np.ndarray,
+                percentile: Optional[float]) -> np.ndarray:
+        """First whole month whose growth covers `need`, searched over (0, max_months] for all goals together"""
+        lo = np.zeros(len(need))
+        hi = np.full(len(need), float(self.max_months))
+        reachable = self.log_growth(amounts, hi, risk, percentile) >= need - 1e-12
+        while (hi - lo > 1).any():
+            mid = np.floor((lo + hi) / 2)
+            reached = self.log_growth(amounts, mid, risk, percentile) >= need - 1e-12
+            hi = np.where(reached, mid, hi)
+            lo = np.where(reached, lo, mid)
+        return np.where(reachable, hi, np.nan)
@@ -0,0 +1,193 @@
+"""
+Dependency-tracked recommendations that are re-scored only when their inputs change
+"""
+
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from .recommendation_engine import NoEligibleInstrumentError, RecommendationEngine
+from .stress_testing import RISK_LEVELS, UserBook
+
+
+class TrackedDict(Mapping):
+    """
+    Read-only view of market data that records the dotted path of every value
+    read through it, e.g. 'treasury.364_day_tb.yield'. Iterating a level
+    records 'path.*' (its key set), and a missing key records the key itself.
+    'path.**' stands for everything under a path.
+    """
+
+    def __init__(self, data: Dict, reads: Set[str], path: str = ''):
+        self.untracked = data
+        self.reads = reads
+        self.path = path
+        self._children: Dict[str, 'TrackedDict'] = {}
+
+    def _child_path(self, key) -> str:
+        return f"{self.path}.{key}" if self.path else str(key)
+
+    def __getitem__(self, key):
+        try:
+            value = self.untracked[key]
+        except KeyError:
+            self.reads.add(self._child_path(key))
+            self.reads.add(self._child_path(key) + '.**')
+            raise
+        if isinstance(value, dict):
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = TrackedDict(value, self.reads, self._child_path(key))
+            return child
+        self.reads.add(self._child_path(key))
+        return value
+
+    def __iter__(self):
+        self.reads.add(self._child_path('*'))
+        return iter(self.untracked)
+
+    def __len__(self) -> int:
+        self.reads.add(self._child_path('*'))
+        return len(self.untracked)
+
+    def record_subtree(self):
+        """Depend on everything below this level"""
+        self.reads.add(self._child_path('**'))
+
+    def record_reads(self, paths: Iterable[str]):
+        """Record reads made on the untracked data, as full dotted paths"""
+        self.reads.update(paths)
+
+
+def snapshot_diff(old: Dict, new: Dict, path: str = '') -> Set[str]:
+    """Dotted paths of every leaf that differs between two snapshots, plus 'path.*' where key sets differ"""
+    changes: Set[str] = set()
+    prefix = f"{path}." if path else ''
+    for key in old.keys() | new.keys():
+        child = f"{prefix}{key}"
+        if key not in old or key not in new:
+            changes.add(f"{prefix}*")
+            changes.update(_leaves(old.get(key, new.get(key)), child))
+        elif isinstance(old[key], dict) and isinstance(new[key], dict):
+            changes.update(snapshot_diff(old[key], new[key], child))
+        elif old[key] != new[key]:
+            changes.update(_leaves(old[key], child) | _leaves(new[key], child))
+    return changes
+
+
+def _leaves(value, path: str) -> Set[str]:
+    if not isinstance(value, dict):
+        return {path}
+    leaves = {f"{path}.*"}
+    for key, child in value.items():
+        leaves.update(_leaves(child, f"{path}.{key}"))
+    return leaves
+
+
+def _dependency_keys(change: str) -> List[str]:
+    """The change itself plus every enclosing 'path.**' it falls under"""
+    parts = change.split('.')
+    return [change] + ['.'.join(parts[:i]) + '.**' for i in range(1, len(parts))]
+
+
+class IncrementalScorer:
+    """
+    Keeps recommendations for a book of users current as snapshots change.
+
+    Users are grouped by signature (risk appetite, duration), the inputs
+    that decide which snapshot fields the engine reads. The amount changes
+    values but not which fields are read. One tracked run per group records
+    its dependencies, and an inverted index maps each dependency to its
+    groups. When a change set arrives, only users in groups whose
+    dependencies intersect it are re-scored.
+    """
+
+    def __init__(self, market_data: Dict, book: UserBook):
+        self.market_data = market_data
+        self.book = book
+        self.engine = RecommendationEngine(market_data, {})
+        self.recommendations: Dict[int, Dict] = {}
+
+        signatures = book.risk.astype(np.int64) * 10_000 + book.months.astype(np.int64)
+        self.signatures, group_of_user = np.unique(signatures, return_inverse=True)
+        order = np.argsort(group_of_user, kind='stable')
+        bounds = np.searchsorted(group_of_user[order], np.arange(len(self.signatures) + 1))
+        self.group_users = [order[bounds[g]:bounds[g + 1]] for g in range(len(self.signatures))]
+
+        self.dependencies: List[frozenset] = [frozenset()] * len(self.signatures)
+        self.index: Dict[str, Set[int]] = {}
+        for group in range(len(self.signatures)):
+            self._track(group)
+
+    def user_input(self, user: int) -> Dict:
+        return {
+            'amount': float(self.book.amounts[user]),
+            'duration_months': int(self.book.months[user]),
+            'risk_appetite': RISK_LEVELS[self.book.risk[user]].capitalize(),
+        }
+
+    def _track(self, group: int):
+        """Record which snapshot fields a group's recommendations read"""
+        reads: Set[str] = set()
+        engine = RecommendationEngine(TrackedDict(self.market_data, reads), {})
+        # Share per-snapshot structures (curve, rankers, allocator) with the plain engine
+        engine._snapshot_cache = self.engine.__dict__.setdefault('_snapshot_cache', {})
+        try:
+            engine.generate_recommendation(self.user_input(int(self.group_users[group][0])))
+        except NoEligibleInstrumentError:
+            pass  # every option was built, and its fields read, before none was found eligible
+
+        for path in self.dependencies[group]:
+            self.index[path].discard(group)
+        self.dependencies[group] = frozenset(reads)
+        for path in reads:
+            self.index.setdefault(path, set()).add(group)
+
+    def affected_groups(self, changes: Iterable[str]) -> Set[int]:
+        groups: Set[int] = set()
+        for change in changes:
+            for key in _dependency_keys(change):
+                groups.update(self.index.get(key, ()))
+        return groups
+
+    def affected_users(self, changes: Iterable[str]) -> np.ndarray:
+        groups = sorted(self.affected_groups(changes))
+        if not groups:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([self.group_users[g] for g in groups])
+
+    def score(self, users: Optional[Iterable[int]] = None) -> int:
+        """
+        Score `users` (default: the whole book) against the current snapshot;
+        a user eligible for no instrument gets None, as the batch paths give -1
+        """
+        users = range(len(self.book)) if users is None else users
+        count = 0
+        for user in users:
+            try:
+                recommendation = self.engine.generate_recommendation(self.user_input(int(user)))
+            except NoEligibleInstrumentError:
+                recommendation = None
+            self.recommendations[int(user)] = recommendation
+            count += 1
+        return count
+
+    def apply(self, market_data: Dict, changes: Optional[Set[str]] = None) -> np.ndarray:
+        """
+        Move to a new snapshot and re-score only the users it affects.
+        `changes` defaults to the diff against the current snapshot.
+        Returns the re-scored user indices.
+        """
+        if changes is None:
+            changes = snapshot_diff(self.market_data, market_data)
+        groups = sorted(self.affected_groups(changes))
+
+        self.market_data = market_data
+        self.engine = RecommendationEngine(market_data, {})
+        for group in groups:
+            self._track(group)  # a change can move a group onto different fields
+        users = (np.concatenate([self.group_users[g] for g in groups])
+                 if groups else np.empty(0, dtype=np.intp))
+        self.score(users)
+        return users
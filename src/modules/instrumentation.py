@@ -0,0 +1,230 @@
+"""
+Lightweight timing, counters and profiling hooks
+
+Instrumentation is switched on per process with environment variables:
+
+    FINAPP_METRICS=1                  collect latency histograms and counters
+    FINAPP_PROFILE=cprofile           capture a cProfile around profiling()
+    FINAPP_PROFILE=pyinstrument       same, using pyinstrument if installed
+    FINAPP_PROFILE_OUTPUT=<path>      where the capture is written
+
+When FINAPP_METRICS is unset, timed() returns the undecorated function and
+stage() returns a shared no-op context manager, so disabled instrumentation
+adds no per-call work.
+"""
+
+import contextlib
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+METRICS_ENABLED = os.environ.get('FINAPP_METRICS', '').lower() not in ('', '0', 'false', 'no')
+PROFILE_MODE = os.environ.get('FINAPP_PROFILE', '').lower()
+
+# Upper bounds in seconds, from 1us to 10s
+LATENCY_BUCKETS = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025,
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+HISTOGRAMS = {
+    'stage': ('finapp_stage_latency_seconds', 'stage', "Latency of instrumented stages"),
+    'fetch': ('finapp_fetch_duration_seconds', 'source', "Duration of market data fetches"),
+}
+
+_lock = threading.Lock()
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets"""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+_histograms: Dict[Tuple[str, str], Histogram] = {}
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+
+def observe(kind: str, label: str, seconds: float):
+    """Record a latency sample for a stage ('stage') or data source ('fetch')"""
+    with _lock:
+        histogram = _histograms.get((kind, label))
+        if histogram is None:
+            histogram = _histograms[(kind, label)] = Histogram()
+        histogram.observe(seconds)
+
+
+def increment(name: str, amount: float = 1.0, **labels):
+    """Increase a labelled counter"""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + amount
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup"""
+    if METRICS_ENABLED:
+        increment('finapp_cache_requests', cache=cache, result='hit' if hit else 'miss')
+
+
+def record_error(source: str, error: Optional[BaseException] = None):
+    """Count a failure in a data source or stage"""
+    if METRICS_ENABLED:
+        increment('finapp_errors', source=source,
+                  type=type(error).__name__ if error is not None else 'unknown')
+
+
+def timed(name: str, kind: str = 'stage'):
+    """Decorator recording the wrapped function's latency under `name`"""
+    def decorate(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(kind, name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+@contextlib.contextmanager
+def _timed_block(name: str, kind: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(kind, name, time.perf_counter() - started)
+
+
+def stage(name: str, kind: str = 'stage'):
+    """Context manager recording the latency of a block under `name`"""
+    if not METRICS_ENABLED:
+        return _NULL_CONTEXT
+    return _timed_block(name, kind)
+
+
+def cache_hit_rates() -> Dict[str, float]:
+    """Hit ratio per cache from the recorded counters"""
+    totals: Dict[str, list] = {}
+    for (name, labels), value in _counters.items():
+        if name != 'finapp_cache_requests':
+            continue
+        labels = dict(labels)
+        hits_total = totals.setdefault(labels['cache'], [0.0, 0.0])
+        hits_total[1] += value
+        if labels['result'] == 'hit':
+            hits_total[0] += value
+    return {cache: hits / total for cache, (hits, total) in totals.items() if total}
+
+
+def _format_labels(labels) -> str:
+    return ','.join(f'{key}="{value}"' for key, value in labels)
+
+
+def export_openmetrics() -> str:
+    """Render all metrics in the OpenMetrics text format"""
+    lines = []
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+
+    for kind, (metric, label_name, help_text) in HISTOGRAMS.items():
+        series = [(label, h) for (k, label), h in histograms if k == kind]
+        if not series:
+            continue
+        lines.append(f"# TYPE {metric} histogram")
+        lines.append(f"# HELP {metric} {help_text}")
+        for label, histogram in series:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_count{{{label_name}="{label}"}} {histogram.count}')
+            lines.append(f'{metric}_sum{{{label_name}="{label}"}} {histogram.total}')
+
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}_total{{{_format_labels(labels)}}} {value}")
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def _ensure_parent(path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def write_openmetrics(path: str):
+    """Write the current metrics to a file"""
+    _ensure_parent(path)
+    with open(path, 'w') as f:
+        f.write(export_openmetrics())
+
+
+def reset():
+    """Clear all recorded metrics"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+@contextlib.contextmanager
+def profiling(output: Optional[str] = None):
+    """Capture a profile of the enclosed block when FINAPP_PROFILE is set"""
+    if PROFILE_MODE not in ('cprofile', 'pyinstrument'):
+        yield
+        return
+
+    if PROFILE_MODE == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed; falling back to cProfile")
+        else:
+            output = output or os.environ.get('FINAPP_PROFILE_OUTPUT', os.path.join('data', 'profile.html'))
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                _ensure_parent(output)
+                with open(output, 'w') as f:
+                    f.write(profiler.output_html())
+                print(f"Profile written to {output}")
+            return
+
+    import cProfile
+    output = output or os.environ.get('FINAPP_PROFILE_OUTPUT', os.path.join('data', 'profile.prof'))
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _ensure_parent(output)
+        profiler.dump_stats(output)
+        print(f"Profile written to {output}")
@@ -0,0 +1,140 @@
+"""
+Rollover and ladder simulation for treasury bills and fixed deposits
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from . import expected_returns
+from .fd_allocator import FixedDepositAllocator
+from .instrumentation import timed
+
+# tenor in months -> market data key
+TREASURY_RUNGS = {3: '91_day_tb', 6: '182_day_tb', 12: '364_day_tb'}
+FIXED_DEPOSIT_RUNGS = {6: '6m', 12: '12m'}
+RUNGS = {'treasury': TREASURY_RUNGS, 'fixed_deposit': FIXED_DEPOSIT_RUNGS}
+
+
+@dataclass
+class LadderResult:
+    """Simulated outcome of a ladder held over a horizon"""
+    amount: float
+    horizon_months: int
+    weights: Dict[int, float]
+    final_values: np.ndarray  # one entry per path
+
+    def percentiles(self, q=(5, 50, 95)) -> Dict[int, float]:
+        return dict(zip(q, np.percentile(self.final_values, q).tolist()))
+
+    @property
+    def expected_value(self) -> float:
+        return float(self.final_values.mean())
+
+    def annualized_return(self, value: float) -> float:
+        """Annual return (percent) that turns `amount` into `value` over the horizon"""
+        return ((value / self.amount) ** (12 / self.horizon_months) - 1) * 100
+
+
+class RolloverSimulator:
+    """
+    Chains short instruments across a horizon under simulated rates.
+
+    The reference short rate follows a mean-reverting (Vasicek) process
+    sampled monthly. Each rung keeps today's spread over the reference
+    rate, locks in its rate at every rollover and compounds until the next
+    one; a final stub shorter than the tenor earns the last locked rate.
+    Fixed deposit rungs start from the blended rate the FD allocator gets
+    for the amount placed on them, as the engine quotes it. Rungs are
+    staggered: each splits into tenor / shortest tenor tranches whose
+    first purchases are a shortest tenor apart, waiting in the shortest
+    rung until then, so maturities and rate locks spread across the tenor
+    instead of all falling together. All paths are simulated together, so
+    cost grows with months and rollovers, not with the number of paths.
+    """
+
+    def __init__(self, market_data: Dict, kappa: float = 0.5, sigma: float = 2.0,
+                 long_run_rate: Optional[float] = None, seed: Optional[int] = None):
+        self.market_data = market_data
+        self.kappa = kappa  # speed of mean reversion, per year
+        self.sigma = sigma  # annual volatility of the short rate, percentage points
+        self.long_run_rate = long_run_rate
+        self.rng = np.random.default_rng(seed)
+
+    def rung_rates(self, instrument: str, amounts: Optional[Dict[int, float]] = None) -> Dict[int, float]:
+        """
+        Today's rate (percent) for each rollover tenor, keyed by months; fixed
+        deposits at the blended rate for the amount placed on each rung
+        (`amounts`, by tenor; the best bank's rate where none is given)
+        """
+        if instrument == 'treasury':
+            treasury = self.market_data['treasury']
+            return {months: treasury[key]['yield'] for months, key in TREASURY_RUNGS.items()}
+        if instrument == 'fixed_deposit':
+            allocator = FixedDepositAllocator(self.market_data['fixed_deposits'])
+            amounts = amounts or {}
+            return {months: float(expected_returns.fixed_deposit_returns(
+                        allocator, amounts.get(months, 0.0), months, decimals=None))
+                    for months in FIXED_DEPOSIT_RUNGS}
+        raise ValueError(f"Unknown ladder instrument: {instrument}")
+
+    def simulate_short_rates(self, start_rate: float, months: int, paths: int) -> np.ndarray:
+        """Monthly reference-rate paths, shape (paths, months), starting at start_rate"""
+        theta = start_rate if self.long_run_rate is None else self.long_run_rate
+        dt = 1 / 12
+        phi = np.exp(-self.kappa * dt)
+        # Exact discretisation of the Ornstein-Uhlenbeck step
+        if self.kappa > 0:
+            step_sd = self.sigma * np.sqrt((1 - phi ** 2) / (2 * self.kappa))
+        else:
+            step_sd = self.sigma * np.sqrt(dt)
+
+        shocks = self.rng.standard_normal((months, paths)) * step_sd
+        rates = np.empty((months, paths))
+        rates[0] = start_rate
+        for t in range(1, months):
+            rates[t] = theta + (rates[t - 1] - theta) * phi + shocks[t]
+        np.maximum(rates, 0.0, out=rates)
+        return rates.T
+
+    @timed('ladder.simulate')
+    def simulate(self, amount: float, horizon_months: int, instrument: str = 'treasury',
+                 weights: Optional[Dict[int, float]] = None, paths: int = 10_000) -> LadderResult:
+        """
+        Simulate `amount` split across rungs by `weights` (tenor months -> share)
+        and rolled over until `horizon_months`. Defaults to an equal split.
+        """
+        if instrument not in RUNGS:
+            raise ValueError(f"Unknown ladder instrument: {instrument}")
+        tenors = RUNGS[instrument]
+        if weights is None:
+            weights = {months: 1 / len(tenors) for months in tenors}
+        unknown = set(weights) - set(tenors)
+        if unknown:
+            raise ValueError(f"No {instrument} rung for tenors {sorted(unknown)}")
+        total = sum(weights.values())
+        weights = {months: share / total for months, share in weights.items()}
+        rates_today = self.rung_rates(instrument, {months: amount * share for months, share in weights.items()})
+
+        shortest = min(tenors)
+        reference = rates_today[shortest]
+        short_rates = self.simulate_short_rates(reference, horizon_months, paths)
+
+        final_values = np.zeros(paths)
+        for tenor, share in weights.items():
+            if not share:
+                continue
+            tranches = max(tenor // shortest, 1)
+            for tranche in range(tranches):
+                # Rolled in the shortest rung until this tranche's first purchase, then at its tenor
+                start = min(tranche * shortest, horizon_months)
+                roll_months = np.concatenate((np.arange(0, start, shortest), np.arange(start, horizon_months, tenor)))
+                terms = np.where(roll_months < start, shortest, tenor)
+                spreads = np.where(roll_months < start, 0.0, rates_today[tenor] - reference)
+                locked = np.maximum(short_rates[:, roll_months] + spreads, 0.0)
+                years = np.minimum(terms, horizon_months - roll_months) / 12
+                growth = np.exp(np.log1p(locked / 100) @ years)
+                final_values += amount * share / tranches * growth
+
+        return LadderResult(amount, horizon_months, weights, final_values)
@@ -0,0 +1,197 @@
+"""
+Kenyan business-day calendar for settlement, maturity and coupon dates
+"""
+
+import math
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+WEEKMASK = '1111100'  # Monday to Friday
+
+# (month, day) of holidays fixed by the Public Holidays Act
+FIXED_HOLIDAYS = [
+    (1, 1),    # New Year's Day
+    (5, 1),    # Labour Day
+    (6, 1),    # Madaraka Day
+    (10, 20),  # Mashujaa Day
+    (12, 12),  # Jamhuri Day
+    (12, 25),  # Christmas Day
+    (12, 26),  # Boxing Day
+]
+MAZINGIRA_DAY_FROM = 2024  # 10 October, a public holiday again from this year
+
+# Idd-ul-Fitr (1 Shawwal) is a statutory holiday, gazetted each year once the
+# moon is sighted. Other years take the tabular Islamic calendar's date, which
+# lands within a day of the sighting; correct a year to its gazette notice by
+# listing it here
+IDD_UL_FITR = [
+    '2020-05-25', '2021-05-13', '2022-05-03', '2023-04-21', '2024-04-10', '2025-03-31',
+    '2026-03-20', '2027-03-10', '2028-02-27', '2029-02-15', '2030-02-05',
+]
+IDD_UL_FITR_HIJRI = (10, 1)  # (month, day) in the Islamic year
+
+# Idd-ul-Azha is not a statutory holiday: like any other ad hoc declaration,
+# it is one only in the years the Interior Cabinet Secretary gazettes it, so
+# it is never computed; list the date of each gazette notice here
+IDD_UL_AZHA: List[str] = []
+
+# Tabular Islamic calendar: day 1 of year 1 (16 July 622 Julian) as a
+# proleptic Gregorian ordinal, and the Gregorian years per Islamic year
+HIJRI_EPOCH = date(622, 7, 19).toordinal()
+HIJRI_YEAR_IN_YEARS = 354.36667 / 365.2425
+
+FIRST_YEAR = 2015
+LAST_YEAR = 2075
+
+# CBK holds the weekly T-bill auction on Thursday; bills settle the following Monday
+AUCTION_WEEKDAY = 3
+
+
+def _easter(year: int) -> date:
+    """Western Easter Sunday (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def hijri_to_gregorian(year: int, month: int, day: int) -> date:
+    """Date of an Islamic calendar day, by the tabular (arithmetic) calendar with 11 leap years in 30"""
+    return date.fromordinal(HIJRI_EPOCH + (year - 1) * 354 + (3 + 11 * year) // 30
+                            + math.ceil(29.5 * (month - 1)) + day - 1)
+
+
+def idd_dates(first_year: int, last_year: int, hijri: Tuple[int, int], gazetted: Iterable[str] = ()) -> List[date]:
+    """
+    Every Idd (`hijri` = (month, day) of the Islamic year) falling from
+    first_year to last_year, some Gregorian years holding two: the gazetted
+    date where one is listed, the tabular date otherwise
+    """
+    gazetted = [date.fromisoformat(text) for text in gazetted]
+    first_hijri = int((first_year - 622) / HIJRI_YEAR_IN_YEARS)
+    last_hijri = int((last_year - 622) / HIJRI_YEAR_IN_YEARS) + 2
+    computed = [hijri_to_gregorian(year, *hijri) for year in range(first_hijri, last_hijri + 1)]
+    # A listed date stands in for the tabular one it corrects, never more than a few days out
+    days = {day for day in computed if all(abs((day - listed).days) > 3 for listed in gazetted)} | set(gazetted)
+    return sorted(day for day in days if first_year <= day.year <= last_year)
+
+
+def kenyan_holidays(first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR) -> List[date]:
+    """Public holidays from first_year to last_year, with Sunday holidays observed on Monday"""
+    holidays = set()
+    for year in range(first_year, last_year + 1):
+        days = [date(year, month, day) for month, day in FIXED_HOLIDAYS]
+        if year >= MAZINGIRA_DAY_FROM:
+            days.append(date(year, 10, 10))
+        easter = _easter(year)
+        days += [easter - timedelta(days=2), easter + timedelta(days=1)]  # Good Friday, Easter Monday
+        for day in days:
+            holidays.add(day)
+            if day.weekday() == 6:
+                holidays.add(day + timedelta(days=1))
+        if date(year, 12, 25).weekday() == 6:
+            holidays.add(date(year, 12, 27))  # Christmas observed on Monday pushes Boxing Day on
+    azha = [day for day in map(date.fromisoformat, IDD_UL_AZHA) if first_year <= day.year <= last_year]
+    for day in idd_dates(first_year, last_year, IDD_UL_FITR_HIJRI, IDD_UL_FITR) + azha:
+        holidays.add(day + timedelta(days=1) if day.weekday() == 6 else day)
+    return sorted(holidays)
+
+
+def _days(dates) -> np.ndarray:
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+def add_months(dates, months) -> np.ndarray:
+    """Same day `months` calendar months later, clamped to month end; broadcasts"""
+    dates = _days(dates)
+    start_month = dates.astype('datetime64[M]')
+    day = dates - start_month.astype('datetime64[D]')
+    month = start_month + np.asarray(months, dtype=np.int64)
+    month_start = month.astype('datetime64[D]')
+    month_length = (month + 1).astype('datetime64[D]') - month_start
+    return month_start + np.minimum(day, month_length - 1)
+
+
+class MarketCalendar:
+    """
+    Business days in Kenya as a numpy busdaycalendar: weekdays less public
+    holidays. Every method takes arrays of dates (and tenors) and broadcasts,
+    so a whole book's dates are computed in one call. Dates that fall on a
+    non-business day move to the next one ("following").
+    """
+
+    def __init__(self, first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR,
+                 extra_holidays: Iterable = ()):
+        holidays = np.array(kenyan_holidays(first_year, last_year) + list(extra_holidays), dtype='datetime64[D]')
+        self.calendar = np.busdaycalendar(weekmask=WEEKMASK, holidays=holidays)
+
+    @property
+    def holidays(self) -> np.ndarray:
+        return self.calendar.holidays
+
+    def is_business_day(self, dates) -> np.ndarray:
+        return np.is_busday(_days(dates), busdaycal=self.calendar)
+
+    def roll_forward(self, dates) -> np.ndarray:
+        return np.busday_offset(_days(dates), 0, roll='forward', busdaycal=self.calendar)
+
+    def add_business_days(self, dates, days) -> np.ndarray:
+        """`days` business days after each date (rolled forward first if it is not one)"""
+        return np.busday_offset(_days(dates), days, roll='forward', busdaycal=self.calendar)
+
+    def business_days_between(self, start, end) -> np.ndarray:
+        return np.busday_count(_days(start), _days(end), busdaycal=self.calendar)
+
+    def maturity_dates(self, start_dates, months=None, days=None) -> np.ndarray:
+        """Start plus a tenor in calendar months or days, moved to a business day"""
+        if (months is None) == (days is None):
+            raise ValueError("Give exactly one of months or days")
+        if months is not None:
+            end = add_months(start_dates, months)
+        else:
+            end = _days(start_dates) + np.asarray(days, dtype='timedelta64[D]')
+        return self.roll_forward(end)
+
+    def auction_dates(self, dates) -> np.ndarray:
+        """Next T-bill auction on or after each date; a Thursday holiday moves it to the business day before"""
+        dates = _days(dates)
+        weekday = (dates.astype(np.int64) - 4) % 7  # 1970-01-05 was a Monday
+        thursday = dates + ((AUCTION_WEEKDAY - weekday) % 7).astype('timedelta64[D]')
+        return np.busday_offset(thursday, 0, roll='backward', busdaycal=self.calendar)
+
+    def settlement_dates(self, auction_dates) -> np.ndarray:
+        """Value date of bills bought at each auction: the following Monday, or the next business day"""
+        auction = _days(auction_dates)
+        weekday = (auction.astype(np.int64) - 4) % 7
+        monday = auction + (7 - weekday).astype('timedelta64[D]')
+        return self.roll_forward(monday)
+
+    def treasury_bill_dates(self, trade_dates, tenor_days) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(auction, settlement, maturity) for bills bid for on or after each trade date"""
+        auction = self.auction_dates(trade_dates)
+        settlement = self.settlement_dates(auction)
+        return auction, settlement, self.maturity_dates(settlement, days=tenor_days)
+
+    def coupon_dates(self, issue_dates, years: int, frequency: int = 2) -> np.ndarray:
+        """Coupon dates, shape (issues, years * frequency), each rolled to a business day"""
+        issue = _days(issue_dates).reshape(-1, 1)
+        offsets = np.arange(1, years * frequency + 1) * (12 // frequency)
+        return self.roll_forward(add_months(issue, offsets))
+
+
+_default: Optional[MarketCalendar] = None
+
+
+def default_calendar() -> MarketCalendar:
+    """Calendar for FIRST_YEAR..LAST_YEAR, built once per process"""
+    global _default
+    if _default is None:
+        _default = MarketCalendar()
+    return _default
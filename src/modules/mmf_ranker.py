@@ -0,0 +1,90 @@
+"""
+Money market fund and REIT ranking by net yield for a given amount
+"""
+
+import bisect
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+@dataclass
+class FundQuote:
+    """A fund's net yield and projected value for one amount and horizon"""
+    fund: str
+    gross_yield: float
+    management_fee: float
+    net_yield: float
+    min_investment: float
+    projected_value: float
+
+    @property
+    def display_name(self) -> str:
+        return self.fund.replace('_', ' ').title().replace('Mmf', 'MMF')
+
+
+class MoneyMarketRanker:
+    """
+    Sorted index over a snapshot's money market funds.
+
+    Funds are ordered by minimum investment, so the funds open to an amount
+    are always a prefix of that order. The best `max_k` funds by net yield
+    are precomputed for every prefix; a lookup is then a bisect on the
+    minimums plus a list read.
+    """
+
+    def __init__(self, funds: Dict, max_k: int = 5):
+        self.max_k = max_k
+        entries = sorted(
+            (data['min_investment'], name, data['yield'], data.get('management_fee', 0.0))
+            for name, data in funds.items()
+        )
+        self._minimums = [entry[0] for entry in entries]
+        self._best = None
+        self._entries = entries
+
+        # _top[i]: best max_k funds among the first i by minimum, best first
+        self._top: List[List[tuple]] = [[]]
+        best: List[tuple] = []
+        for minimum, name, gross, fee in entries:
+            best = heapq.nlargest(max_k, best + [(round(gross - fee, 4), name, gross, fee, minimum)])
+            self._top.append(best)
+
+    def best_net_yields(self, amounts):
+        """Best net yield open to each amount in an array; NaN where no fund is open"""
+        import numpy as np
+
+        if self._best is None:
+            self._best = (np.array(self._minimums, dtype=float),
+                          np.array([top[0][0] if top else np.nan for top in self._top]))
+        minimums, best = self._best
+        return best[np.searchsorted(minimums, amounts, side='right')]
+
+    def eligible_count(self, amount: float) -> int:
+        """Number of funds whose minimum investment `amount` meets"""
+        return bisect.bisect_right(self._minimums, amount)
+
+    def top_funds(self, amount: float, months: int, k: int = 3) -> List[FundQuote]:
+        """Best `k` funds open to `amount`, with net-of-fee projections over `months`"""
+        eligible = self.eligible_count(amount)
+        if k <= self.max_k:
+            ranked = self._top[eligible][:k]
+        else:
+            ranked = heapq.nlargest(k, ((round(gross - fee, 4), name, gross, fee, minimum)
+                                        for minimum, name, gross, fee in self._entries[:eligible]))
+        years = months / 12
+        return [
+            FundQuote(name, gross, fee, net, minimum, amount * (1 + net / 100) ** years)
+            for net, name, gross, fee, minimum in ranked
+        ]
+
+
+def reit_ranker(reits: Dict) -> MoneyMarketRanker:
+    """Ranker over REITs, scoring each by distribution yield plus the six-month price change compounded to a year"""
+    return MoneyMarketRanker({
+        key: {
+            'yield': reit['dividend_yield'] + ((1 + reit.get('change_6m', 0.0) / 100) ** 2 - 1) * 100,
+            'min_investment': reit.get('min_investment', 0),
+            'management_fee': reit.get('management_fee', 0.0),
+        } for key, reit in reits.items()
+    })
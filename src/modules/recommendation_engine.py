@@ -2,9 +2,78 @@
 Investment recommendation engine for Kenya
 """
 
-from typing import Dict, List, Tuple
+import functools
+import importlib
+from typing import Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from .circuit_breaker import MarketDataUnavailableError
+from .instrumentation import stage, timed
+from .settings import get_settings, on_change
+
+# Market data sections every recommendation reads; equities also need 'nse'
+REQUIRED_SECTIONS = ('treasury', 'money_market', 'fixed_deposits', 'macro')
+
+# Built options kept per snapshot section before the cache is reset
+OPTION_CACHE_SIZE = 256
+_MISSING = object()
+
+# Settings that objects and options cached per market data section are built from
+SECTION_SETTINGS = {
+    'treasury': ('min_investment_treasury',),
+    'money_market': ('min_investment_mmf',),
+    'fixed_deposits': ('min_investment_fd', 'dcdc_max_coverage_per_bank'),
+    'nse': ('min_investment_equity',),
+}
+# Bumped when a section's settings change, invalidating what was cached for it
+_settings_generation = dict.fromkeys(SECTION_SETTINGS, 0)
+
+
+def _invalidate_sections(changed):
+    for section, names in SECTION_SETTINGS.items():
+        if changed.intersection(names):
+            _settings_generation[section] += 1
+
+
+on_change(_invalidate_sections, [name for names in SECTION_SETTINGS.values() for name in names])
+
+
+class NoEligibleInstrumentError(ValueError):
+    """Raised when a profile can hold none of the instruments offered to its risk appetite"""
+
+    def __init__(self, amount: float, months: int, risk_appetite: str):
+        self.amount = amount
+        self.months = months
+        self.risk_appetite = risk_appetite
+        super().__init__(f"No eligible instrument for KES {amount:,.0f} over {months} months "
+                         f"at {risk_appetite} risk; every option's minimum investment is higher")
+
+
+def memoized_option(section: str, key: Callable):
+    """
+    Cache an option builder's result per snapshot of `section`, keyed by
+    key(engine, user_input). Only for builders that read nothing but that
+    section and the key's inputs; the cached Investment is shared, so treat
+    it as read-only.
+    """
+    def decorate(build):
+        @functools.wraps(build)
+        def wrapper(self, user_input: Dict):
+            data = self.market_data.get(section)
+            caches = self.__dict__.setdefault('_option_cache', {})
+            generation = _settings_generation.get(section)
+            entry = caches.get(build.__name__)
+            if (entry is None or entry[0] is not data or entry[2] != generation
+                    or len(entry[1]) >= OPTION_CACHE_SIZE):
+                entry = caches[build.__name__] = (data, {}, generation)
+            cache_key = key(self, user_input)
+            option = entry[1].get(cache_key, _MISSING)
+            if option is _MISSING:
+                option = entry[1][cache_key] = build(self, user_input)
+            return option
+        return wrapper
+    return decorate
+
 @dataclass
 class Investment:
     """Represents an investment option with details"""
@@ -32,31 +101,223 @@ class RecommendationEngine:
         final_value = initial * ((1 + annual_return) ** periods)
         return final_value
     
+    def _per_snapshot(self, section: str, module: str, factory: str, record: bool = True):
+        """
+        `factory` from `module` applied to one market data section, rebuilt only
+        when that section is replaced or its settings change. The module is
+        imported on first build.
+        """
+        data = self.market_data[section]
+        if type(data) is not dict:
+            # Dependency-tracked snapshot (see incremental.py): the built object
+            # may read anything in the section unless the caller records narrower reads
+            if record:
+                data.record_subtree()
+            data = data.untracked
+        cache = self.__dict__.setdefault('_snapshot_cache', {})
+        generation = _settings_generation.get(section)
+        cached = cache.get(section)
+        if cached is None or cached[0] is not data or cached[2] != generation:
+            build = getattr(importlib.import_module(f'.{module}', __package__), factory)
+            cached = cache[section] = (data, build(data), generation)
+        return cached[1]
+    
+    @property
+    def yield_curve(self):
+        """Treasury yield curve for the current snapshot (built once, then cached)"""
+        return self._per_snapshot('treasury', 'yield_curve', 'curve_for_snapshot', record=False)
+    
+    def treasury_yields(self, months):
+        """Curve yields (percent) for an array of horizons in months, in one vectorized call"""
+        return self.yield_curve.yield_at_months(months)
+    
+    def allocate_fixed_deposit(self, amount: float, term: str):
+        """Per-bank fixed deposit plan for `amount` at `term` ('6m' or '12m')"""
+        return self._per_snapshot('fixed_deposits', 'fd_allocator', 'FixedDepositAllocator').allocate(amount, term)
+    
+    @property
+    def _money_market_ranker(self):
+        return self._per_snapshot('money_market', 'mmf_ranker', 'MoneyMarketRanker')
+    
+    @property
+    def _reit_ranker(self):
+        return self._per_snapshot('reits', 'mmf_ranker', 'reit_ranker')
+    
+    def rank_money_market_funds(self, amount: float, months: int, k: int = 3):
+        """Best `k` money market funds open to `amount`, with net-of-fee projections"""
+        return self._money_market_ranker.top_funds(amount, months, k)
+    
+    def rank_reits(self, amount: float, months: int, k: int = 3):
+        """Best `k` REITs open to `amount`, by distribution yield plus price change"""
+        return self._reit_ranker.top_funds(amount, months, k)
+    
+    def build_equity_basket(self, amount: float, max_holdings: int = 5):
+        """Diversified basket of whole NSE board lots for `amount`"""
+        return self._per_snapshot('nse', 'equity_basket', 'EquityBasketBuilder').build(amount, max_holdings)
+    
+    def simulate_rollover(self, user_input: Dict, instrument: str = 'treasury',
+                          weights: Dict[int, float] = None, paths: int = 10_000) -> Dict:
+        """Worst/base/best outcomes (5th/50th/95th percentile) of rolling bills or FDs over the horizon"""
+        from .ladder_simulator import RolloverSimulator
+        amount = user_input['amount']
+        result = RolloverSimulator(self.market_data).simulate(
+            amount, user_input['duration_months'], instrument, weights, paths)
+        percentiles = result.percentiles((5, 50, 95))
+        return {
+            name: {
+                'return_percent': result.annualized_return(percentiles[q]),
+                'final_value': percentiles[q],
+            } for name, q in (('worst_case', 5), ('base_case', 50), ('best_case', 95))
+        }
+    
+    @property
+    def goal_solver(self):
+        """Goal solver for the current snapshot (built once, then cached)"""
+        market_data = getattr(self.market_data, 'untracked', self.market_data)
+        # Its FD allocator follows DCDC cover, and its rate tables span the longest horizon
+        generation = (_settings_generation['fixed_deposits'], get_settings().max_investment_duration_months)
+        cached = self.__dict__.get('_goal_solver')
+        if cached is None or cached[0] is not market_data or cached[2] != generation:
+            solver = importlib.import_module('.goal_solver', __package__).GoalSolver(market_data)
+            cached = self._goal_solver = (market_data, solver, generation)
+        return cached[1]
+    
+    def required_amounts(self, targets, months, risk_appetites, percentile: Optional[float] = None):
+        """
+        Amount (KES) each goal needs to grow to its target in `months` in the
+        instrument recommended for it. Scalars and arrays broadcast;
+        `percentile` (e.g. 5) asks for the target at that percentile of outcomes.
+        """
+        return self.goal_solver.required_amounts(targets, months, risk_appetites, percentile)
+    
+    def required_durations(self, targets, amounts, risk_appetites, percentile: Optional[float] = None):
+        """Whole months each amount needs to reach its target (NaN if out of reach); see required_amounts"""
+        return self.goal_solver.required_durations(targets, amounts, risk_appetites, percentile)
+    
+    def project_contributions(self, user_input: Dict, monthly_contribution: float,
+                              recommendation: Optional[Dict] = None) -> Dict:
+        """
+        Savings plan of `amount` now plus `monthly_contribution` at the start of
+        every month, for the recommended option and each alternative
+        """
+        contributions = importlib.import_module('.contributions', __package__)
+        recommendation = recommendation or self.generate_recommendation(user_input)
+        options = [recommendation['primary_recommendation']] + recommendation['alternatives']
+        months = user_input['duration_months']
+        schedule = [user_input['amount'] + monthly_contribution] + [monthly_contribution] * (months - 1)
+        projection = contributions.project_schedule(
+            [schedule] * len(options),
+            [option['expected_return'] for option in options],
+            [contributions.CREDIT_PERIOD_MONTHS[contributions.CATEGORY_INSTRUMENTS[option['category']]]
+             for option in options],
+        )
+        return {
+            'monthly_contribution': monthly_contribution,
+            'total_contributed': float(projection.contributions[0]),
+            'plans': [
+                {
+                    'instrument': option['instrument'],
+                    'expected_return': option['expected_return'],
+                    'final_value': float(projection.final_values[i]),
+                    'earnings': float(projection.earnings[i]),
+                    'balances': projection.balances[i].tolist(),
+                } for i, option in enumerate(options)
+            ],
+        }
+    
+    def project_savings_plans(self, initial, monthly, months, risk_appetites):
+        """Closed-form plan values for batches of users, each in the instrument recommended to them"""
+        contributions = importlib.import_module('.contributions', __package__)
+        return contributions.primary_plan_values(self.goal_solver.returns, initial, monthly, months, risk_appetites)
+    
+    def net_projections(self, amounts, months):
+        """
+        Outcomes after trading costs, fees and early-break penalties for every
+        user (rows) in every instrument (columns), in one batched call
+        """
+        costs = importlib.import_module('.costs', __package__)
+        return costs.book_projection(self.goal_solver.returns, amounts, months)
+    
+    def rank_instruments(self, amounts, months, risk_appetites, k: int = 3):
+        """
+        Best `k` instruments (indices into stress_testing.INSTRUMENTS, -1 past
+        the eligible ones) and their suitability scores for every user, in one
+        batched call
+        """
+        suitability = importlib.import_module('.suitability', __package__)
+        return suitability.rank_book(self.goal_solver.returns, amounts, months, risk_appetites, k)
+    
+    def sensitivities(self, amounts, months, risk_appetites):
+        """
+        How every user's final value and real return in their recommended
+        instrument move with each market data input, in one batched call
+        """
+        sensitivity = importlib.import_module('.sensitivity', __package__)
+        return sensitivity.book_sensitivities(self.goal_solver.returns, amounts, months, risk_appetites)
+    
+    def recommendation_sensitivities(self, user_input: Dict, recommendation: Optional[Dict] = None):
+        """
+        How the primary recommendation's final value and real return move with
+        each market data input; `.rows(0)` ranks them, biggest effect first
+        """
+        sensitivity = importlib.import_module('.sensitivity', __package__)
+        contributions = importlib.import_module('.contributions', __package__)
+        recommendation = recommendation or self.generate_recommendation(user_input)
+        primary = recommendation['primary_recommendation']
+        instrument = sensitivity.INSTRUMENTS.index(contributions.CATEGORY_INSTRUMENTS[primary['category']])
+        return sensitivity.SensitivityAnalyzer(self.goal_solver.returns).analyze(
+            user_input['amount'], user_input['duration_months'], instrument, primary['expected_return'])
+    
+    def maturity_dates(self, start_dates, months=None, days=None):
+        """Business-day maturities (Kenyan calendar) for arrays of start dates and tenors in months or days"""
+        calendar = importlib.import_module('.market_calendar', __package__).default_calendar()
+        return calendar.maturity_dates(start_dates, months=months, days=days)
+    
+    @timed('engine.treasury_option')
+    @memoized_option('treasury', lambda self, user_input: (
+        user_input['duration_months'], self.market_data['macro']['inflation_rate']))
     def generate_treasury_option(self, user_input: Dict) -> Investment:
         """Generate Treasury Bill/Bond recommendation"""
         months = user_input['duration_months']
+        returns = importlib.import_module('.expected_returns', __package__)
         
         # Select appropriate treasury instrument based on duration
         if months <= 3:
-            yield_rate = self.market_data['treasury']['91_day_tb']['yield']
             instrument = "91-Day Treasury Bill"
         elif months <= 6:
-            yield_rate = self.market_data['treasury']['182_day_tb']['yield']
             instrument = "182-Day Treasury Bill"
         elif months <= 12:
-            yield_rate = self.market_data['treasury']['364_day_tb']['yield']
             instrument = "364-Day Treasury Bill"
         else:
-            yield_rate = self.market_data['treasury']['2_year_bond']['yield']
-            instrument = "2-Year Treasury Bond"
+            instrument = f"{round(months / 12, 1):g}-Year Treasury Bond"
+        
+        curve = None
+        if months > returns.BILL_MONTHS:
+            # Longer horizons are priced off the fitted curve, not the nearest bucket
+            curve = self.yield_curve
+            record_reads = getattr(self.market_data, 'record_reads', None)
+            if record_reads is not None:
+                record_reads(f"treasury.{key}.yield" for key in curve.support(months / 12))
+        yield_rate = float(returns.treasury_yields(self.market_data['treasury'], curve, months))
+        expected_return = float(returns.coupon_compounded(yield_rate, months))
+        
+        pros, cons = [], []
+        if months > returns.BILL_MONTHS:
+            # Bonds pay the yield as semi-annual coupons; reinvesting them
+            # compounds twice a year, and resale is exposed to rate moves
+            from .bond_pricing import par_bond  # keeps numpy out of CLI startup
+            bond = par_bond(yield_rate, months / 12)
+            pros = [f"Pays a coupon every six months (KES {bond.coupon_per_100:,.2f} per KES 100)"]
+            cons = [f"Selling early: a 1-point rise in yields cuts the price by about "
+                    f"{bond.modified_duration - bond.convexity / 200:.1f}%"]
         
         return Investment(
             name=instrument,
             category="Government Securities",
-            expected_return_percent=yield_rate,
+            expected_return_percent=expected_return,
             risk_rating="Low",
             liquidity="Medium",
-            min_investment=100,
+            min_investment=get_settings().min_investment_treasury,
             duration_fit=f"{months}m",
             pros=[
                 "Capital preservation guaranteed",
@@ -64,17 +325,25 @@ class RecommendationEngine:
                 "Fixed, predictable returns",
                 "Tax-advantaged (interest exempt from income tax)",
                 "Can be sold in secondary market",
-            ],
+            ] + pros,
             cons=[
                 f"Return ({yield_rate}%) may not exceed inflation ({self.market_data['macro']['inflation_rate']}%)",
                 "Less liquidity than bank deposits",
                 "Moderate effort to purchase (auctions, tenders)",
-            ]
+            ] + cons
         )
     
+    @timed('engine.money_market_option')
+    @memoized_option('money_market', lambda self, user_input: self._money_market_ranker.eligible_count(user_input['amount']))
     def generate_money_market_option(self, user_input: Dict) -> Investment:
         """Generate Money Market Fund recommendation"""
-        avg_mmf_yield = sum([fund['yield'] for fund in self.market_data['money_market'].values()]) / len(self.market_data['money_market'])
+        top = self.rank_money_market_funds(user_input['amount'], user_input['duration_months'], k=1)
+        avg_mmf_yield = float(importlib.import_module('.expected_returns', __package__).money_market_returns(
+            self._money_market_ranker, self.market_data['money_market'], user_input['amount']))
+        pick = []
+        if top:
+            pick = [f"Best fund for this amount: {top[0].display_name} "
+                    f"({avg_mmf_yield}% net of {top[0].management_fee}% fee)"]
         
         return Investment(
             name="Money Market Fund",
@@ -82,7 +351,7 @@ class RecommendationEngine:
             expected_return_percent=avg_mmf_yield,
             risk_rating="Low-Medium",
             liquidity="High",
-            min_investment=1000,
+            min_investment=get_settings().min_investment_mmf,
             duration_fit="6m-12m",
             pros=[
                 "Excellent liquidity - withdraw anytime",
@@ -90,7 +359,7 @@ class RecommendationEngine:
                 "Professional fund management",
                 "Easy online investing via fund platforms",
                 "Instant diversification",
-            ],
+            ] + pick,
             cons=[
                 "Returns fluctuate slightly",
                 "Initial minimum investment required",
@@ -99,23 +368,22 @@ class RecommendationEngine:
             ]
         )
     
+    @timed('engine.fixed_deposit_option')
+    @memoized_option('fixed_deposits', lambda self, user_input: (user_input['amount'], user_input['duration_months']))
     def generate_fixed_deposit_option(self, user_input: Dict) -> Investment:
         """Generate Fixed Deposit recommendation"""
         months = user_input['duration_months']
+        returns = importlib.import_module('.expected_returns', __package__)
+        allocator = self._per_snapshot('fixed_deposits', 'fd_allocator', 'FixedDepositAllocator')
         
-        # Get appropriate FD rate based on duration
-        if months <= 6:
-            fd_rate_key = '6m'
-        else:
-            fd_rate_key = '12m'
-        
-        # Use average of top bank rates
-        rates = []
-        for bank, rates_dict in self.market_data['fixed_deposits'].items():
-            if fd_rate_key in rates_dict:
-                rates.append(rates_dict[fd_rate_key])
-        
-        avg_fd_rate = sum(rates) / len(rates) if rates else 15.8
+        # Best-rate banks for the term, split to stay within DCDC cover
+        fd_rate_key = returns.fixed_deposit_term(months)
+        avg_fd_rate = float(returns.fixed_deposit_returns(allocator, user_input['amount'], months))
+        try:
+            banks = len(self.allocate_fixed_deposit(user_input['amount'], fd_rate_key).allocations)
+        except ValueError:
+            banks = 1
+        settings = get_settings()
         
         return Investment(
             name=f"Fixed Deposit ({fd_rate_key})",
@@ -123,15 +391,15 @@ class RecommendationEngine:
             expected_return_percent=avg_fd_rate,
             risk_rating="Low",
             liquidity="Low",
-            min_investment=10000,
+            min_investment=settings.min_investment_fd,
             duration_fit=f"{months}m",
             pros=[
-                "Capital fully protected (DCDC guarantee up to 100K)",
+                f"Capital fully protected (DCDC guarantee up to KES {settings.dcdc_max_coverage_per_bank:,})",
                 "Fixed, guaranteed returns",
                 "Easy to set up via bank/digital platforms",
                 "Suitable for specific goals with fixed timeline",
                 f"Current rates at {avg_fd_rate}% are attractive",
-            ],
+            ] + ([f"Split across {banks} banks to keep every deposit within DCDC cover"] if banks > 1 else []),
             cons=[
                 "Very low liquidity - locked for tenure",
                 "Early withdrawal incurs penalties",
@@ -141,34 +409,84 @@ class RecommendationEngine:
             ]
         )
     
+    @timed('engine.equity_option')
+    @memoized_option('nse', lambda self, user_input: user_input['amount'])
     def generate_equity_option(self, user_input: Dict) -> Investment:
         """Generate NSE Equity/ETF recommendation"""
-        nse_6m_return = self.market_data['nse']['nse_20_index']['6m_return']
+        # Price the option off a board-lot basket the amount can actually buy
+        builder = self._per_snapshot('nse', 'equity_basket', 'EquityBasketBuilder')
+        equity_return = float(importlib.import_module('.expected_returns', __package__).equity_returns(
+            builder, self.market_data['nse'], user_input['amount']))
+        basket = builder.build(user_input['amount'])
+        if basket.holdings:
+            holdings = ", ".join(f"{h.shares:,} {h.ticker}" for h in basket.holdings)
+            basket_notes = [f"Suggested basket: {holdings} (KES {basket.cash:,.0f} left in cash)"]
+            basket_risks = [f"Basket volatility ~{basket.volatility:.1f}% a year"]
+        else:
+            basket_notes, basket_risks = [], ["Amount is below one board lot of the listed blue chips"]
+        min_investment = importlib.import_module('.suitability', __package__).equity_minimum(builder)
         
         return Investment(
             name="NSE Blue-Chip Portfolio (ETF/Direct)",
             category="NSE Equities",
-            expected_return_percent=nse_6m_return,
+            expected_return_percent=equity_return,
             risk_rating="High",
             liquidity="High",
-            min_investment=100,
+            min_investment=min_investment,
             duration_fit="6m+",
             pros=[
-                f"Strong potential returns (~{nse_6m_return}% in 6 months)",
+                f"Strong potential returns (~{equity_return}% a year)",
                 "Excellent liquidity in blue-chip stocks",
                 "Dividend income (3-4% yield)",
                 "Inflation hedge",
-                "Low barriers to entry (100KES minimum)",
-            ],
+                f"Low barriers to entry (KES {min_investment:,.0f} minimum)",
+            ] + basket_notes,
             cons=[
                 "High volatility risk",
                 "Requires active monitoring",
                 "Dependent on market sentiment & politics",
                 "Can see 15-30% swings in 6 months",
                 "Requires investment knowledge",
+            ] + basket_risks
+        )
+    
+    @timed('engine.reit_option')
+    @memoized_option('reits', lambda self, user_input: (
+        self._reit_ranker.eligible_count(user_input['amount']) if self.market_data.get('reits') else 0))
+    def generate_reit_option(self, user_input: Dict) -> Optional[Investment]:
+        """Generate REIT recommendation; None when no REIT is open to the amount"""
+        reits = self.market_data.get('reits')
+        if not reits:
+            return None
+        top = self.rank_reits(user_input['amount'], user_input['duration_months'], k=1)
+        if not top:
+            return None
+        reit = reits[top[0].fund]
+        total_return = float(importlib.import_module('.expected_returns', __package__).reit_returns(
+            self._reit_ranker, user_input['amount']))
+        
+        return Investment(
+            name=f"REIT: {reit.get('name', top[0].display_name)}",
+            category="Real Estate Investment Trusts",
+            expected_return_percent=total_return,
+            risk_rating="Medium",
+            liquidity="Medium",
+            min_investment=reit.get('min_investment', 0),
+            duration_fit="24m+",
+            pros=[
+                f"Regular distributions (~{reit['dividend_yield']}% yield)",
+                "Exposure to income-producing property without buying it outright",
+                "Partial inflation hedge",
+                "Diversifies away from bank and government credit",
+            ],
+            cons=[
+                "Thin trading on the NSE; exits can take days",
+                "Valuations fall when interest rates rise",
+                "Few listed REITs, so concentration is high",
             ]
         )
     
+    @timed('engine.generate_recommendation')
     def generate_recommendation(self, user_input: Dict) -> Dict:
         """
         Generate recommendation based on user profile
@@ -177,51 +495,74 @@ class RecommendationEngine:
         amount = user_input['amount']
         duration = user_input['duration_months']
         risk = user_input['risk_appetite'].lower()
+        get_settings()  # picks up config.ini edits, invalidating dependent caches, before any are read
         
-        # Generate all options
-        all_options = [
-            self.generate_treasury_option(user_input),
-            self.generate_money_market_option(user_input),
-            self.generate_fixed_deposit_option(user_input),
-        ]
+        required = REQUIRED_SECTIONS if risk == 'low' else REQUIRED_SECTIONS + ('nse',)
+        missing = [section for section in required if not self.market_data.get(section)]
+        if missing:
+            raise MarketDataUnavailableError(missing, self.market_data.get('errors'))
         
-        # Add equity option if risk appetite allows
-        if risk in ['medium', 'high']:
-            all_options.append(self.generate_equity_option(user_input))
-        
-        # Recommend based on risk appetite
+        # Candidates for the risk appetite, its usual primary first
         if risk == 'low':
             # Capital preservation
-            recommended = self.generate_treasury_option(user_input)
-            alternatives = [
+            candidates = [
+                self.generate_treasury_option(user_input),
                 self.generate_fixed_deposit_option(user_input),
                 self.generate_money_market_option(user_input),
             ]
         elif risk == 'medium':
             # Balanced approach - mix of safety and returns
-            recommended = self.generate_money_market_option(user_input)
-            alternatives = [
+            candidates = [
+                self.generate_money_market_option(user_input),
                 self.generate_fixed_deposit_option(user_input),
                 self.generate_equity_option(user_input),
             ]
         else:  # high
             # Aggressive growth
-            recommended = self.generate_equity_option(user_input)
-            alternatives = [
+            candidates = [
+                self.generate_equity_option(user_input),
                 self.generate_money_market_option(user_input),
             ]
         
+        if risk != 'low':
+            reit = self.generate_reit_option(user_input)
+            if reit is not None:
+                candidates.append(reit)
+        
+        # Drop options the amount cannot buy and order the rest by suitability
+        with stage('engine.suitability'):
+            order = importlib.import_module('.suitability', __package__).rank_options(
+                amount, duration, risk, tuple(option.category for option in candidates),
+                tuple(option.expected_return_percent for option in candidates),
+                tuple(option.min_investment for option in candidates),
+                self.market_data['macro']['inflation_rate'])
+            if not order:
+                raise NoEligibleInstrumentError(amount, duration, risk)
+            recommended, *alternatives = [candidates[i] for i in order]
+        
         # Calculate scenarios
-        base_return = recommended.expected_return_percent
-        final_value = self.calculate_final_value(amount, base_return, duration)
-        earnings = final_value - amount
+        with stage('engine.scenarios'):
+            base_return = recommended.expected_return_percent
+            final_value = self.calculate_final_value(amount, base_return, duration)
+            earnings = final_value - amount
         
-        # Best/Worst case scenarios (±5% variance for equities, ±2% for fixed income)
-        variance = 5 if 'Equity' in recommended.name else 2
-        best_return = base_return + variance
-        worst_return = base_return - variance
-        best_value = self.calculate_final_value(amount, best_return, duration)
-        worst_value = self.calculate_final_value(amount, worst_return, duration)
+            # Best/Worst case scenarios (±5% variance for equities, ±2% for fixed income)
+            variance = 5 if 'Equity' in recommended.name else 2
+            best_return = base_return + variance
+            worst_return = base_return - variance
+            best_value = self.calculate_final_value(amount, best_return, duration)
+            worst_value = self.calculate_final_value(amount, worst_return, duration)
+        
+        with stage('engine.costs'):
+            options = [recommended] + alternatives
+            net = importlib.import_module('.costs', __package__).option_costs(
+                amount, duration, tuple(option.category for option in options),
+                tuple(option.expected_return_percent for option in options))
+            net_fields = [
+                {'net_return': net_return, 'net_final_value': net_value, 'costs': costs,
+                 'break_even_months': break_even}
+                for net_return, net_value, costs, break_even in net
+            ]
         
         return {
             'primary_recommendation': {
@@ -235,6 +576,7 @@ class RecommendationEngine:
                 'duration_fit': recommended.duration_fit,
                 'pros': recommended.pros,
                 'cons': recommended.cons,
+                **net_fields[0],
             },
             'alternatives': [
                 {
@@ -244,7 +586,8 @@ class RecommendationEngine:
                     'final_value': self.calculate_final_value(amount, alt.expected_return_percent, duration),
                     'risk_rating': alt.risk_rating,
                     'liquidity': alt.liquidity,
-                } for alt in alternatives
+                    **fields,
+                } for alt, fields in zip(alternatives, net_fields[1:])
             ],
             'scenarios': {
                 'best_case': {
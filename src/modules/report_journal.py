@@ -0,0 +1,253 @@
+"""
+Append-only report journal backed by SQLite in WAL mode
+"""
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_JOURNAL_PATH = os.path.join('data', 'reports.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    risk_level TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    amount REAL NOT NULL,
+    duration_months INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_ts ON reports (ts);
+CREATE INDEX IF NOT EXISTS idx_reports_risk_ts ON reports (risk_level, ts);
+CREATE INDEX IF NOT EXISTS idx_reports_instrument_ts ON reports (instrument, ts);
+"""
+
+
+def _to_epoch(value) -> float:
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ReportJournal:
+    """
+    Single-file journal for analysis reports.
+
+    Reports are only ever appended; writes are grouped into transactions of
+    `batch_size` rows so the WAL is synced once per batch rather than once
+    per report. Call flush() (or use the journal as a context manager) to
+    make buffered reports durable.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH, batch_size: int = 1):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._pending: List[tuple] = []
+
+    def append(self, report: Dict) -> None:
+        """Queue a report; it is written once the batch fills up"""
+        recommendation = report.get('recommendation', {})
+        primary = recommendation.get('primary_recommendation', {})
+        user_input = report.get('user_input', {})
+        self._pending.append((
+            _to_epoch(report.get('timestamp')),
+            str(user_input.get('risk_appetite', '')).lower(),
+            primary.get('instrument', ''),
+            float(user_input.get('amount', 0)),
+            int(user_input.get('duration_months', 0)),
+            json.dumps(report, separators=(',', ':'), default=str),
+        ))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write queued reports in a single transaction"""
+        if not self._pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO reports (ts, risk_level, instrument, amount, duration_months, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self._pending = []
+
+    def query(self, start=None, end=None, risk_level: Optional[str] = None,
+              instrument: Optional[str] = None, limit: Optional[int] = None,
+              decode: bool = True) -> Iterator[Dict]:
+        """Range scan over reports, newest last"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(_to_epoch(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(_to_epoch(end))
+        if risk_level is not None:
+            clauses.append("risk_level = ?")
+            params.append(risk_level.lower())
+        if instrument is not None:
+            clauses.append("instrument = ?")
+            params.append(instrument)
+
+        sql = "SELECT id, payload FROM reports"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        for report_id, payload in self.conn.execute(sql, params):
+            yield json.loads(payload) if decode else {'id': report_id, 'payload': payload}
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def compact(self, before=None) -> int:
+        """Drop reports older than `before` and reclaim space; returns rows removed"""
+        self.flush()
+        removed = 0
+        if before is not None:
+            with self.conn:
+                removed = self.conn.execute(
+                    "DELETE FROM reports WHERE ts < ?", (_to_epoch(before),)
+                ).rowcount
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("VACUUM")
+        return removed
+
+    def import_json_reports(self, directory: str) -> int:
+        """Load legacy report_*.json files into the journal"""
+        imported = 0
+        for filepath in sorted(glob.glob(os.path.join(directory, 'report_*.json'))):
+            try:
+                with open(filepath) as f:
+                    self.append(json.load(f))
+                imported += 1
+            except (OSError, ValueError) as e:
+                print(f"Skipping {filepath}: {e}")
+        self.flush()
+        return imported
+
+    def export_columnar(self, path: str, **filters) -> int:
+        """
+        Write the reports `query(**filters)` selects to a columnar export
+        (see columnar_export.py); returns how many were written. Reports
+        without a full recommendation are skipped.
+        """
+        from .columnar_export import ColumnarReportWriter
+
+        self.flush()
+        with ColumnarReportWriter(path) as writer:
+            for report in self.query(**filters):
+                recommendation = report.get('recommendation', {})
+                if 'primary_recommendation' in recommendation and 'scenarios' in recommendation:
+                    writer.append(recommendation, report['user_input'])
+        return writer.count
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def benchmark_journal(path: str, rows: int, batch_size: int = 10000) -> Dict:
+    """Fill a journal with synthetic reports and time typical queries"""
+    risks = ['low', 'medium', 'high']
+    instruments = ['364-Day Treasury Bill', 'Money Market Fund',
+                   'Fixed Deposit (12m)', 'NSE Blue-Chip Portfolio (ETF/Direct)']
+    base = time.time() - rows
+    results = {'rows': rows}
+
+    with ReportJournal(path, batch_size=batch_size) as journal:
+        existing = journal.count()
+        started = time.perf_counter()
+        for i in range(existing, rows):
+            journal.append({
+                'timestamp': base + i,
+                'user_input': {'amount': 1000 + i % 100000, 'duration_months': 6 + i % 60,
+                               'risk_appetite': risks[i % 3]},
+                'recommendation': {'primary_recommendation': {'instrument': instruments[i % 4]}},
+            })
+        journal.flush()
+        results['insert_seconds'] = time.perf_counter() - started
+
+        def timed(**kwargs):
+            started = time.perf_counter()
+            n = sum(1 for _ in journal.query(decode=False, **kwargs))
+            return {'rows': n, 'seconds': time.perf_counter() - started}
+
+        results['range_1h'] = timed(start=base + rows // 2, end=base + rows // 2 + 3600)
+        results['risk_range_1h'] = timed(start=base + rows // 2, end=base + rows // 2 + 3600,
+                                         risk_level='high')
+        results['instrument_latest_100'] = timed(instrument=instruments[0], start=base + rows - 10000,
+                                                 limit=100)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FinApp report journal tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    compact = sub.add_parser('compact', help="Drop old reports and reclaim space")
+    compact.add_argument('path', nargs='?', default=DEFAULT_JOURNAL_PATH)
+    compact.add_argument('--before', help="ISO timestamp; reports older than this are removed")
+
+    migrate = sub.add_parser('migrate', help="Import legacy report_*.json files")
+    migrate.add_argument('directory', nargs='?', default='data')
+    migrate.add_argument('--path', default=DEFAULT_JOURNAL_PATH)
+
+    export = sub.add_parser('export', help="Write reports to a columnar file for bulk analysis")
+    export.add_argument('output')
+    export.add_argument('--path', default=DEFAULT_JOURNAL_PATH)
+    export.add_argument('--start', help="ISO timestamp; only reports from this time on")
+    export.add_argument('--end', help="ISO timestamp; only reports before this time")
+    export.add_argument('--risk-level')
+
+    bench = sub.add_parser('bench', help="Benchmark append and query latency")
+    bench.add_argument('--path', default=os.path.join('data', 'bench_reports.db'))
+    bench.add_argument('--rows', type=int, default=1000000)
+
+    args = parser.parse_args(argv)
+    if args.command == 'compact':
+        with ReportJournal(args.path) as journal:
+            removed = journal.compact(args.before)
+        print(f"Removed {removed} reports; {args.path} compacted")
+    elif args.command == 'migrate':
+        with ReportJournal(args.path, batch_size=1000) as journal:
+            imported = journal.import_json_reports(args.directory)
+        print(f"Imported {imported} reports into {args.path}")
+    elif args.command == 'export':
+        with ReportJournal(args.path) as journal:
+            exported = journal.export_columnar(args.output, start=args.start, end=args.end,
+                                               risk_level=args.risk_level)
+        print(f"Exported {exported} reports to {args.output}")
+    else:
+        print(json.dumps(benchmark_journal(args.path, args.rows), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,8 @@ Risk analysis module for investment vehicles in Kenya
 from typing import Dict, List, Tuple
 from dataclasses import dataclass
 
+from .instrumentation import timed
+
 @dataclass
 class RiskFactor:
     """Represents a risk factor with description and severity"""
@@ -20,6 +22,7 @@ class RiskAnalyzer:
         self.market_data = market_data
         self.risk_profiles = {}
     
+    @timed('risk.treasury')
     def analyze_treasury_risk(self, investment_amount: int, duration_months: int) -> Dict:
         """Analyze risks for Treasury Bills/Bonds"""
         risks = []
@@ -72,6 +75,7 @@ class RiskAnalyzer:
             'overall_assessment': 'Safest option; suitable for capital preservation',
         }
     
+    @timed('risk.money_market')
     def analyze_money_market_risk(self, investment_amount: int, duration_months: int) -> Dict:
         """Analyze risks for Money Market Funds"""
         risks = []
@@ -115,6 +119,7 @@ class RiskAnalyzer:
             'overall_assessment': 'Balanced; good liquidity with modest returns',
         }
     
+    @timed('risk.fixed_deposit')
     def analyze_fixed_deposit_risk(self, investment_amount: int, duration_months: int) -> Dict:
         """Analyze risks for Fixed Deposits"""
         risks = []
@@ -158,6 +163,7 @@ class RiskAnalyzer:
             'overall_assessment': 'Safe and predictable; best for stable capital',
         }
     
+    @timed('risk.equity')
     def analyze_equity_risk(self, investment_amount: int, duration_months: int) -> Dict:
         """Analyze risks for NSE Equities/ETFs"""
         risks = []
@@ -209,6 +215,7 @@ class RiskAnalyzer:
             'overall_assessment': 'Aggressive; for 6+ month horizon with high risk tolerance',
         }
     
+    @timed('risk.reit')
     def analyze_reit_risk(self, investment_amount: int, duration_months: int) -> Dict:
         """Analyze risks for REITs"""
         risks = []
@@ -252,6 +259,7 @@ class RiskAnalyzer:
             'overall_assessment': 'Moderate; for diversification and inflation protection',
         }
     
+    @timed('risk.get_risk_profile')
     def get_risk_profile(self, instrument: str, amount: int, duration: int) -> Dict:
         """Get complete risk profile for any instrument"""
         if 'Treasury' in instrument or 'Bond' in instrument:
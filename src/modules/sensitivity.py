@@ -0,0 +1,225 @@
+"""
+Sensitivity of projected outcomes to every market data input, for one recommendation or a whole book
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .stress_testing import INSTRUMENTS, StressTester
+from .suitability import recommended_instruments
+
+# Market data section each instrument's return is read from, as indices
+# into INSTRUMENTS (see expected_returns.py)
+SECTION_INSTRUMENTS = {'treasury': 0, 'money_market': 1, 'fixed_deposits': 2, 'nse': 3, 'reits': 4}
+INFLATION = ('macro', 'inflation_rate')
+
+# Whether each instrument's return depends on the amount and on the horizon
+# (see expected_returns.py), so bumps price only the distinct profiles
+PRICED_BY = np.array([
+    [False, True],   # treasury: the horizon picks the bill or the curve point
+    [True, False],   # money market: the amount opens funds
+    [True, True],    # fixed deposit: the amount splits across banks, the horizon picks the term
+    [True, False],   # equity: the amount buys the basket
+    [True, False],   # reit: the amount opens REITs
+])
+
+# Inputs quoted in percent, by field name: bumped by a basis point and
+# reported per percentage point; anything else per 1% of its value
+PERCENT_FIELDS = frozenset({
+    'yield', '6m', '12m', 'management_fee', '6m_return', 'ytd_return', 'change_6m', 'dividend_yield',
+    'inflation_rate', 'cbr', 'base_lending_rate',
+})
+# Thresholds, and risk inputs that only decide how many lots of each counter
+# a basket buys, move outcomes in jumps rather than slopes, so have no derivative
+THRESHOLD_FIELDS = frozenset({'min_investment', 'lot_size', 'volatility', 'beta'})
+
+PERCENT_BUMP = 0.01
+RELATIVE_BUMP = 1e-4
+
+
+def market_inputs(market_data: Dict) -> List[Tuple[Tuple[str, ...], float]]:
+    """(path, value) of every numeric input in the snapshot's sections, thresholds aside"""
+    def walk(node: Dict, path: Tuple[str, ...]):
+        for key, value in node.items():
+            if isinstance(value, dict):
+                yield from walk(value, path + (key,))
+            elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in THRESHOLD_FIELDS:
+                yield path + (key,), float(value)
+
+    return list(walk({key: value for key, value in market_data.items() if isinstance(value, dict)}, ()))
+
+
+def bumped(market_data: Dict, path: Tuple[str, ...], value: float) -> Dict:
+    """The snapshot with the input at `path` set to `value`; dicts off that path are shared, not copied"""
+    result = node = dict(market_data)
+    for key in path[:-1]:
+        node[key] = dict(node[key])
+        node = node[key]
+    node[path[-1]] = value
+    return result
+
+
+@dataclass
+class SensitivityTable:
+    """Partial derivatives of each user's projection with respect to each market data input that moves it"""
+    inputs: List[str]  # dotted paths into the market data
+    values: np.ndarray  # each input's current value
+    moves: np.ndarray  # a standard move per input: 1 point for percentages, 1% of the value otherwise
+    final_values: np.ndarray  # per user, KES
+    real_returns: np.ndarray  # per user, percent a year
+    d_final_value: np.ndarray  # (users, inputs), KES per unit of each input
+    d_real_return: np.ndarray  # (users, inputs), points per unit of each input
+
+    def impact(self, path: str, move: float) -> Tuple[np.ndarray, np.ndarray]:
+        """First-order change in every user's final value and real return if `path` moves by `move`"""
+        if path not in self.inputs:
+            raise ValueError(f"{path} does not move any projection in this table")
+        j = self.inputs.index(path)
+        return self.d_final_value[:, j] * move, self.d_real_return[:, j] * move
+
+    def rows(self, user: Optional[int] = None) -> List[Dict]:
+        """
+        One row per input, biggest effect of a standard move on the real
+        return first; for one user, or for the book when `user` is None
+        (final value changes summed, real return changes averaged)
+        """
+        if user is None:
+            value, real = self.d_final_value.sum(axis=0), self.d_real_return.mean(axis=0)
+        else:
+            value, real = self.d_final_value[user], self.d_real_return[user]
+        order = np.lexsort((-np.abs(value * self.moves), -np.abs(real * self.moves)))
+        return [
+            {
+                'input': self.inputs[j],
+                'value': float(self.values[j]),
+                'move': float(self.moves[j]),
+                'final_value_change': float(value[j] * self.moves[j]),
+                'real_return_change': float(real[j] * self.moves[j]),
+                'd_final_value': float(value[j]),
+                'd_real_return': float(real[j]),
+            } for j in order
+        ]
+
+    def format(self, user: Optional[int] = None, top: int = 15) -> str:
+        lines = [f"{'input':<42} {'value':>10} {'move':>8} {'final value Δ (KES)':>20} {'real return Δ':>14}"]
+        for row in self.rows(user)[:top]:
+            lines.append(f"{row['input']:<42} {row['value']:>10,.2f} {row['move']:>+8.2f} "
+                         f"{row['final_value_change']:>+20,.0f} {row['real_return_change']:>+13.3f}%")
+        return '\n'.join(lines)
+
+
+class SensitivityAnalyzer:
+    """
+    Differentiates projections with respect to every market data input, for
+    whole books of users at once.
+
+    Each user holds one instrument (an index into INSTRUMENTS, or -1 for
+    none) over their horizon, worth amount * (1 + r)^(months / 12) at the
+    end, for a real return of (1 + r) / (1 + inflation) - 1. Those are
+    differentiated analytically, which is all inflation's effect needs. How
+    r moves with an input is found by finite differences on the engine's
+    own return functions, unrounded: the input is bumped both ways in a
+    copy-on-write snapshot, keeping the gentler one-sided slope, and only
+    the users holding the instrument its section feeds are repriced,
+    together, in one vectorized call per bump that rebuilds only that
+    section's structure and prices each distinct profile (PRICED_BY) once.
+    The recommended instrument is held fixed, so a bump that would change
+    the recommendation is not reflected. Users holding nothing have NaN
+    projections and no sensitivities; inputs that move no user's projection
+    are left out.
+    """
+
+    def __init__(self, returns: StressTester):
+        self.returns = returns
+        self.market_data = returns.market_data
+
+    def _instrument_returns(self, market_data: Dict, instrument: int, amounts: np.ndarray,
+                            months: np.ndarray) -> np.ndarray:
+        tester = StressTester(market_data, self.returns.scenarios[:1], decimals=None)
+        return tester.instrument_returns(instrument, amounts, months)
+
+    @staticmethod
+    def _profiles(instrument: int, amounts: np.ndarray, months: np.ndarray):
+        """Distinct (amount, months) profiles as far as the instrument's return can tell, and each user's"""
+        by_amount, by_months = PRICED_BY[instrument]
+        if by_amount and by_months:
+            distinct, inverse = np.unique(np.stack([amounts, months], axis=1), axis=0, return_inverse=True)
+            return distinct[:, 0], distinct[:, 1], inverse.ravel()
+        distinct, inverse = np.unique(amounts if by_amount else months, return_inverse=True)
+        other = np.zeros(len(distinct))
+        return (distinct, other, inverse) if by_amount else (other, distinct, inverse)
+
+    def analyze(self, amounts, months, instruments, expected_returns=None) -> SensitivityTable:
+        """
+        Sensitivities for users with these amounts, horizons and instruments;
+        `expected_returns` (percent) overrides the returns StressTester gives,
+        e.g. with the engine's own for a recommendation
+        """
+        amounts = np.atleast_1d(np.asarray(amounts, dtype=float))
+        months = np.broadcast_to(np.asarray(months, dtype=float), amounts.shape)
+        instruments = np.broadcast_to(np.asarray(instruments, dtype=np.intp), amounts.shape)
+        holders = {int(i): np.flatnonzero(instruments == i) for i in np.unique(instruments) if i >= 0}
+        if expected_returns is None:
+            rates = np.full(len(amounts), np.nan)
+            for i, users in holders.items():
+                rates[users] = self.returns.instrument_returns(i, amounts[users], months[users])
+        else:
+            rates = np.broadcast_to(np.asarray(expected_returns, dtype=float), amounts.shape)
+
+        inflation = self.returns.inflation
+        growth = 1 + rates / 100
+        years = months / 12
+        final_values = amounts * growth ** years
+        real_returns = (growth / (1 + inflation / 100) - 1) * 100
+        held = ~np.isnan(final_values)
+        value_per_point = np.where(held, final_values * years / (100 + rates), 0.0)
+        real_per_point = np.where(held, 1 / (1 + inflation / 100), 0.0)
+
+        profiles = {i: self._profiles(i, amounts[users], months[users]) for i, users in holders.items()}
+        unbumped = {i: self._instrument_returns(self.market_data, i, profile_amounts, profile_months)
+                    for i, (profile_amounts, profile_months, _) in profiles.items()}
+
+        inputs, values, moves, d_value, d_real = [], [], [], [], []
+        for path, value in market_inputs(self.market_data):
+            percent = path[-1] in PERCENT_FIELDS
+            if path == INFLATION:
+                d_value.append(np.zeros(len(amounts)))
+                d_real.append(np.where(held, -growth / (1 + inflation / 100) ** 2, 0.0))
+            else:
+                instrument = SECTION_INSTRUMENTS.get(path[0])
+                users = holders.get(instrument)
+                if users is None:
+                    continue
+                step = PERCENT_BUMP if percent else RELATIVE_BUMP * (abs(value) or 1)
+                profile_amounts, profile_months, inverse = profiles[instrument]
+                up, down = (
+                    self._instrument_returns(bumped(self.market_data, path, value + shift), instrument,
+                                             profile_amounts, profile_months)
+                    for shift in (step, -step))
+                slope = np.zeros(len(amounts))
+                # The gentler side, so a profile whose lots or best fund change
+                # within the bump gets the slope of the side without the jump
+                above, below = (up - unbumped[instrument]) / step, (unbumped[instrument] - down) / step
+                slope[users] = np.nan_to_num(np.where(np.abs(above) <= np.abs(below), above, below))[inverse]
+                if not slope.any():
+                    continue
+                d_value.append(value_per_point * slope)
+                d_real.append(real_per_point * slope)
+            inputs.append('.'.join(path))
+            values.append(value)
+            moves.append(1.0 if percent else abs(value) / 100)
+
+        return SensitivityTable(
+            inputs, np.array(values), np.array(moves), final_values, real_returns,
+            np.stack(d_value, axis=1), np.stack(d_real, axis=1))
+
+
+def book_sensitivities(returns: StressTester, amounts, months, risk_appetites) -> SensitivityTable:
+    """
+    Sensitivities for every user in the instrument recommended to them, at
+    the returns `returns` gives; users eligible for none have no projection
+    """
+    return SensitivityAnalyzer(returns).analyze(
+        amounts, months, recommended_instruments(returns, amounts, months, risk_appetites))
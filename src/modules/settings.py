@@ -0,0 +1,206 @@
+"""
+Typed application settings from config.ini, reloaded when the file changes
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Callable, FrozenSet, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = os.environ.get(
+    'FINAPP_CONFIG',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config.ini'),
+)
+
+# How often `current` looks at the file's modification time
+RELOAD_CHECK_SECONDS = 1.0
+
+_TRUE = {'true', 'yes', 'on', '1'}
+_FALSE = {'false', 'no', 'off', '0'}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """config.ini values, one field per KEY (lower-cased); missing keys keep these defaults"""
+    market_data_cache_duration_hours: float = 1.0
+    shared_snapshot_name: str = ''  # read market data from this shared_snapshot publisher when set
+
+    min_investment_treasury: int = 100
+    min_investment_mmf: int = 1000
+    min_investment_fd: int = 10000
+    min_investment_equity: int = 100
+
+    risk_low_capital_preservation: bool = True
+    risk_medium_balanced: bool = True
+    risk_high_aggressive: bool = True
+
+    min_investment_duration_months: int = 6
+    max_investment_duration_months: int = 360
+
+    treasury_interest_tax_exempt: bool = True
+    fd_interest_tax_rate: float = 0.30
+    equity_dividend_tax_rate: float = 0.15
+    capital_gains_tax_rate: float = 0.05
+
+    dcdc_max_coverage_per_bank: int = 100000
+
+    default_currency: str = 'KES'
+    inflation_baseline: float = 4.8
+
+    generate_reports: bool = True
+    report_output_dir: str = 'data'
+    report_format: str = 'json'
+
+    cbk_api_enabled: bool = False
+    nse_api_enabled: bool = False
+    cma_api_enabled: bool = False
+
+    display_detailed_risk_analysis: bool = True
+    show_tax_implications: bool = True
+    show_inflation_impact: bool = True
+
+    @property
+    def min_investment(self) -> int:
+        """Smallest amount any instrument accepts"""
+        return min(self.min_investment_treasury, self.min_investment_mmf,
+                   self.min_investment_fd, self.min_investment_equity)
+
+    @classmethod
+    def parse(cls, text: str, source: str = '<string>') -> 'Settings':
+        """Settings from KEY=VALUE lines; '#' starts a comment, unknown keys are ignored"""
+        types = {f.name: f.type for f in fields(cls)}
+        values = {}
+        for lineno, line in enumerate(text.splitlines(), 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            key, sep, raw = line.partition('=')
+            if not sep:
+                raise ValueError(f"{source}:{lineno}: expected KEY=VALUE, got {line!r}")
+            name, raw = key.strip().lower(), raw.strip()
+            kind = types.get(name)
+            if kind is None:
+                logger.warning("%s:%d: unknown setting %s", source, lineno, key.strip())
+                continue
+            try:
+                values[name] = _convert(raw, kind)
+            except ValueError:
+                raise ValueError(f"{source}:{lineno}: {key.strip()} must be {kind.__name__}, got {raw!r}") from None
+        return cls(**values)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Settings':
+        with open(path, encoding='utf-8') as f:
+            return cls.parse(f.read(), path)
+
+    def changed_fields(self, other: 'Settings') -> FrozenSet[str]:
+        return frozenset(f.name for f in fields(self) if getattr(self, f.name) != getattr(other, f.name))
+
+
+def _convert(raw: str, kind: type):
+    if kind is bool:
+        lowered = raw.lower()
+        if lowered not in _TRUE | _FALSE:
+            raise ValueError(raw)
+        return lowered in _TRUE
+    return kind(raw)
+
+
+class SettingsStore:
+    """
+    The current Settings for one config file.
+
+    The file is parsed once, and again only when its modification time
+    changes; `current` checks that at most every `check_interval` seconds,
+    so reading a setting costs a clock read and attribute lookups. On a
+    change, listeners registered for any of the changed fields are called
+    with the set of changed field names. A file that fails to parse on
+    reload is logged and the previous settings stay in force.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH, check_interval: float = RELOAD_CHECK_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._listeners: List[Tuple[Optional[FrozenSet[str]], Callable[[FrozenSet[str]], None]]] = []
+        self._signature = self._stat()
+        self._settings = Settings.from_file(path) if self._signature is not None else Settings()
+        self._next_check = time.monotonic() + check_interval
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        """(mtime, size) of the file, or None while it does not exist"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def current(self) -> Settings:
+        if time.monotonic() >= self._next_check:
+            self.reload()
+        return self._settings
+
+    def reload(self) -> FrozenSet[str]:
+        """Re-read the file if it changed since the last load; returns the changed fields"""
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            signature = self._stat()
+            if signature == self._signature:
+                return frozenset()
+            self._signature = signature
+            try:
+                settings = Settings.from_file(self.path) if signature is not None else Settings()
+            except (OSError, ValueError) as e:
+                logger.error("Keeping previous settings: %s", e)
+                return frozenset()
+            previous, self._settings = self._settings, settings
+            listeners = list(self._listeners)
+
+        changed = settings.changed_fields(previous)
+        if changed:
+            for watched, callback in listeners:
+                if watched is None or changed & watched:
+                    callback(changed)
+        return changed
+
+    def on_change(self, callback: Callable[[FrozenSet[str]], None], fields: Optional[Iterable[str]] = None):
+        """Call `callback(changed_fields)` after a reload that changes any of `fields` (default: any)"""
+        with self._lock:
+            self._listeners.append((frozenset(fields) if fields is not None else None, callback))
+
+
+_store: Optional[SettingsStore] = None
+_store_lock = threading.Lock()
+_pending_listeners: List[tuple] = []
+
+
+def settings_store() -> SettingsStore:
+    """The process-wide store for CONFIG_PATH, created (and the file first read) on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = SettingsStore()
+                for callback, fields in _pending_listeners:
+                    store.on_change(callback, fields)
+                _pending_listeners.clear()
+                _store = store
+    return _store
+
+
+def get_settings() -> Settings:
+    return settings_store().current
+
+
+def on_change(callback: Callable[[FrozenSet[str]], None], fields: Optional[Iterable[str]] = None):
+    """Listen on the process-wide store; registering does not read the file"""
+    with _store_lock:
+        if _store is None:
+            _pending_listeners.append((callback, fields))
+            return
+    _store.on_change(callback, fields)
@@ -0,0 +1,339 @@
+"""
+Market data snapshots shared between processes on one host through shared memory
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAME = 'finapp-snapshot'
+# Where POSIX shared memory segments appear as files (Linux); readers open them there
+SHM_DIR = '/dev/shm'
+
+# Control block: magic, sequence, version, published at (epoch seconds), data segment name
+CONTROL_MAGIC = b'FINSHC01'
+SEGMENT_NAME_BYTES = 64
+_CONTROL = struct.Struct(f'<8sQQd{SEGMENT_NAME_BYTES}s')
+# Data segment: magic, version, manifest length; arrays follow the manifest, aligned
+DATA_MAGIC = b'FINSHD01'
+_DATA = struct.Struct('<8sQQ')
+_ALIGN = 64
+
+# Data segments kept after being superseded, so readers that attached just
+# before a publish are never left holding an unlinked name
+KEEP_SEGMENTS = 2
+
+# Horizons and opening amounts the projection grids are computed on
+GRID_MONTHS = np.arange(1, 361)
+GRID_AMOUNTS = np.geomspace(1_000, 100_000_000, 41)
+
+
+def _treasury_yields(market_data: Dict) -> np.ndarray:
+    """Curve yield (percent) per month of GRID_MONTHS"""
+    from .yield_curve import curve_for_snapshot
+    return curve_for_snapshot(market_data['treasury']).yield_at_months(GRID_MONTHS)
+
+
+def _base_returns(market_data: Dict) -> np.ndarray:
+    """Expected return per (amount, month, instrument) on GRID_AMOUNTS x GRID_MONTHS"""
+    from .stress_testing import INSTRUMENTS, StressTester
+    amounts, months = np.meshgrid(GRID_AMOUNTS, GRID_MONTHS.astype(float), indexing='ij')
+    returns = StressTester(market_data).base_returns(amounts.ravel(), months.ravel())
+    return returns.reshape(len(GRID_AMOUNTS), len(GRID_MONTHS), len(INSTRUMENTS))
+
+
+def _risk_severity(market_data: Dict) -> np.ndarray:
+    """Mean severity of RiskAnalyzer's factors (0 Low, 1 Medium, 2 High) per (instrument, month)"""
+    from .risk_analyzer import RiskAnalyzer
+    analyzer = RiskAnalyzer(market_data)
+    methods = ('analyze_treasury_risk', 'analyze_money_market_risk', 'analyze_fixed_deposit_risk',
+               'analyze_equity_risk', 'analyze_reit_risk')  # stress_testing.INSTRUMENTS order
+    severity = {'Low': 0, 'Medium': 1, 'High': 2}
+    return np.array([
+        [np.mean([severity[factor.severity] for factor in analyze(100_000, int(months))['risk_factors']])
+         for months in GRID_MONTHS]
+        for analyze in (getattr(analyzer, method) for method in methods)
+    ])
+
+
+# Arrays published alongside every snapshot: name -> function of the market data
+DEFAULT_DERIVED: Dict[str, Callable[[Dict], np.ndarray]] = {
+    'treasury_yields': _treasury_yields,
+    'base_returns': _base_returns,
+    'risk_severity': _risk_severity,
+}
+
+def json_default(value):
+    """json.dumps default for snapshots: datetimes become tagged ISO strings"""
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Cannot share {type(value).__name__} in a snapshot")
+
+
+def json_object_hook(value: Dict):
+    """json.loads object_hook restoring what json_default tagged"""
+    if len(value) == 1 and '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+    return value
+
+
+def _open_readonly(name: str) -> int:
+    """File descriptor of an existing segment, opened read-only"""
+    if not os.path.isdir(SHM_DIR):
+        raise OSError(f"Shared snapshots need POSIX shared memory under {SHM_DIR}")
+    return os.open(os.path.join(SHM_DIR, name), os.O_RDONLY)
+
+
+def _identity(name: str) -> Tuple[int, int]:
+    """(device, inode) of a segment, which a segment recreated under the same name does not share"""
+    fd = _open_readonly(name)
+    try:
+        stat = os.fstat(fd)
+        return stat.st_dev, stat.st_ino
+    finally:
+        os.close(fd)
+
+
+def _map_readonly(name: str) -> mmap.mmap:
+    """
+    Map an existing segment read-only. Unlike attaching a SharedMemory, this
+    leaves the segment's lifetime to the publisher, and the mapping stays
+    valid for as long as any array viewing it is referenced.
+    """
+    fd = _open_readonly(name)
+    try:
+        return mmap.mmap(fd, os.fstat(fd).st_size, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+
+
+@dataclass
+class SharedSnapshot:
+    """One published version: the market data, and read-only arrays viewing shared memory"""
+    version: int
+    published_at: float
+    market_data: Dict
+    arrays: Dict[str, np.ndarray]
+
+
+class SnapshotPublisher:
+    """
+    Writes market data snapshots, with arrays derived from them (`derived`:
+    name -> function of the market data, DEFAULT_DERIVED unless given), to
+    shared memory for SnapshotReaders in other processes.
+
+    Each version goes into a fresh, immutable data segment, so readers can
+    keep zero-copy views of its arrays for as long as they like. A small
+    control block names the current segment; it is updated under a
+    sequence lock (odd while being written), so a reader never sees a
+    half-written version number and name.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME, derived: Optional[Dict[str, Callable[[Dict], np.ndarray]]] = None):
+        self.name = name
+        self.derived = DEFAULT_DERIVED if derived is None else derived
+        self.version = 0
+        self._segment_name(2 ** 64 - 1)  # fail now rather than at some later publish
+        self._segments: List[shared_memory.SharedMemory] = []
+        try:
+            self.control = shared_memory.SharedMemory(name=name, create=True, size=_CONTROL.size)
+        except FileExistsError:
+            # Left behind by a publisher that did not shut down; take it over
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.control = shared_memory.SharedMemory(name=name, create=True, size=_CONTROL.size)
+        _CONTROL.pack_into(self.control.buf, 0, CONTROL_MAGIC, 0, 0, 0.0, b'')
+
+    def _segment_name(self, version: int) -> str:
+        """Name of a version's data segment; it must fit the control block, which would truncate it"""
+        name = f"{self.name}-{version}"
+        if len(name.encode()) > SEGMENT_NAME_BYTES:
+            raise ValueError(f"Snapshot name {self.name!r} is too long: segment names must fit in "
+                             f"{SEGMENT_NAME_BYTES} bytes, version number included")
+        return name
+
+    def publish(self, market_data: Dict, arrays: Optional[Dict[str, np.ndarray]] = None) -> int:
+        """Publish a snapshot (and any extra arrays); returns its version"""
+        arrays = dict(arrays or {})
+        for key, derive in self.derived.items():
+            try:
+                arrays.setdefault(key, derive(market_data))
+            except Exception as e:  # a derivation needing a missing section should not block the rest
+                logger.warning("Not sharing %s: %s", key, e)
+
+        arrays = {key: np.ascontiguousarray(array) for key, array in arrays.items()}
+        offset, directory = 0, []
+        for key, array in arrays.items():
+            directory.append({'name': key, 'dtype': array.dtype.str, 'shape': array.shape, 'offset': offset})
+            offset += -(-array.nbytes // _ALIGN) * _ALIGN
+        manifest = json.dumps({'market_data': market_data, 'arrays': directory}, default=json_default).encode()
+        start = -(-(_DATA.size + len(manifest)) // _ALIGN) * _ALIGN
+
+        version = self.version + 1
+        segment = shared_memory.SharedMemory(name=self._segment_name(version), create=True,
+                                             size=max(start + offset, 1))
+        _DATA.pack_into(segment.buf, 0, DATA_MAGIC, version, len(manifest))
+        segment.buf[_DATA.size:_DATA.size + len(manifest)] = manifest
+        for entry, array in zip(directory, arrays.values()):
+            view = np.ndarray(array.shape, array.dtype, buffer=segment.buf, offset=start + entry['offset'])
+            view[...] = array
+            del view
+
+        self._swap(version, segment)
+        return version
+
+    def _swap(self, version: int, segment: shared_memory.SharedMemory):
+        buf = self.control.buf
+        sequence = _CONTROL.unpack_from(buf, 0)[1]
+        struct.pack_into('<Q', buf, 8, sequence + 1)
+        _CONTROL.pack_into(buf, 0, CONTROL_MAGIC, sequence + 1, version, time.time(), segment.name.encode())
+        struct.pack_into('<Q', buf, 8, sequence + 2)
+        self.version = version
+
+        self._segments.append(segment)
+        while len(self._segments) > KEEP_SEGMENTS + 1:
+            old = self._segments.pop(0)
+            old.close()
+            old.unlink()
+
+    def close(self):
+        """Unlink every segment; readers keep whatever they already mapped"""
+        for segment in self._segments + [self.control]:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SnapshotReader:
+    """
+    Follows the snapshots a SnapshotPublisher writes.
+
+    `current()` checks the control block (a few struct reads) and maps the
+    data segment only when the version has moved; the market data is parsed
+    once per version per process, and arrays are read-only views of the
+    shared segment, so N processes hold one copy of them between them.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME, retries: int = 100):
+        self.name = name
+        self.retries = retries
+        # Taken before mapping, so a block replaced in between reads as detached, never the reverse
+        self._control_identity = _identity(name)
+        self.control = _map_readonly(name)
+        if _CONTROL.unpack_from(self.control, 0)[0] != CONTROL_MAGIC:
+            raise ValueError(f"{name} is not a FinApp snapshot control block")
+        self._snapshot: Optional[SharedSnapshot] = None
+
+    def _read_control(self):
+        """(version, published at, segment name), read consistently under the sequence lock"""
+        for _ in range(self.retries):
+            _, before, version, published_at, segment = _CONTROL.unpack_from(self.control, 0)
+            if before % 2 == 0 and struct.unpack_from('<Q', self.control, 8)[0] == before:
+                return version, published_at, segment.rstrip(b'\0').decode()
+            time.sleep(0)
+        raise TimeoutError(f"{self.name} stayed mid-publish for {self.retries} reads")
+
+    @property
+    def version(self) -> int:
+        return self._read_control()[0]
+
+    @property
+    def attached(self) -> bool:
+        """
+        Whether the control block this reader maps is still the one published
+        under its name. A restarted publisher creates a new one, which this
+        reader never sees; an open and fstat, so check it between
+        requests rather than on every current().
+        """
+        try:
+            return _identity(self.name) == self._control_identity
+        except FileNotFoundError:
+            return False
+
+    def current(self) -> Optional[SharedSnapshot]:
+        """The latest published snapshot, or None before the first publish"""
+        version, published_at, segment_name = self._read_control()
+        if version == 0:
+            return None
+        if self._snapshot is not None and self._snapshot.version == version:
+            return self._snapshot
+
+        segment = _map_readonly(segment_name)
+        magic, stored_version, length = _DATA.unpack_from(segment, 0)
+        if magic != DATA_MAGIC or stored_version != version:
+            raise ValueError(f"{segment_name} does not hold snapshot version {version}")
+        manifest = json.loads(segment[_DATA.size:_DATA.size + length], object_hook=json_object_hook)
+        start = -(-(_DATA.size + length) // _ALIGN) * _ALIGN
+        arrays = {}
+        for entry in manifest['arrays']:
+            dtype, shape = np.dtype(entry['dtype']), tuple(entry['shape'])
+            # Views of a read-only mapping come out read-only
+            arrays[entry['name']] = np.frombuffer(segment, dtype, int(np.prod(shape)),
+                                                  start + entry['offset']).reshape(shape)
+        self._snapshot = SharedSnapshot(version, published_at, manifest['market_data'], arrays)
+        return self._snapshot
+
+    def wait(self, after: int = 0, timeout: float = 10.0, poll: float = 0.01) -> SharedSnapshot:
+        """Block until a version newer than `after` is published"""
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self.current()
+            if snapshot is not None and snapshot.version > after:
+                return snapshot
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No snapshot after version {after} within {timeout}s")
+            time.sleep(poll)
+
+    def close(self):
+        """Stop following; snapshots already returned stay readable"""
+        self._snapshot = None
+        self.control.close()
+
+
+def main(argv=None):
+    from .data_collector import KenyanMarketDataCollector
+    from .settings import get_settings
+
+    parser = argparse.ArgumentParser(description="Fetch market data and share it with local worker processes")
+    parser.add_argument('--name', default=get_settings().shared_snapshot_name or DEFAULT_NAME)
+    parser.add_argument('--interval', type=float, default=get_settings().market_data_cache_duration_hours * 3600,
+                        help="Seconds between fetches")
+    parser.add_argument('--once', action='store_true', help="Publish one snapshot and keep it until interrupted")
+    args = parser.parse_args(argv)
+
+    collector = KenyanMarketDataCollector()
+    with SnapshotPublisher(args.name) as publisher:
+        try:
+            while True:
+                started = time.perf_counter()
+                version = publisher.publish(collector.get_all_market_data())
+                print(f"Published version {version} to {args.name} in {time.perf_counter() - started:.3f}s")
+                if args.once:
+                    while True:
+                        time.sleep(3600)
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,505 @@
+"""
+Leader/follower distribution of market data snapshots between nodes
+"""
+
+import json
+import logging
+import select
+import socket
+import struct
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .shared_snapshot import json_default, json_object_hook
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 7391
+HEARTBEAT_SECONDS = 1.0
+# A follower that hears nothing, not even a heartbeat, for this many
+# heartbeats reports the leader as lost (and keeps serving what it has)
+LEADER_TIMEOUT_HEARTBEATS = 3
+SEND_TIMEOUT_SECONDS = 5.0
+
+_FRAME = struct.Struct('<I')  # payload length
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+def snapshot_delta(old: Dict, new: Dict, path: Tuple[str, ...] = ()) -> Dict:
+    """Operations turning `old` into `new`: {'set': [[path, value], ...], 'delete': [path, ...]}"""
+    delta = {'set': [], 'delete': []}
+    for key, value in new.items():
+        if key not in old:
+            delta['set'].append([list(path + (key,)), value])
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            child = snapshot_delta(old[key], value, path + (key,))
+            delta['set'] += child['set']
+            delta['delete'] += child['delete']
+        elif value != old[key]:
+            delta['set'].append([list(path + (key,)), value])
+    delta['delete'] += [list(path + (key,)) for key in old if key not in new]
+    return delta
+
+
+def apply_delta(snapshot: Dict, delta: Dict) -> Dict:
+    """
+    A new snapshot with `delta` applied. Only dicts on a changed path are
+    copied, so unchanged sections keep their identity and whatever the
+    engine cached for them stays valid.
+    """
+    result = dict(snapshot)
+    copied = {id(result)}
+
+    def parent(keys):
+        node = result
+        for key in keys[:-1]:
+            child = node.get(key)
+            if not isinstance(child, dict):
+                child = {}
+            elif id(child) not in copied:
+                child = dict(child)
+            node[key] = child
+            copied.add(id(child))
+            node = child
+        return node
+
+    for keys, value in delta['set']:
+        parent(keys)[keys[-1]] = value
+    for keys in delta['delete']:
+        parent(keys).pop(keys[-1], None)
+    return result
+
+
+def is_empty(delta: Dict) -> bool:
+    return not delta['set'] and not delta['delete']
+
+
+def encode_message(message: Dict) -> bytes:
+    return json.dumps(message, default=json_default, separators=(',', ':')).encode()
+
+
+def decode_message(payload: bytes) -> Dict:
+    return json.loads(payload, object_hook=json_object_hook)
+
+
+def encode_frame(message: Dict) -> bytes:
+    """A length-prefixed message, as TcpLeaderChannel and TcpFollowerChannel exchange them"""
+    payload = encode_message(message)
+    return _FRAME.pack(len(payload)) + payload
+
+
+def _read_exact(sock: socket.socket, size: int) -> bytes:
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def _read_frame(sock: socket.socket) -> Dict:
+    (size,) = _FRAME.unpack(_read_exact(sock, _FRAME.size))
+    if size > MAX_FRAME_BYTES:
+        raise ConnectionError(f"frame of {size} bytes exceeds MAX_FRAME_BYTES")
+    return decode_message(_read_exact(sock, size))
+
+
+class TcpLeaderChannel:
+    """
+    The leader's end of a plain TCP channel: every follower connects, frames
+    are broadcast to all of them, and requests a follower sends are passed to
+    `on_request` with a function replying to that follower alone. Needs
+    nothing beyond the standard library, so clusters (and tests) can run
+    without a broker.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT):
+        self.server = socket.create_server((host, port))
+        self.address = self.server.getsockname()[:2]
+        self._clients: Dict[socket.socket, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self.on_request: Callable[[Dict, Callable[[Dict], None]], None] = lambda message, reply: None
+
+    def start(self, on_request: Callable[[Dict, Callable[[Dict], None]], None]):
+        self.on_request = on_request
+        threading.Thread(target=self._accept, name='snapshot-leader-accept', daemon=True).start()
+
+    def _accept(self):
+        while not self._closed.is_set():
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client.settimeout(SEND_TIMEOUT_SECONDS)
+            with self._lock:
+                self._clients[client] = threading.Lock()
+            threading.Thread(target=self._serve, args=(client,), name='snapshot-leader-client', daemon=True).start()
+
+    def _serve(self, client: socket.socket):
+        reply = lambda message: self.send(client, encode_frame(message))
+        try:
+            while not self._closed.is_set():
+                readable, _, _ = select.select([client], [], [], HEARTBEAT_SECONDS)
+                if readable:
+                    self.on_request(_read_frame(client), reply)
+        except (OSError, ConnectionError, ValueError):
+            pass
+        self._drop(client)
+
+    def clients(self) -> List[socket.socket]:
+        with self._lock:
+            return list(self._clients)
+
+    def send(self, client: socket.socket, frame: bytes):
+        """Send one frame to one follower; a follower that cannot keep up is disconnected"""
+        lock = self._clients.get(client)
+        if lock is None:
+            return
+        try:
+            with lock:
+                client.sendall(frame)
+        except OSError:
+            self._drop(client)
+
+    def broadcast(self, message: Dict):
+        frame = encode_frame(message)
+        for client in self.clients():
+            self.send(client, frame)
+
+    def _drop(self, client: socket.socket):
+        with self._lock:
+            self._clients.pop(client, None)
+        try:
+            client.shutdown(socket.SHUT_RDWR)  # close() alone waits for the serving thread's select
+        except OSError:
+            pass
+        client.close()
+
+    def close(self):
+        self._closed.set()
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)  # wakes the accept thread, releasing the port
+        except OSError:
+            pass
+        self.server.close()
+        for client in self.clients():
+            self._drop(client)
+
+
+class TcpFollowerChannel:
+    """A follower's connection to a TcpLeaderChannel, re-established whenever it drops"""
+
+    def __init__(self, address: Tuple[str, int], reconnect_delay: float = 0.2):
+        self.address = tuple(address)
+        self.reconnect_delay = reconnect_delay
+        self.sock: Optional[socket.socket] = None
+
+    def recv(self, timeout: float) -> Optional[Dict]:
+        """The next message, or None on timeout; {'type': 'connected'} after each (re)connect"""
+        if self.sock is None:
+            try:
+                self.sock = socket.create_connection(self.address, timeout=timeout)
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError:
+                time.sleep(min(self.reconnect_delay, timeout))
+                return None
+            return {'type': 'connected'}
+        try:
+            self.sock.settimeout(timeout)
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            return _read_frame(self.sock) if readable else None
+        except (OSError, ConnectionError, ValueError) as e:
+            logger.info("Lost connection to leader %s:%d: %s", *self.address, e)
+            self._disconnect()
+            return None
+
+    def send(self, message: Dict):
+        if self.sock is None:
+            return
+        try:
+            self.sock.sendall(encode_frame(message))
+        except OSError:
+            self._disconnect()
+
+    def _disconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def close(self):
+        self._disconnect()
+
+
+class ZmqLeaderChannel:
+    """
+    The leader's end over ZeroMQ: frames go out on a PUB socket at `endpoint`,
+    and requests come in on a ROUTER socket at the next port up.
+    """
+
+    def __init__(self, host: str = '*', port: int = DEFAULT_PORT):
+        import zmq  # deferred: only needed when ZeroMQ transport is chosen
+
+        self._context = zmq.Context.instance()
+        self.pub = self._context.socket(zmq.PUB)
+        self.pub.bind(f"tcp://{host}:{port}")
+        self.router = self._context.socket(zmq.ROUTER)
+        self.router.bind(f"tcp://{host}:{port + 1}")
+        self.address = (host, port)
+        self._pub_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def start(self, on_request: Callable[[Dict, Callable[[Dict], None]], None]):
+        def serve():
+            replies = []
+            while not self._closed.is_set():
+                if self.router.poll(int(HEARTBEAT_SECONDS * 1000)):
+                    identity, payload = self.router.recv_multipart()
+                    on_request(decode_message(payload), replies.append)
+                    # ROUTER sockets are used from this thread only
+                    for message in replies:
+                        self.router.send_multipart([identity, encode_message(message)])
+                    replies.clear()
+
+        threading.Thread(target=serve, name='snapshot-leader-requests', daemon=True).start()
+
+    def broadcast(self, message: Dict):
+        with self._pub_lock:
+            self.pub.send(encode_message(message))
+
+    def close(self):
+        self._closed.set()
+        self.pub.close(linger=0)
+        self.router.close(linger=0)
+
+
+class ZmqFollowerChannel:
+    """A follower's SUB and DEALER sockets to a ZmqLeaderChannel; ZeroMQ reconnects on its own"""
+
+    def __init__(self, address: Tuple[str, int]):
+        import zmq  # deferred: only needed when ZeroMQ transport is chosen
+
+        host, port = address
+        context = zmq.Context.instance()
+        self.sub = context.socket(zmq.SUB)
+        self.sub.setsockopt(zmq.SUBSCRIBE, b'')
+        self.sub.connect(f"tcp://{host}:{port}")
+        self.dealer = context.socket(zmq.DEALER)
+        self.dealer.connect(f"tcp://{host}:{port + 1}")
+        self.poller = zmq.Poller()
+        self.poller.register(self.sub, zmq.POLLIN)
+        self.poller.register(self.dealer, zmq.POLLIN)
+        self._announced = False
+
+    def recv(self, timeout: float) -> Optional[Dict]:
+        if not self._announced:
+            self._announced = True
+            return {'type': 'connected'}
+        for sock, _ in self.poller.poll(int(timeout * 1000)):
+            return decode_message(sock.recv())
+        return None
+
+    def send(self, message: Dict):
+        self.dealer.send(encode_message(message))
+
+    def close(self):
+        self.sub.close(linger=0)
+        self.dealer.close(linger=0)
+
+
+class SnapshotLeader:
+    """
+    The one node that fetches market data, publishing each change as a
+    versioned delta.
+
+    Every message carries the leader's epoch (fresh on each start) and
+    version; a delta also names the version it applies to. Between
+    changes, heartbeats carry the current version, so a follower that
+    missed a delta finds out within a heartbeat even if nothing else
+    changes, and asks for the full snapshot.
+    """
+
+    def __init__(self, channel, fetch: Callable[[], Dict], interval: float = 60.0,
+                 heartbeat: float = HEARTBEAT_SECONDS):
+        self.channel = channel
+        self.fetch = fetch
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self.snapshot: Dict = {}
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        channel.start(self._on_request)
+
+    def _message(self, kind: str, **fields) -> Dict:
+        return {'type': kind, 'epoch': self.epoch, 'version': self.version, 'sent_at': time.time(), **fields}
+
+    def _on_request(self, message: Dict, reply: Callable[[Dict], None]):
+        if message.get('type') == 'resync':
+            # Under the lock, so no delta can overtake the snapshot it follows
+            with self._lock:
+                if self.version:
+                    reply(self._message('snapshot', data=self.snapshot))
+
+    def publish(self, market_data: Dict) -> int:
+        """Broadcast what changed since the last publish; returns the current version"""
+        with self._lock:
+            delta = snapshot_delta(self.snapshot, market_data)
+            if is_empty(delta):
+                return self.version
+            base, self.version = self.version, self.version + 1
+            self.snapshot = market_data
+            self.channel.broadcast(self._message('delta', base=base, delta=delta))
+            return self.version
+
+    def send_heartbeat(self):
+        with self._lock:
+            self.channel.broadcast(self._message('heartbeat'))
+
+    def run(self):
+        """Fetch every `interval` seconds and heartbeat in between, until stop()"""
+        next_fetch = time.monotonic()
+        while not self._stop.is_set():
+            if time.monotonic() >= next_fetch:
+                next_fetch = time.monotonic() + self.interval
+                self.fetches += 1
+                try:
+                    self.publish(self.fetch())
+                except Exception as e:  # keep serving the last snapshot
+                    logger.error("Leader fetch failed: %s", e)
+            else:
+                self.send_heartbeat()
+            self._stop.wait(min(self.heartbeat, max(next_fetch - time.monotonic(), 0.0)))
+
+    def start(self) -> 'SnapshotLeader':
+        self._thread = threading.Thread(target=self.run, name='snapshot-leader', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, close_channel: bool = True):
+        """Stop fetching; with close_channel=False, resyncs are still answered"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if close_channel:
+            self.channel.close()
+
+
+class SnapshotFollower:
+    """
+    Keeps a copy of the leader's snapshot by applying its deltas in order.
+
+    A delta for any version but the next, a heartbeat ahead of the local
+    version, a new leader epoch or a (re)connect all trigger a resync: the
+    full snapshot is requested, and the request is repeated every heartbeat
+    until it arrives. A lost delta is therefore repaired within about one
+    heartbeat plus a round trip, even when nothing else changes.
+    `get_all_market_data` stands in for the collector's on follower nodes.
+    """
+
+    def __init__(self, channel, heartbeat: float = HEARTBEAT_SECONDS,
+                 on_update: Optional[Callable[[int, Dict], None]] = None):
+        self.channel = channel
+        self.heartbeat = heartbeat
+        self.on_update = on_update
+        self.epoch: Optional[str] = None
+        self.version = 0
+        self.market_data: Optional[Dict] = None
+        self.last_heard = 0.0
+        self.resyncs = 0
+        self.deltas_applied = 0
+        self._resync_requested: Optional[float] = None
+        self._updated = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the leader has been heard from within LEADER_TIMEOUT_HEARTBEATS heartbeats"""
+        return time.monotonic() - self.last_heard < LEADER_TIMEOUT_HEARTBEATS * self.heartbeat
+
+    def _resync(self):
+        now = time.monotonic()
+        if self._resync_requested is None or now - self._resync_requested >= self.heartbeat:
+            if self._resync_requested is None:
+                self.resyncs += 1
+            self._resync_requested = now
+            self.channel.send({'type': 'resync', 'version': self.version})
+
+    def _install(self, epoch: str, version: int, market_data: Dict, message: Dict):
+        with self._updated:
+            self.epoch, self.version, self.market_data = epoch, version, market_data
+            self._updated.notify_all()
+        if self.on_update is not None:
+            self.on_update(version, message)
+
+    def handle(self, message: Dict):
+        kind = message.get('type')
+        if kind == 'connected':
+            self._resync_requested = None
+            self._resync()
+            return
+        self.last_heard = time.monotonic()
+        same_epoch = message.get('epoch') == self.epoch
+
+        if kind == 'snapshot':
+            if not same_epoch or message['version'] >= self.version:
+                self._resync_requested = None
+                self._install(message['epoch'], message['version'], message['data'], message)
+        elif kind == 'delta':
+            if same_epoch and message['base'] == self.version:
+                self.deltas_applied += 1
+                self._install(self.epoch, message['version'], apply_delta(self.market_data, message['delta']), message)
+            elif not same_epoch or message['version'] > self.version:
+                self._resync()
+        elif kind == 'heartbeat':
+            if not same_epoch or message['version'] > self.version:
+                self._resync()
+
+    def run(self):
+        while not self._stop.is_set():
+            message = self.channel.recv(self.heartbeat)
+            if message is not None:
+                self.handle(message)
+            elif self._resync_requested is not None:
+                self._resync()
+
+    def start(self) -> 'SnapshotFollower':
+        self._thread = threading.Thread(target=self.run, name='snapshot-follower', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.channel.close()
+
+    def wait_for(self, version: int = 1, timeout: float = 10.0) -> Dict:
+        """Block until at least `version` has been applied; returns the snapshot"""
+        with self._updated:
+            if not self._updated.wait_for(lambda: self.version >= version, timeout):
+                raise TimeoutError(f"Version {version} not received within {timeout}s")
+            return self.market_data
+
+    def get_all_market_data(self, timeout: float = 10.0) -> Dict:
+        """The latest snapshot, flagged in 'errors' when the leader has gone quiet"""
+        market_data = self.market_data if self.market_data is not None else self.wait_for(1, timeout)
+        if self.healthy:
+            return market_data
+        return {**market_data, 'errors': list(market_data.get('errors', [])) + [{
+            'source': 'leader',
+            'error_type': 'LeaderUnavailable',
+            'message': f"no word from the leader for {time.monotonic() - self.last_heard:.0f}s",
+            'circuit_state': 'open',
+            'served_stale': True,
+            'stale_since': market_data.get('timestamp'),
+        }]}
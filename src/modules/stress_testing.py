@@ -0,0 +1,321 @@
+"""
+Macro stress scenarios swept across every instrument and a book of users
+"""
+
+import argparse
+import functools
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import expected_returns
+from .equity_basket import EquityBasketBuilder
+from .fd_allocator import FixedDepositAllocator
+from .instrumentation import timed
+from .mmf_ranker import MoneyMarketRanker, reit_ranker
+from .yield_curve import curve_for_snapshot
+
+INSTRUMENTS = ('treasury', 'money_market', 'fixed_deposit', 'equity', 'reit')
+RATINGS = ('Low', 'Medium', 'High')
+
+# Rating index of each instrument before any stress, as the engine rates them
+BASE_RATINGS = np.array([0, 0, 0, 2, 1])
+
+RISK_LEVELS = ('low', 'medium', 'high')
+
+# Change in expected annual return (percentage points) per unit of each factor:
+# CBR shift (pp), inflation shift (pp), move in the KES (% change in its value)
+PASS_THROUGH = np.array([
+    [0.8, 0.0, 0.0],    # treasury: new issues reprice with the policy rate
+    [0.9, 0.0, 0.0],    # money market: short paper resets fastest
+    [0.7, 0.0, 0.0],    # fixed deposit: banks lag the policy rate
+    [-1.5, 0.3, 0.5],   # equity: derates on rate rises, foreign outflows on a weaker KES
+    [-1.0, 0.5, 0.2],   # reit: rate sensitive, partly inflation linked
+])
+
+
+def risk_codes(risk_appetites) -> np.ndarray:
+    """Index into RISK_LEVELS for a risk appetite name, or an array of names or indices"""
+    risk = np.asarray(risk_appetites)
+    if risk.dtype.kind not in 'US':
+        return risk.astype(np.intp)
+    levels, inverse = np.unique(np.char.lower(risk.astype(str)), return_inverse=True)
+    return np.array([RISK_LEVELS.index(level) for level in levels], dtype=np.intp)[inverse].reshape(risk.shape)
+
+
+@dataclass
+class Scenario:
+    """A shocked macro environment"""
+    name: str
+    cbr_shift_bp: float = 0.0
+    inflation_rate: Optional[float] = None  # absolute, percent; None keeps today's
+    kes_change_pct: float = 0.0  # negative means the shilling weakens
+    description: str = ''
+
+    def factors(self, macro: Dict) -> np.ndarray:
+        inflation = macro['inflation_rate'] if self.inflation_rate is None else self.inflation_rate
+        return np.array([self.cbr_shift_bp / 100, inflation - macro['inflation_rate'], self.kes_change_pct])
+
+
+DEFAULT_SCENARIOS = [
+    Scenario('baseline', description="Today's macro environment"),
+    Scenario('cbr_plus_300bp', cbr_shift_bp=300, description="CBK tightens by 300bp"),
+    Scenario('inflation_12pct', inflation_rate=12.0, description="Inflation jumps to 12%"),
+    Scenario('kes_minus_20pct', kes_change_pct=-20, description="Shilling loses 20% against the dollar"),
+    Scenario('stagflation', cbr_shift_bp=300, inflation_rate=12.0, kes_change_pct=-20,
+             description="All three shocks at once"),
+]
+
+
+def scenario_grid(cbr_shifts_bp: Sequence[float] = (-200, 0, 100, 300, 500),
+                  inflation_rates: Sequence[Optional[float]] = (None, 8.0, 12.0, 15.0, 20.0),
+                  kes_changes: Sequence[float] = (0, -10, -20)) -> List[Scenario]:
+    """Every combination of the given shocks"""
+    return [
+        Scenario(f"cbr{cbr:+g}bp_inf{'base' if inflation is None else f'{inflation:g}'}_kes{kes:+g}",
+                 cbr, inflation, kes)
+        for cbr, inflation, kes in itertools.product(cbr_shifts_bp, inflation_rates, kes_changes)
+    ]
+
+
+@dataclass
+class UserBook:
+    """Columnar book of users: amount, horizon and risk appetite per user"""
+    amounts: np.ndarray
+    months: np.ndarray
+    risk: np.ndarray  # index into RISK_LEVELS
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @classmethod
+    def from_user_inputs(cls, user_inputs: List[Dict]) -> 'UserBook':
+        return cls(
+            np.array([u['amount'] for u in user_inputs], dtype=float),
+            np.array([u['duration_months'] for u in user_inputs], dtype=float),
+            np.array([RISK_LEVELS.index(u['risk_appetite'].lower()) for u in user_inputs], dtype=np.int8),
+        )
+
+    @classmethod
+    def synthetic(cls, users: int, seed: int = 0) -> 'UserBook':
+        rng = np.random.default_rng(seed)
+        return cls(
+            np.round(rng.lognormal(11, 1.2, users), -2).clip(1000, None),
+            rng.integers(6, 361, users).astype(float),
+            rng.integers(0, 3, users).astype(np.int8),
+        )
+
+
+@dataclass
+class StressReport:
+    """Per-scenario impact tables from a sweep"""
+    users: int
+    seconds: float
+    instruments: List[Dict] = field(default_factory=list)  # one row per scenario x instrument
+    book: List[Dict] = field(default_factory=list)  # one row per scenario
+
+    def format(self) -> str:
+        lines = [f"{'scenario':<34} {'instrument':<14} {'return':>8} {'real':>8} {'value Δ':>8} "
+                 f"{'real<0':>7}  ratings L/M/H"]
+        for row in self.instruments:
+            ratings = '/'.join(f"{row['ratings'][r] / row['users']:.0%}" for r in RATINGS)
+            lines.append(f"{row['scenario']:<34} {row['instrument']:<14} {row['mean_return']:>7.2f}% "
+                         f"{row['mean_real_return']:>7.2f}% {row['value_change_pct']:>7.2f}% "
+                         f"{row['negative_real_share']:>6.1%}  {ratings}")
+        lines.append('')
+        lines.append(f"{'scenario':<34} {'book value (KES)':>20} {'change':>8} {'book value (USD)':>18} "
+                     f"{'downgraded':>11}")
+        for row in self.book:
+            lines.append(f"{row['scenario']:<34} {row['book_value']:>20,.0f} {row['change_pct']:>7.2f}% "
+                         f"{row['book_value_usd']:>18,.0f} {row['downgraded_users']:>11,}")
+        return '\n'.join(lines)
+
+
+class StressTester:
+    """
+    Applies macro scenarios to every instrument for every user in a book.
+
+    Each user's base return per instrument is the one generate_recommendation
+    quotes, from the same per-instrument functions (expected_returns.py) and
+    snapshot structures (yield curve, fund and REIT rankers, FD allocator,
+    equity basket builder), evaluated for whole arrays of users. Returns are
+    rounded as the engine rounds them unless `decimals` is None. Scenarios
+    shift those returns through PASS_THROUGH, and projections are repriced
+    over each user's horizon, in nominal, real and dollar terms. The book
+    holds each user in the instrument recommended to them (see
+    suitability.py), leaving out users eligible for none. An instrument's
+    rating steps up one level when its real return turns negative and
+    another below -5%. Users are processed in chunks, so memory stays flat
+    however large the book is.
+    """
+
+    def __init__(self, market_data: Dict, scenarios: Optional[List[Scenario]] = None,
+                 chunk_size: int = 250_000, decimals: Optional[int] = expected_returns.DECIMALS):
+        self.market_data = market_data
+        self.decimals = decimals
+        self.scenarios = scenarios or DEFAULT_SCENARIOS
+        self.chunk_size = chunk_size
+        macro = market_data['macro']
+        self.inflation = macro['inflation_rate']
+        self.usd_kes = macro['usd_kes_rate']
+        self.shocks = np.array([PASS_THROUGH @ s.factors(macro) for s in self.scenarios])
+        self.inflations = np.array([self.inflation if s.inflation_rate is None else s.inflation_rate
+                                    for s in self.scenarios])
+        self.fx_rates = np.array([self.usd_kes / (1 + s.kes_change_pct / 100) for s in self.scenarios])
+
+    # Snapshot structures are built on first use, so a tester pricing one
+    # instrument (as sensitivity bumps do) builds only that instrument's
+    @functools.cached_property
+    def curve(self):
+        return curve_for_snapshot(self.market_data['treasury'])
+
+    @functools.cached_property
+    def mmf(self) -> MoneyMarketRanker:
+        return MoneyMarketRanker(self.market_data['money_market'])
+
+    @functools.cached_property
+    def fd(self) -> FixedDepositAllocator:
+        return FixedDepositAllocator(self.market_data['fixed_deposits'])
+
+    @functools.cached_property
+    def reits(self):
+        return reit_ranker(self.market_data['reits']) if self.market_data.get('reits') else None
+
+    @functools.cached_property
+    def equities(self) -> Optional[EquityBasketBuilder]:
+        return EquityBasketBuilder(self.market_data['nse']) if self.market_data.get('nse') else None
+
+    def instrument_returns(self, instrument: int, amounts: np.ndarray, months: np.ndarray) -> np.ndarray:
+        """Expected annual return (percent) per user in one instrument (an index into INSTRUMENTS)"""
+        decimals = self.decimals
+        if instrument == 0:
+            curve = self.curve if np.any(np.asarray(months) > expected_returns.BILL_MONTHS) else None
+            return expected_returns.treasury_returns(self.market_data['treasury'], curve, months, decimals)
+        if instrument == 1:
+            return expected_returns.money_market_returns(self.mmf, self.market_data['money_market'], amounts, decimals)
+        if instrument == 2:
+            return expected_returns.fixed_deposit_returns(self.fd, amounts, months, decimals)
+        if instrument == 3:
+            if self.equities is None:
+                return np.full(len(amounts), np.nan)
+            return expected_returns.equity_returns(self.equities, self.market_data['nse'], amounts, decimals)
+        return expected_returns.reit_returns(self.reits, amounts, decimals)
+
+    def base_returns(self, amounts: np.ndarray, months: np.ndarray) -> np.ndarray:
+        """Expected annual return (percent) per user and instrument, shape (users, len(INSTRUMENTS))"""
+        returns = np.empty((len(amounts), len(INSTRUMENTS)))
+        for i in range(len(INSTRUMENTS)):
+            returns[:, i] = self.instrument_returns(i, amounts, months)
+        return returns
+
+    def _ratings(self, real_returns: np.ndarray) -> np.ndarray:
+        return np.minimum(BASE_RATINGS + (real_returns < 0) + (real_returns < -5), 2)
+
+    @timed('stress.run')
+    def run(self, book: UserBook) -> StressReport:
+        from .suitability import best_instruments, instrument_minimums  # suitability builds on this module
+
+        started = time.perf_counter()
+        n_scen, n_inst = len(self.scenarios), len(INSTRUMENTS)
+        sum_return = np.zeros((n_scen, n_inst))
+        sum_real = np.zeros((n_scen, n_inst))
+        sum_value = np.zeros((n_scen, n_inst))
+        sum_base_value = np.zeros(n_inst)
+        negative_real = np.zeros((n_scen, n_inst))
+        rating_counts = np.zeros((n_scen, n_inst, len(RATINGS)))
+        valid_users = np.zeros(n_inst)
+        book_value = np.zeros(n_scen)
+        book_value_usd = np.zeros(n_scen)
+        book_base_value = 0.0
+        downgraded = np.zeros(n_scen, dtype=np.int64)
+        minimums = instrument_minimums(self)
+
+        for start in range(0, len(book), self.chunk_size):
+            amounts = book.amounts[start:start + self.chunk_size]
+            months = book.months[start:start + self.chunk_size]
+            base = self.base_returns(amounts, months)
+            primary = best_instruments(amounts, months, book.risk[start:start + self.chunk_size], base,
+                                       self.inflation, minimums)
+            rows = np.flatnonzero(primary >= 0)
+            primary = primary[rows]
+
+            valid = ~np.isnan(base)
+            valid_users += valid.sum(axis=0)
+            years = (months / 12)[:, None]
+            principal = amounts[:, None]
+            base_value = principal * np.exp(years * np.log1p(base / 100))
+            sum_base_value += np.nansum(base_value, axis=0)
+            book_base_value += base_value[rows, primary].sum()
+            base_rating = self._ratings((1 + base / 100) / (1 + self.inflation / 100) * 100 - 100)[rows, primary]
+
+            for s in range(n_scen):
+                shocked = base + self.shocks[s]
+                growth = np.log1p(shocked / 100)
+                value = principal * np.exp(years * growth)
+                real = ((1 + shocked / 100) / (1 + self.inflations[s] / 100) - 1) * 100
+                ratings = self._ratings(real)
+
+                sum_return[s] += np.nansum(shocked, axis=0)
+                sum_real[s] += np.nansum(real, axis=0)
+                sum_value[s] += np.nansum(value, axis=0)
+                negative_real[s] += (real < 0).sum(axis=0)
+                for r in range(len(RATINGS)):
+                    rating_counts[s, :, r] += ((ratings == r) & valid).sum(axis=0)
+
+                held = value[rows, primary]
+                book_value[s] += held.sum()
+                book_value_usd[s] += held.sum() / self.fx_rates[s]
+                downgraded[s] += int((ratings[rows, primary] > base_rating).sum())
+
+        report = StressReport(users=len(book), seconds=0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for s, scenario in enumerate(self.scenarios):
+                for i, instrument in enumerate(INSTRUMENTS):
+                    users = valid_users[i]
+                    if not users:
+                        continue
+                    report.instruments.append({
+                        'scenario': scenario.name,
+                        'instrument': instrument,
+                        'users': int(users),
+                        'mean_return': sum_return[s, i] / users,
+                        'mean_real_return': sum_real[s, i] / users,
+                        'value_change_pct': (sum_value[s, i] / sum_base_value[i] - 1) * 100,
+                        'negative_real_share': negative_real[s, i] / users,
+                        'ratings': {name: int(rating_counts[s, i, r]) for r, name in enumerate(RATINGS)},
+                    })
+                report.book.append({
+                    'scenario': scenario.name,
+                    'book_value': float(book_value[s]),
+                    'change_pct': (book_value[s] / book_base_value - 1) * 100,
+                    'book_value_usd': float(book_value_usd[s]),
+                    'downgraded_users': int(downgraded[s]),
+                })
+        report.seconds = time.perf_counter() - started
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress-test a book of users against macro scenarios")
+    parser.add_argument('--users', type=int, default=100000, help="Size of the synthetic book")
+    parser.add_argument('--scenarios', type=int, default=len(DEFAULT_SCENARIOS),
+                        help="Number of scenarios; beyond the defaults, taken from the shock grid")
+    parser.add_argument('--chunk-size', type=int, default=250_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from .data_collector import KenyanMarketDataCollector
+
+    scenarios = (DEFAULT_SCENARIOS + scenario_grid())[:args.scenarios]
+    tester = StressTester(KenyanMarketDataCollector().get_all_market_data(), scenarios, args.chunk_size)
+    report = tester.run(UserBook.synthetic(args.users, args.seed))
+    print(report.format())
+    print(f"\n{len(scenarios)} scenarios x {report.users:,} users x {len(INSTRUMENTS)} instruments "
+          f"in {report.seconds:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
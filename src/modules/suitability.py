@@ -0,0 +1,194 @@
+"""
+Suitability of each instrument for each investor profile, scored and ranked in bulk
+"""
+
+import functools
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .contributions import CATEGORY_INSTRUMENTS
+from .equity_basket import EquityBasketBuilder
+from .settings import get_settings
+from .stress_testing import BASE_RATINGS, INSTRUMENTS, RISK_LEVELS, StressTester, risk_codes
+
+# Per instrument, in INSTRUMENTS order. Liquidity as the engine labels it
+# (Low 0, Medium 0.5, High 1), and the horizon in months from which the
+# instrument fits fully (a 91-day bill, a 6-month deposit, the engine's
+# 6m+ for equities and 24m+ for REITs)
+LIQUIDITY = np.array([0.5, 1.0, 0.0, 1.0, 0.5])
+FIT_MONTHS = np.array([3, 1, 6, 6, 24])
+
+# Liquidity matters fully up to this horizon, and proportionally less beyond it
+LIQUIDITY_HORIZON_MONTHS = 12
+
+# Instruments each risk appetite (rows, RISK_LEVELS order) may be offered,
+# as generate_recommendation has always offered them
+APPETITE_INSTRUMENTS = np.array([
+    [True, True, True, False, False],   # low: bills and bonds, deposits, funds
+    [False, True, True, True, True],    # medium: funds, deposits, equities, REITs
+    [False, True, False, True, True],   # high: equities, funds, REITs
+])
+
+# Score weights per risk appetite, in percentage points of real return:
+# real return, rating steps above the appetite, liquidity, horizon fit, and
+# rating steps above Low. A balanced appetite leads with funds and deposits:
+# a basket's 35-45% would otherwise outscore them at every amount and horizon,
+# and a REIT's point or two over a deposit at every horizon past two years
+WEIGHTS = np.array([
+    [1.0, 4.0, 1.0, 3.0, 0.0],
+    [1.0, 30.0, 1.0, 3.0, 3.0],
+    [1.0, 1.0, 0.5, 3.0, 0.0],
+])
+
+
+class SuitabilityModel:
+    """
+    Scores every (profile, instrument) pair and ranks instruments per profile.
+
+    A profile is an amount, a horizon in months and a risk appetite index;
+    instruments are indices into stress_testing.INSTRUMENTS, and every
+    argument broadcasts, so a (profiles, 1) column against a row of all
+    instruments scores the whole matrix at once. The score is a weighted
+    sum of the real return, a penalty per rating step above the appetite,
+    liquidity (weighted by how short the horizon is), horizon fit and a
+    penalty per rating step above Low.
+    Pairs the profile cannot hold, because the amount is below the
+    instrument's minimum, there is no return for it, or the appetite is
+    never offered it, score -inf.
+    """
+
+    def __init__(self, weights: Optional[np.ndarray] = None):
+        self.weights = WEIGHTS if weights is None else np.asarray(weights, dtype=float)
+
+    def scores(self, amounts, months, risk, instruments, returns, minimums, inflation: float) -> np.ndarray:
+        """Suitability per pair, -inf where ineligible; arguments broadcast"""
+        amounts, months, returns = (np.asarray(a, dtype=float) for a in (amounts, months, returns))
+        risk, codes = np.asarray(risk, dtype=np.intp), np.asarray(instruments, dtype=np.intp)
+        weights = self.weights[risk]
+        real = ((1 + returns / 100) / (1 + inflation / 100) - 1) * 100
+        excess_risk = np.maximum(BASE_RATINGS[codes] - risk, 0)
+        liquidity = LIQUIDITY[codes] * np.minimum(LIQUIDITY_HORIZON_MONTHS / np.maximum(months, 1), 1)
+        fit = np.minimum(months / FIT_MONTHS[codes], 1)
+        score = (weights[..., 0] * real - weights[..., 1] * excess_risk
+                 + weights[..., 2] * liquidity + weights[..., 3] * fit - weights[..., 4] * BASE_RATINGS[codes])
+        eligible = (amounts >= np.asarray(minimums)) & ~np.isnan(returns) & APPETITE_INSTRUMENTS[risk, codes]
+        return np.where(eligible, score, -np.inf)
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Column indices of the best `k` scores per row, best first, with -1
+        past the eligible ones, and their scores
+        """
+        # Rows are a handful of instruments long, where one stable sort per
+        # row beats argpartition, and ties keep the order given
+        best = np.argsort(-scores, axis=-1, kind='stable')[..., :k]
+        best_scores = np.take_along_axis(scores, best, axis=-1)
+        return np.where(np.isfinite(best_scores), best, -1), best_scores
+
+    def rank(self, amounts, months, risk, instruments, returns, minimums, inflation: float,
+             k: int = len(INSTRUMENTS)) -> Tuple[np.ndarray, np.ndarray]:
+        """Top `k` instruments per profile by score; see top_k"""
+        return self.top_k(self.scores(amounts, months, risk, instruments, returns, minimums, inflation), k)
+
+
+_default: Optional[SuitabilityModel] = None
+
+
+def default_suitability_model() -> SuitabilityModel:
+    """SuitabilityModel with the default WEIGHTS, built once per process"""
+    global _default
+    if _default is None:
+        _default = SuitabilityModel()
+    return _default
+
+
+@functools.lru_cache(maxsize=4096)
+def rank_options(amount: float, months: int, risk_appetite: str, categories: Tuple[str, ...],
+                 returns: Tuple[float, ...], minimums: Tuple[float, ...], inflation: float) -> Tuple[int, ...]:
+    """
+    Positions of a recommendation's candidate options, identified by
+    Investment.category, best first, leaving out those the profile cannot
+    hold; empty when it can hold none of them
+    """
+    codes = [INSTRUMENTS.index(CATEGORY_INSTRUMENTS[category]) for category in categories]
+    ranked, _ = default_suitability_model().rank(amount, months, RISK_LEVELS.index(risk_appetite.lower()),
+                                                 codes, returns, minimums, inflation)
+    return tuple(i for i in ranked.tolist() if i >= 0)
+
+
+def equity_minimum(builder: Optional[EquityBasketBuilder]) -> float:
+    """
+    Smallest amount that buys equities: the cheapest board lot, and never
+    below MIN_INVESTMENT_EQUITY; just that setting when there are no
+    counters to build a basket from
+    """
+    minimum = get_settings().min_investment_equity
+    if builder is None or not len(builder.lot_costs):
+        return float(minimum)
+    return max(float(minimum), float(builder.lot_costs.min()))
+
+
+def instrument_minimums(returns: StressTester) -> np.ndarray:
+    """Smallest amount each instrument accepts; REITs closed to an amount already have no return"""
+    settings = get_settings()
+    return np.array([settings.min_investment_treasury, settings.min_investment_mmf, settings.min_investment_fd,
+                     equity_minimum(returns.equities), 0], dtype=float)
+
+
+def rank_book(returns: StressTester, amounts, months, risk_appetites, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top `k` instruments (indices into INSTRUMENTS, -1 when fewer are
+    eligible) and their scores for every user, at the returns `returns`
+    gives; users are scored in chunks of returns.chunk_size
+    """
+    amounts = np.asarray(amounts, dtype=float).ravel()
+    months = np.broadcast_to(np.asarray(months, dtype=float), amounts.shape).ravel()
+    risk = np.broadcast_to(risk_codes(risk_appetites), amounts.shape).ravel()
+    k = min(k, len(INSTRUMENTS))
+    ranked = np.empty((len(amounts), k), dtype=np.intp)
+    scores = np.empty((len(amounts), k))
+    model, minimums = default_suitability_model(), instrument_minimums(returns)
+    codes = np.arange(len(INSTRUMENTS))
+    for start in range(0, len(amounts), returns.chunk_size):
+        chunk = slice(start, start + returns.chunk_size)
+        ranked[chunk], scores[chunk] = model.rank(
+            amounts[chunk, None], months[chunk, None], risk[chunk, None], codes,
+            returns.base_returns(amounts[chunk], months[chunk]), minimums, returns.inflation, k)
+    return ranked, scores
+
+
+def offered_returns(returns: StressTester, amounts, months, risk) -> np.ndarray:
+    """
+    returns.base_returns for 1-D amounts, months and risk codes, pricing only
+    the instruments each appetite is offered (APPETITE_INSTRUMENTS); the rest
+    are NaN
+    """
+    offered = APPETITE_INSTRUMENTS[np.asarray(risk, dtype=np.intp)]
+    rates = np.full(offered.shape, np.nan)
+    for i in range(len(INSTRUMENTS)):
+        rows = np.flatnonzero(offered[:, i])
+        if len(rows):
+            rates[rows, i] = returns.instrument_returns(i, amounts[rows], months[rows])
+    return rates
+
+
+def best_instruments(amounts, months, risk, returns: np.ndarray, inflation: float,
+                     minimums: np.ndarray) -> np.ndarray:
+    """
+    Each profile's best instrument (an index into INSTRUMENTS, -1 where none
+    is eligible), given its returns in every instrument, shape
+    (profiles, len(INSTRUMENTS)), and each instrument's minimum (see
+    instrument_minimums); amounts, months and risk codes are 1-D
+    """
+    ranked, _ = default_suitability_model().rank(
+        np.asarray(amounts, dtype=float)[:, None], np.asarray(months, dtype=float)[:, None],
+        np.asarray(risk, dtype=np.intp)[:, None], np.arange(len(INSTRUMENTS)), returns,
+        minimums, inflation, k=1)
+    return ranked[:, 0]
+
+
+def recommended_instruments(returns: StressTester, amounts, months, risk_appetites) -> np.ndarray:
+    """Each user's best instrument (indices into INSTRUMENTS), -1 where none is eligible"""
+    return rank_book(returns, amounts, months, risk_appetites, k=1)[0][:, 0]
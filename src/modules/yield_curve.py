@@ -0,0 +1,162 @@
+"""
+Treasury yield curve fitted over every tenor in a market data snapshot
+"""
+
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .instrumentation import record_cache
+
+ArrayLike = Union[float, int, np.ndarray, list]
+
+_TENOR_PATTERN = re.compile(r'^(\d+)_(day|year)')
+
+
+def tenor_in_years(key: str):
+    """'91_day_tb' -> 0.25, '5_year_bond' -> 5.0; None for unrecognised keys"""
+    match = _TENOR_PATTERN.match(key)
+    if not match:
+        return None
+    length, unit = int(match.group(1)), match.group(2)
+    return length / 364 if unit == 'day' else float(length)
+
+
+class YieldCurve:
+    """
+    Shape-preserving (PCHIP) interpolation of yields against tenor.
+
+    PCHIP passes through every quoted tenor, never overshoots between them
+    and is flat beyond the shortest and longest tenors, so a 30-year horizon
+    is priced off the 10-year point rather than extrapolated.
+    """
+
+    def __init__(self, tenors_years: np.ndarray, yields: np.ndarray, keys: Optional[List[str]] = None):
+        order = np.argsort(tenors_years)
+        self.tenors = np.asarray(tenors_years, dtype=float)[order]
+        self.yields = np.asarray(yields, dtype=float)[order]
+        self.keys = [keys[i] for i in order] if keys is not None else None
+        self.slopes = self._pchip_slopes(self.tenors, self.yields)
+        # Plain-float copies for the scalar path, where numpy call overhead dominates
+        self._knots = (self.tenors.tolist(), self.yields.tolist(), self.slopes.tolist())
+
+    @classmethod
+    def from_treasury_data(cls, treasury: Dict) -> 'YieldCurve':
+        points = [
+            (tenor_in_years(key), data['yield'], key)
+            for key, data in treasury.items()
+            if tenor_in_years(key) is not None and 'yield' in data
+        ]
+        if not points:
+            raise ValueError("No treasury tenors to build a yield curve from")
+        tenors, yields, keys = zip(*points)
+        return cls(np.array(tenors), np.array(yields), list(keys))
+
+    @staticmethod
+    def _pchip_slopes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        n = len(x)
+        if n < 2:
+            return np.zeros(n)
+        h = np.diff(x)
+        delta = np.diff(y) / h
+        if n == 2:
+            return np.array([delta[0], delta[0]])
+
+        slopes = np.zeros(n)
+        w1 = 2 * h[1:] + h[:-1]
+        w2 = h[1:] + 2 * h[:-1]
+        same_sign = delta[:-1] * delta[1:] > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+        slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+
+        # One-sided three-point end slopes, limited to keep the shape
+        for end, (h0, h1, d0, d1) in ((0, (h[0], h[1], delta[0], delta[1])),
+                                      (-1, (h[-1], h[-2], delta[-1], delta[-2]))):
+            d = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+            if np.sign(d) != np.sign(d0):
+                d = 0.0
+            elif np.sign(d0) != np.sign(d1) and abs(d) > abs(3 * d0):
+                d = 3 * d0
+            slopes[end] = d
+        return slopes
+
+    def yield_at_years(self, years: ArrayLike) -> Union[float, np.ndarray]:
+        """Interpolated yield (percent) for one or many tenors in years"""
+        if isinstance(years, (int, float)):
+            return self._scalar_yield(float(years))
+        t = np.clip(np.asarray(years, dtype=float), self.tenors[0], self.tenors[-1])
+        if len(self.tenors) == 1:
+            result = np.full_like(t, self.yields[0])
+            return float(result) if result.ndim == 0 else result
+
+        i = np.clip(np.searchsorted(self.tenors, t, side='right') - 1, 0, len(self.tenors) - 2)
+        x0, x1 = self.tenors[i], self.tenors[i + 1]
+        y0, y1 = self.yields[i], self.yields[i + 1]
+        d0, d1 = self.slopes[i], self.slopes[i + 1]
+        h = x1 - x0
+        s = (t - x0) / h
+        s2, s3 = s * s, s * s * s
+        result = ((2 * s3 - 3 * s2 + 1) * y0 + (s3 - 2 * s2 + s) * h * d0
+                  + (-2 * s3 + 3 * s2) * y1 + (s3 - s2) * h * d1)
+        return float(result) if result.ndim == 0 else result
+
+    def _scalar_yield(self, t: float) -> float:
+        tenors, yields, slopes = self._knots
+        if t <= tenors[0] or len(tenors) == 1:
+            return yields[0]
+        if t >= tenors[-1]:
+            return yields[-1]
+        i = bisect.bisect_right(tenors, t) - 1
+        h = tenors[i + 1] - tenors[i]
+        s = (t - tenors[i]) / h
+        s2, s3 = s * s, s * s * s
+        return ((2 * s3 - 3 * s2 + 1) * yields[i] + (s3 - 2 * s2 + s) * h * slopes[i]
+                + (-2 * s3 + 3 * s2) * yields[i + 1] + (s3 - s2) * h * slopes[i + 1])
+
+    def support(self, years: float) -> List[str]:
+        """
+        Treasury keys whose yields the curve value at `years` depends on: the
+        bracketing tenors and, through the PCHIP slopes, one neighbour each side
+        """
+        n = len(self.tenors)
+        if years <= self.tenors[0]:
+            indices = [0]
+        elif years >= self.tenors[-1]:
+            indices = [n - 1]
+        else:
+            i = bisect.bisect_right(self._knots[0], years) - 1
+            indices = range(max(0, i - 1), min(n, i + 3))
+        return [self.keys[i] for i in indices] if self.keys else []
+
+    def yield_at_months(self, months: ArrayLike) -> Union[float, np.ndarray]:
+        """Interpolated yield (percent) for one or many horizons in months"""
+        if isinstance(months, (int, float)):
+            return self._scalar_yield(months / 12)
+        return self.yield_at_years(np.asarray(months, dtype=float) / 12)
+
+
+_cache: 'OrderedDict[Tuple, YieldCurve]' = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 32
+
+
+def curve_for_snapshot(treasury: Dict) -> YieldCurve:
+    """Return the curve for a treasury snapshot, building it once per distinct set of yields"""
+    key = tuple(sorted((name, data.get('yield')) for name, data in treasury.items()))
+    with _cache_lock:
+        curve = _cache.get(key)
+        if curve is not None:
+            _cache.move_to_end(key)
+    record_cache('yield_curve', curve is not None)
+    if curve is None:
+        curve = YieldCurve.from_treasury_data(treasury)
+        with _cache_lock:
+            _cache[key] = curve
+            if len(_cache) > _CACHE_SIZE:
+                _cache.popitem(last=False)
+    return curve
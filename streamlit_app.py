@@ -5,12 +5,20 @@ Kenya Investment Advisor
 
 import streamlit as st
 import json
+import math
+import time
+import numpy as np
 from datetime import datetime
 from src.modules import (
     KenyanMarketDataCollector,
     RiskAnalyzer,
     RecommendationEngine,
 )
+from src.modules.circuit_breaker import MarketDataUnavailableError
+from src.modules.contributions import CATEGORY_INSTRUMENTS
+from src.modules.settings import get_settings
+from src.modules.shared_snapshot import DEFAULT_DERIVED, GRID_AMOUNTS, GRID_MONTHS
+from src.modules.stress_testing import INSTRUMENTS
 
 # Page configuration
 st.set_page_config(
@@ -40,17 +48,68 @@ if 'market_data' not in st.session_state:
 if 'recommendation' not in st.session_state:
     st.session_state.recommendation = None
 
-@st.cache_data(ttl=3600)
-def load_market_data():
-    """Load and cache market data for 1 hour"""
+# Chart labels for the instruments the shared arrays are laid out by
+INSTRUMENT_NAMES = {instrument: category for category, instrument in CATEGORY_INSTRUMENTS.items()}
+
+@st.cache_resource
+def get_collector():
+    """Share one collector per process so circuit breakers and last good data persist"""
+    return KenyanMarketDataCollector()
+
+@st.cache_resource
+def attach_snapshot_reader(name):
+    """One reader per process and name; raises if nothing is published under it, so failures are not cached"""
+    from src.modules.shared_snapshot import SnapshotReader
+    return SnapshotReader(name)
+
+def get_snapshot_reader():
+    """Follow the snapshot a local publisher shares (SHARED_SNAPSHOT_NAME), if one is configured and running"""
+    name = get_settings().shared_snapshot_name
+    if not name:
+        return None
     try:
-        collector = KenyanMarketDataCollector()
+        reader = attach_snapshot_reader(name)
+        if not reader.attached:
+            # The publisher restarted under a new control block; follow that one
+            attach_snapshot_reader.clear()
+            reader = attach_snapshot_reader(name)
+        return reader
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+@st.cache_data(ttl=get_settings().market_data_cache_duration_hours * 3600)
+def fetch_market_data():
+    """Fetch and cache market data for MARKET_DATA_CACHE_DURATION_HOURS"""
+    try:
+        collector = get_collector()
         market_data = collector.get_all_market_data()
         return market_data
     except Exception as e:
         st.error(f"Error loading market data: {str(e)}")
         return None
 
+@st.cache_data(ttl=get_settings().market_data_cache_duration_hours * 3600)
+def derive_arrays(market_data):
+    """This process's own yield curve, return grid and risk table, for when no publisher shares them"""
+    return {key: derive(market_data) for key, derive in DEFAULT_DERIVED.items()}
+
+def load_market_data():
+    """
+    Market data and the arrays derived from it: the host's shared snapshot,
+    viewed in place, when a publisher is running, else this process's own fetch
+    """
+    reader = get_snapshot_reader()
+    snapshot = reader.current() if reader is not None else None
+    # A publisher that stopped leaves its last version behind; don't serve it for long
+    max_age = 2 * get_settings().market_data_cache_duration_hours * 3600
+    if snapshot is not None and time.time() - snapshot.published_at < max_age:
+        arrays = snapshot.arrays
+        if not DEFAULT_DERIVED.keys() <= arrays.keys():  # a publisher given other derivations
+            arrays = {**derive_arrays(snapshot.market_data), **arrays}
+        return snapshot.market_data, arrays
+    market_data = fetch_market_data()
+    return market_data, (derive_arrays(market_data) if market_data is not None else None)
+
 def display_header():
     """Display application header"""
     col1, col2 = st.columns([3, 1])
@@ -89,7 +148,7 @@ def display_market_conditions(market_data):
     
     st.info(f"📈 Economic Outlook: **{macro['economic_outlook'].title()}**")
 
-def display_treasury_rates(market_data):
+def display_treasury_rates(market_data, arrays):
     """Display Treasury instrument rates"""
     st.subheader("🏛️ Treasury Instruments")
     
@@ -110,6 +169,9 @@ def display_treasury_rates(market_data):
         st.metric("5-Year Bond", f"{treasury['5_year_bond']['yield']}%", "Yield p.a.")
     with col3:
         st.metric("10-Year Bond", f"{treasury['10_year_bond']['yield']}%", "Yield p.a.")
+    
+    st.line_chart({'Years': (GRID_MONTHS / 12).tolist(), 'Yield (%)': arrays['treasury_yields'].tolist()}, x='Years')
+    st.caption("Yield curve fitted to the bills and bonds above")
 
 def display_nse_performance(market_data):
     """Display NSE market performance"""
@@ -147,7 +209,15 @@ def get_investment_recommendation(market_data, amount, duration, risk):
     }
     return engine.generate_recommendation(user_input)
 
-def display_recommendation(market_data, amount, duration, risk):
+def format_break_even(months):
+    """Holding period before selling out returns the amount invested"""
+    if math.isnan(months):
+        return "costs not earned back at the expected return"
+    if months == 0:
+        return "no entry or exit costs"
+    return f"{months:.0f} months to earn back trading costs"
+
+def display_recommendation(market_data, arrays, amount, duration, risk):
     """Display investment recommendation"""
     with st.spinner("Generating recommendation..."):
         recommendation = get_investment_recommendation(market_data, amount, duration, risk)
@@ -176,6 +246,8 @@ def display_recommendation(market_data, amount, duration, risk):
         st.metric("Expected Earnings", f"KES {primary['earnings']:,.0f}", f"at {primary['expected_return']:.2f}%")
     with col3:
         st.metric("Final Value", f"KES {primary['final_value']:,.0f}", "After maturity")
+    st.caption(f"After fees, trading costs and early-break penalties: KES {primary['net_final_value']:,.0f} "
+               f"({primary['net_return']:.2f}% p.a.); {format_break_even(primary['break_even_months'])}")
     
     # Pros and Cons
     col1, col2 = st.columns(2)
@@ -214,6 +286,26 @@ def display_recommendation(market_data, amount, duration, risk):
         st.markdown(f"Final Value: **KES {scenarios['worst_case']['final_value']:,.0f}**")
         st.caption(scenarios['worst_case']['description'])
     
+    with st.expander("📐 Sensitivity to market inputs"):
+        user_input = {'amount': amount, 'duration_months': duration, 'risk_appetite': risk}
+        table = RecommendationEngine(market_data, {}).recommendation_sensitivities(user_input, recommendation)
+        st.caption("First-order effect of moving each input on its own, biggest first")
+        for row in [row for row in table.rows(0) if row['real_return_change']][:5]:
+            st.markdown(f"• `{row['input']}` {row['value']:g} → {row['value'] + row['move']:g}: "
+                        f"final value KES {row['final_value_change']:+,.0f}, "
+                        f"real return {row['real_return_change']:+.2f} pts")
+    
+    with st.expander("📈 Expected return by investment duration"):
+        # The grid's opening amount nearest this one, on a log scale
+        row = int(np.abs(np.log(GRID_AMOUNTS / amount)).argmin())
+        grid = arrays['base_returns'][row]
+        st.line_chart(
+            {'Months': GRID_MONTHS.tolist(),
+             **{INSTRUMENT_NAMES[instrument]: grid[:, i].tolist() for i, instrument in enumerate(INSTRUMENTS)}},
+            x='Months',
+        )
+        st.caption(f"Expected return (% p.a.) of each option for KES {GRID_AMOUNTS[row]:,.0f}, by months invested")
+    
     # Alternatives
     st.subheader("🔄 Alternative Investment Options")
     
@@ -230,8 +322,65 @@ def display_recommendation(market_data, amount, duration, risk):
                 st.metric("Risk", alt['risk_rating'])
             
             st.markdown(f"**Liquidity**: {alt['liquidity']}")
+            st.markdown(f"**After costs**: KES {alt['net_final_value']:,.0f} ({alt['net_return']:.2f}% p.a.); "
+                        f"{format_break_even(alt['break_even_months'])}")
+
+def display_savings_plan(market_data, amount, monthly, duration, risk):
+    """Display projections with a monthly contribution on top of the initial amount"""
+    engine = RecommendationEngine(market_data, {})
+    user_input = {
+        'amount': amount,
+        'duration_months': duration,
+        'risk_appetite': risk
+    }
+    plan = engine.project_contributions(user_input, monthly)
+    primary = plan['plans'][0]
+    
+    st.subheader(f"📅 Savings Plan: KES {monthly:,.0f} a month")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Paid In", f"KES {plan['total_contributed']:,.0f}", f"over {duration}m")
+    with col2:
+        st.metric("Final Value", f"KES {primary['final_value']:,.0f}", primary['instrument'])
+    with col3:
+        st.metric("Earnings", f"KES {primary['earnings']:,.0f}", f"at {primary['expected_return']:.2f}%")
+    
+    st.line_chart({p['instrument']: p['balances'] for p in plan['plans']})
+    st.caption("Balance by month for each option; new money waits for the next bill rollover or deposit term")
+
+def display_goal_plan(market_data, target, amount, duration, risk):
+    """Display the amount or duration needed to reach a target value"""
+    engine = RecommendationEngine(market_data, {})
+    settings = get_settings()
+    months = list(range(settings.min_investment_duration_months, settings.max_investment_duration_months + 1))
+    
+    # Every duration on the slider, solved in one batched call per outcome
+    expected = engine.required_amounts(target, months, risk)
+    prudent = engine.required_amounts(target, months, risk, percentile=5)
+    needed_months = engine.required_durations(target, amount, risk)
+    prudent_months = engine.required_durations(target, amount, risk, percentile=5)
+    
+    st.subheader(f"🎯 Goal Planner: KES {target:,.0f}")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(f"Invest for {duration}m", f"KES {expected[months.index(duration)]:,.0f}",
+                  f"KES {prudent[months.index(duration)]:,.0f} at 5th percentile", delta_color="off")
+    with col2:
+        st.metric(f"Months for KES {amount:,.0f}",
+                  "Out of reach" if math.isnan(needed_months) else f"{needed_months:.0f}",
+                  "Expected return", delta_color="off")
+    with col3:
+        st.metric("Months at 5th percentile",
+                  "Out of reach" if math.isnan(prudent_months) else f"{prudent_months:.0f}",
+                  "19 out of 20 outcomes", delta_color="off")
+    
+    st.line_chart(
+        {'Months': months, 'Expected return': expected.tolist(), '5th percentile': prudent.tolist()},
+        x='Months',
+    )
+    st.caption("Amount to invest today to reach the target, by investment duration")
 
-def display_risk_analysis(market_data, primary_instrument):
+def display_risk_analysis(market_data, arrays, primary_instrument):
     """Display risk analysis"""
     st.subheader("⚠️ Risk Analysis")
     
@@ -276,6 +425,15 @@ def display_risk_analysis(market_data, primary_instrument):
                     st.warning(f"Error displaying factor: {str(e)}")
         else:
             st.info("No specific risk factors identified.")
+        
+        st.markdown("**Risk by Investment Duration:**")
+        st.line_chart(
+            {'Months': GRID_MONTHS.tolist(),
+             **{INSTRUMENT_NAMES[instrument]: arrays['risk_severity'][i].tolist()
+                for i, instrument in enumerate(INSTRUMENTS)}},
+            x='Months',
+        )
+        st.caption("Mean severity of each option's risk factors (0 Low, 1 Medium, 2 High) for KES 100,000")
             
     except Exception as e:
         st.error(f"Error in risk analysis: {str(e)}")
@@ -287,7 +445,7 @@ def main():
     
     # Load market data with error handling
     try:
-        market_data = load_market_data()
+        market_data, arrays = load_market_data()
         if market_data is None:
             st.error("Failed to load market data. Please refresh the page.")
             return
@@ -295,27 +453,35 @@ def main():
         st.error(f"Error loading market data: {str(e)}")
         return
     
+    for error in market_data.get('errors', []):
+        if error['served_stale']:
+            st.warning(f"⚠️ {error['source']} data unavailable ({error['error_type']}); "
+                       f"showing last good data from {error['stale_since'][:16]}")
+        else:
+            st.warning(f"⚠️ {error['source']} data unavailable ({error['error_type']}: {error['message']})")
+    
     # Sidebar for input
     st.sidebar.markdown("## 📋 Investment Details")
+    settings = get_settings()
     
     # Investment amount
     amount = st.sidebar.number_input(
         "Investment Amount (KES)",
-        min_value=100,
+        min_value=settings.min_investment,
         max_value=10000000,
         value=50000,
         step=1000,
-        help="Minimum investment is KES 100"
+        help=f"Minimum investment is KES {settings.min_investment:,}"
     )
     
     # Investment duration
     duration = st.sidebar.slider(
         "Investment Duration (Months)",
-        min_value=6,
-        max_value=60,
-        value=6,
+        min_value=settings.min_investment_duration_months,
+        max_value=settings.max_investment_duration_months,
+        value=settings.min_investment_duration_months,
         step=1,
-        help="Minimum duration is 6 months"
+        help=f"Minimum duration is {settings.min_investment_duration_months} months"
     )
     
     # Risk appetite
@@ -332,6 +498,26 @@ def main():
     )
     risk = risk_options[risk_display]
     
+    # Monthly contributions
+    monthly = st.sidebar.number_input(
+        "Monthly Contribution (KES)",
+        min_value=0,
+        max_value=1000000,
+        value=0,
+        step=500,
+        help="Paid in at the start of every month; leave at 0 for a lump sum only"
+    )
+    
+    # Optional goal
+    target = st.sidebar.number_input(
+        "Target Value (KES)",
+        min_value=0,
+        max_value=100000000,
+        value=0,
+        step=10000,
+        help="Leave at 0 to skip the goal planner"
+    )
+    
     # Submit button
     st.sidebar.markdown("---")
     generate_button = st.sidebar.button(
@@ -350,7 +536,7 @@ def main():
         try:
             display_market_conditions(market_data)
             st.markdown("---")
-            display_treasury_rates(market_data)
+            display_treasury_rates(market_data, arrays)
             st.markdown("---")
             display_nse_performance(market_data)
         except Exception as e:
@@ -362,7 +548,16 @@ def main():
             try:
                 recommendation = get_investment_recommendation(market_data, amount, duration, risk)
                 st.session_state.recommendation = recommendation
-                display_recommendation(market_data, amount, duration, risk)
+                display_recommendation(market_data, arrays, amount, duration, risk)
+                if monthly:
+                    st.markdown("---")
+                    display_savings_plan(market_data, amount, monthly, duration, risk)
+                if target:
+                    st.markdown("---")
+                    display_goal_plan(market_data, target, amount, duration, risk)
+            except MarketDataUnavailableError as e:
+                st.error(f"Cannot generate a recommendation right now: {', '.join(e.sources)} "
+                         "data is unavailable. Please try again shortly.")
             except Exception as e:
                 st.error(f"Error generating recommendation: {str(e)}")
         else:
@@ -374,7 +569,7 @@ def main():
             try:
                 if st.session_state.recommendation:
                     primary_instrument = st.session_state.recommendation['primary_recommendation']['instrument']
-                    display_risk_analysis(market_data, primary_instrument)
+                    display_risk_analysis(market_data, arrays, primary_instrument)
             except Exception as e:
                 st.error(f"Error displaying risk analysis: {str(e)}")
         else:
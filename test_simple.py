@@ -2,8 +2,11 @@
 Quick test of FinApp modules
 """
 
+import os
 import sys
-sys.path.insert(0, r'c:\Users\HP\FinApp')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
 
 from src.modules import (
     KenyanMarketDataCollector,
@@ -2,8 +2,11 @@
 Quick test to verify Streamlit app loads without errors
 """
 
+import os
 import sys
-sys.path.insert(0, r'c:\Users\HP\FinApp')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
 
 print("Testing Streamlit App Components...\n")
 
@@ -29,7 +32,7 @@ except ImportError as e:
 
 # Test 3: Verify streamlit_app.py syntax
 try:
-    with open(r'c:\Users\HP\FinApp\streamlit_app.py', 'r', encoding='utf-8') as f:
+    with open(os.path.join(ROOT, 'streamlit_app.py'), 'r', encoding='utf-8') as f:
         code = f.read()
     compile(code, 'streamlit_app.py', 'exec')
     print("✓ streamlit_app.py syntax is valid")
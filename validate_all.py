@@ -3,8 +3,11 @@ Comprehensive validation script for FinApp
 Tests all modules for errors and functionality
 """
 
+import os
 import sys
-sys.path.insert(0, r'c:\Users\HP\FinApp')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
 
 def test_imports():
     """Test that all modules can be imported"""
@@ -224,8 +227,6 @@ def test_file_structure():
     print("TEST 6: VALIDATING FILE STRUCTURE")
     print("=" * 70)
     
-    import os
-    
     required_files = [
         'app.py',
         'config.ini',
@@ -238,7 +239,7 @@ def test_file_structure():
     
     all_exist = True
     for file in required_files:
-        path = f'c:\\Users\\HP\\FinApp\\{file}'
+        path = os.path.join(ROOT, file)
         if os.path.exists(path):
             size = os.path.getsize(path)
             print(f"✓ {file} ({size} bytes)")
@@ -248,6 +249,1274 @@ def test_file_structure():
     
     return all_exist
 
+def test_batch_returns():
+    """Test that batch models price every instrument as the engine does"""
+    print("\n" + "=" * 70)
+    print("TEST 7: VALIDATING BATCH RETURNS AGAINST THE ENGINE")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.recommendation_engine import RecommendationEngine
+        from src.modules.stress_testing import INSTRUMENTS, StressTester
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        engine = RecommendationEngine(data, {})
+        builders = [engine.generate_treasury_option, engine.generate_money_market_option,
+                    engine.generate_fixed_deposit_option, engine.generate_equity_option,
+                    engine.generate_reit_option]
+        
+        amounts = np.array([1, 50, 1000, 5000, 9999, 10000, 50000, 1_000_000, 6_000_000, 25_000_000], dtype=float)
+        months = np.array([1, 3, 4, 6, 9, 12, 13, 24, 120, 360], dtype=float)
+        amounts, months = (grid.ravel() for grid in np.meshgrid(amounts, months))
+        batch = StressTester(data).base_returns(amounts, months)
+        
+        mismatches = 0
+        for i, name in enumerate(INSTRUMENTS):
+            before = mismatches
+            for user, (amount, duration) in enumerate(zip(amounts, months)):
+                option = builders[i]({'amount': float(amount), 'duration_months': int(duration),
+                                      'risk_appetite': 'medium'})
+                quoted = np.nan if option is None else option.expected_return_percent
+                if not (quoted == batch[user, i] or (np.isnan(quoted) and np.isnan(batch[user, i]))):
+                    print(f"✗ {name}: KES {amount:,.0f} over {duration:.0f}m, "
+                          f"engine {quoted} vs batch {batch[user, i]}")
+                    mismatches += 1
+            if mismatches == before:
+                print(f"✓ {name}: engine and batch returns agree for {len(amounts)} profiles")
+        
+        return mismatches == 0
+    
+    except Exception as e:
+        print(f"✗ Error in batch returns: {e}")
+        return False
+
+def test_suitability():
+    """Test that recommendations only offer instruments the profile can hold"""
+    print("\n" + "=" * 70)
+    print("TEST 8: VALIDATING SUITABILITY RANKING")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.contributions import CATEGORY_INSTRUMENTS
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.recommendation_engine import NoEligibleInstrumentError, RecommendationEngine
+        from src.modules.stress_testing import INSTRUMENTS
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        engine = RecommendationEngine(data, {})
+        
+        for amount, risk in ((1, 'Low'), (1, 'Medium'), (50, 'Medium')):
+            try:
+                engine.generate_recommendation({'amount': amount, 'duration_months': 12, 'risk_appetite': risk})
+                print(f"✗ KES {amount} at {risk} risk was offered an instrument it cannot buy")
+                return False
+            except NoEligibleInstrumentError:
+                print(f"✓ KES {amount} at {risk} risk: no eligible instrument reported")
+        
+        amounts = [100, 999, 1000, 5000, 10000, 50000, 1_000_000]
+        months = [1, 6, 12, 36, 120]
+        risks = ['Low', 'Medium', 'High']
+        profiles = [(a, m, r) for a in amounts for m in months for r in risks]
+        batch = engine.rank_instruments([p[0] for p in profiles], [p[1] for p in profiles],
+                                        [p[2] for p in profiles], k=1)[0][:, 0]
+        for (amount, duration, risk), best in zip(profiles, batch):
+            try:
+                recommendation = engine.generate_recommendation(
+                    {'amount': amount, 'duration_months': duration, 'risk_appetite': risk})
+            except NoEligibleInstrumentError:
+                if best < 0:
+                    continue
+                raise
+            options = [recommendation['primary_recommendation']] + recommendation['alternatives']
+            primary = INSTRUMENTS.index(CATEGORY_INSTRUMENTS[options[0]['category']])
+            if primary != best:
+                print(f"✗ KES {amount:,} over {duration}m at {risk} risk: engine recommends "
+                      f"{INSTRUMENTS[primary]}, batch ranking {INSTRUMENTS[best]}")
+                return False
+        print(f"✓ Engine and batch ranking agree on the best instrument for {len(profiles)} profiles")
+        
+        # A balanced appetite leads with funds or deposits wherever it can buy one,
+        # and leaves equities to high risk
+        amounts = np.unique(np.round(np.geomspace(1000, 500_000, 60)))
+        months = np.arange(6, 361, 6)
+        grid_amounts, grid_months = (grid.ravel() for grid in np.meshgrid(amounts, months))
+        primaries = {}
+        for risk in ('Medium', 'High'):
+            primaries[risk] = engine.rank_instruments(grid_amounts, grid_months, [risk] * len(grid_amounts),
+                                                      k=1)[0][:, 0]
+        led = {INSTRUMENTS[i] for i in np.unique(primaries['Medium'])}
+        if not led <= {'money_market', 'fixed_deposit'}:
+            print(f"✗ Medium risk leads with {sorted(led)} across KES 1,000-500,000 and 6-360 months")
+            return False
+        equity = INSTRUMENTS.index('equity')
+        lot = engine.generate_equity_option({'amount': 1000, 'duration_months': 12,
+                                             'risk_appetite': 'High'}).min_investment
+        if np.any((primaries['High'] == equity) & (grid_amounts < lot)) or not np.any(primaries['High'] == equity):
+            print(f"✗ High risk is offered equities below one board lot (KES {lot:,.0f}) or never")
+            return False
+        print(f"✓ Medium risk leads with {' or '.join(sorted(led))} for all {len(grid_amounts)} profiles; "
+              f"high risk holds equities from one board lot (KES {lot:,.0f})")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in suitability ranking: {e}")
+        return False
+
+def test_goal_solver():
+    """Test that goal seeking inverts the engine's own projections"""
+    print("\n" + "=" * 70)
+    print("TEST 9: VALIDATING GOAL SOLVER ROUND TRIPS")
+    print("=" * 70)
+    
+    try:
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.recommendation_engine import RecommendationEngine
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        engine = RecommendationEngine(data, {})
+        
+        for risk in ('Low', 'Medium', 'High'):
+            for amount in (12_345, 50_000, 250_000):
+                for months in (9, 24, 360):
+                    user_input = {'amount': amount, 'duration_months': months, 'risk_appetite': risk}
+                    target = engine.generate_recommendation(user_input)['primary_recommendation']['final_value']
+                    required = float(engine.required_amounts(target, months, risk))
+                    reached = engine.generate_recommendation(
+                        {**user_input, 'amount': required})['primary_recommendation']['final_value']
+                    # Treasury returns do not fall with the amount, so the inverse is exact
+                    if reached < target * (1 - 1e-9) or (risk == 'Low' and required != amount):
+                        print(f"✗ KES {amount:,} over {months}m at {risk} risk: target KES {target:,.2f} "
+                              f"needs KES {required:,.0f}, which reaches KES {reached:,.2f}")
+                        return False
+                    duration = float(engine.required_durations(target, amount, risk))
+                    if duration > months:
+                        print(f"✗ KES {amount:,} at {risk} risk reaches KES {target:,.2f} in {months}m, "
+                              f"but the solver needs {duration:.0f}m")
+                        return False
+            print(f"✓ {risk} risk: required amounts and durations reach the engine's projections")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in goal solver: {e}")
+        return False
+
+def test_contributions():
+    """Test that batch savings plans match the engine's own projections"""
+    print("\n" + "=" * 70)
+    print("TEST 10: VALIDATING SAVINGS PLAN PROJECTIONS")
+    print("=" * 70)
+    
+    try:
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.recommendation_engine import RecommendationEngine
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        engine = RecommendationEngine(data, {})
+        
+        for risk in ('Low', 'Medium', 'High'):
+            for amount in (1_000, 50_000, 2_000_000):
+                for months in (1, 7, 24, 120):
+                    user_input = {'amount': amount, 'duration_months': months, 'risk_appetite': risk}
+                    plan = engine.project_contributions(user_input, 5_000)['plans'][0]['final_value']
+                    batch = float(engine.project_savings_plans(amount, 5_000, months, risk))
+                    if abs(plan - batch) > 1e-6 * plan:
+                        print(f"✗ KES {amount:,} + 5,000/month over {months}m at {risk} risk: "
+                              f"plan KES {plan:,.2f}, batch KES {batch:,.2f}")
+                        return False
+            print(f"✓ {risk} risk: batch plan values match the recommended plan")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in savings plans: {e}")
+        return False
+
+def test_costs():
+    """Test that batch cost projections match the engine's net fields"""
+    print("\n" + "=" * 70)
+    print("TEST 11: VALIDATING NET-OF-COST PROJECTIONS")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.contributions import CATEGORY_INSTRUMENTS
+        from src.modules.costs import book_projection
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.recommendation_engine import RecommendationEngine
+        from src.modules.stress_testing import INSTRUMENTS, StressTester
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        engine = RecommendationEngine(data, {})
+        
+        amounts = np.array([1_000, 50_000, 2_000_000], dtype=float)
+        months = np.array([1, 7, 24, 120], dtype=float)
+        amounts, months = (grid.ravel() for grid in np.meshgrid(amounts, months))
+        projection = book_projection(StressTester(data), amounts, months)
+        
+        for risk in ('Low', 'Medium', 'High'):
+            for user, (amount, duration) in enumerate(zip(amounts, months)):
+                primary = engine.generate_recommendation(
+                    {'amount': float(amount), 'duration_months': int(duration), 'risk_appetite': risk}
+                )['primary_recommendation']
+                i = INSTRUMENTS.index(CATEGORY_INSTRUMENTS[primary['category']])
+                batch = (projection.net_returns[user, i], projection.net_values[user, i],
+                         projection.costs[user, i], projection.break_even_months[user, i])
+                quoted = (primary['net_return'], primary['net_final_value'], primary['costs'],
+                          primary['break_even_months'])
+                if not np.allclose(batch, quoted, rtol=1e-9, atol=1e-6, equal_nan=True):
+                    print(f"✗ KES {amount:,.0f} over {duration:.0f}m at {risk} risk: "
+                          f"engine {quoted} vs batch {batch}")
+                    return False
+            print(f"✓ {risk} risk: batch net outcomes match the recommendation's")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in cost projections: {e}")
+        return False
+
+def test_sensitivities():
+    """Test that analytic sensitivities match finite differences of the engine's projections"""
+    print("\n" + "=" * 70)
+    print("TEST 12: VALIDATING SENSITIVITIES AGAINST ENGINE RERUNS")
+    print("=" * 70)
+    
+    try:
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.recommendation_engine import RecommendationEngine
+        from src.modules.sensitivity import PERCENT_FIELDS, bumped
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        engine = RecommendationEngine(data, {})
+        # Small enough not to cross a change of fund or board lots, large
+        # enough that the engine's 2dp rounding stays a few percent of it
+        step = 0.1
+        
+        for risk in ('Low', 'Medium', 'High'):
+            checked = 0
+            for amount in (1_000, 50_000, 2_000_000):
+                for months in (3, 6, 12, 24, 120):
+                    user_input = {'amount': amount, 'duration_months': months, 'risk_appetite': risk}
+                    recommendation = engine.generate_recommendation(user_input)
+                    primary = recommendation['primary_recommendation']
+                    table = engine.recommendation_sensitivities(user_input, recommendation)
+                    value_per_point = primary['final_value'] * months / 12 / (100 + primary['expected_return'])
+                    for row in table.rows(0):
+                        path = tuple(row['input'].split('.'))
+                        if path[-1] not in PERCENT_FIELDS or path[0] == 'macro':
+                            continue
+                        rerun = [RecommendationEngine(bumped(data, path, row['value'] + shift), {})
+                                 .generate_recommendation(user_input)['primary_recommendation']
+                                 for shift in (step, -step)]
+                        if any(r['category'] != primary['category'] for r in rerun):
+                            continue
+                        difference = (rerun[0]['final_value'] - rerun[1]['final_value']) / (2 * step)
+                        if abs(difference - row['d_final_value']) > 0.01 * abs(difference) + 0.05 * value_per_point:
+                            print(f"✗ KES {amount:,} over {months}m at {risk} risk, {row['input']}: "
+                                  f"analytic {row['d_final_value']:,.2f} vs rerun {difference:,.2f} KES per point")
+                            return False
+                        checked += 1
+            print(f"✓ {risk} risk: {checked} analytic slopes match engine reruns")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in sensitivities: {e}")
+        return False
+
+def test_shared_snapshot():
+    """Test that snapshots round-trip through shared memory"""
+    print("\n" + "=" * 70)
+    print("TEST 13: VALIDATING SHARED SNAPSHOTS")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.shared_snapshot import DEFAULT_DERIVED, SnapshotPublisher, SnapshotReader
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        name = f"finapp-validate-{os.getpid()}"
+        
+        try:
+            SnapshotPublisher(name + 'x' * 64)
+            print("✗ A name too long for the control block was accepted")
+            return False
+        except ValueError:
+            print("✓ Names too long for the control block are rejected")
+        
+        grid = np.arange(12.0).reshape(3, 4)
+        with SnapshotPublisher(name, derived={'grid': lambda market_data: grid}) as publisher:
+            publisher.publish(data)
+            reader = SnapshotReader(name)
+            snapshot = reader.current()
+            if snapshot.market_data != data or not np.array_equal(snapshot.arrays['grid'], grid):
+                print("✗ Snapshot read back differs from the one published")
+                return False
+            if snapshot.arrays['grid'].flags.writeable:
+                print("✗ Shared arrays are writeable")
+                return False
+            publisher.publish(data)
+            if reader.current().version != 2:
+                print("✗ Reader did not follow a new version")
+                return False
+            print("✓ Market data and arrays round-trip; readers follow new versions")
+        
+        with SnapshotPublisher(name) as publisher:
+            publisher.publish(data)
+            if reader.attached or not SnapshotReader(name).attached:
+                print("✗ Restarted publisher not detected")
+                return False
+            print("✓ Readers notice a restarted publisher")
+            arrays = SnapshotReader(name).current().arrays
+            for key, derive in DEFAULT_DERIVED.items():
+                if key not in arrays or not np.array_equal(arrays[key], derive(data), equal_nan=True):
+                    print(f"✗ Default derived array {key} not shared")
+                    return False
+            print(f"✓ Publishers share {', '.join(DEFAULT_DERIVED)} by default")
+        reader.close()
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in shared snapshots: {e}")
+        return False
+
+def test_columnar_export():
+    """Test that journal reports round-trip through the columnar export"""
+    print("\n" + "=" * 70)
+    print("TEST 14: VALIDATING COLUMNAR EXPORT")
+    print("=" * 70)
+    
+    try:
+        import tempfile
+        from datetime import datetime
+        from src.modules.columnar_export import NET_FIELDS, ColumnarReportReader
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.recommendation_engine import RecommendationEngine
+        from src.modules.report_journal import ReportJournal
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        engine = RecommendationEngine(data, {})
+        user_inputs = [{'amount': amount, 'duration_months': months, 'risk_appetite': risk}
+                       for risk in ('Low', 'Medium', 'High')
+                       for amount in (5_000, 250_000) for months in (3, 18, 60)]
+        recommendations = [engine.generate_recommendation(user_input) for user_input in user_inputs]
+        
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'reports.fcol')
+            with ReportJournal(os.path.join(directory, 'reports.db')) as journal:
+                for user_input, recommendation in zip(user_inputs, recommendations):
+                    journal.append({'timestamp': datetime.now().isoformat(), 'user_input': user_input,
+                                    'recommendation': recommendation})
+                exported = journal.export_columnar(output)
+            if exported != len(user_inputs):
+                print(f"✗ Exported {exported} of {len(user_inputs)} reports")
+                return False
+            
+            read = list(ColumnarReportReader(output).iter_recommendations())
+            fields = ('instrument', 'expected_return', 'final_value') + NET_FIELDS
+            for row, user_input, recommendation in zip(read, user_inputs, recommendations):
+                options = [recommendation['primary_recommendation']] + recommendation['alternatives'][:3]
+                stored = [row['primary_recommendation']] + row['alternatives']
+                if row['user_input'] != user_input or len(stored) != len(options) or any(
+                        option[name] != copy[name] for option, copy in zip(options, stored) for name in fields):
+                    print(f"✗ {user_input}: exported recommendation differs from the one reported")
+                    return False
+        print(f"✓ {exported} journal reports exported and read back, after-cost fields included")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in columnar export: {e}")
+        return False
+
+def test_market_calendar():
+    """Test that Idd-ul-Fitr is a holiday every year and Idd-ul-Azha only when gazetted"""
+    print("\n" + "=" * 70)
+    print("TEST 15: VALIDATING MARKET CALENDAR")
+    print("=" * 70)
+    
+    try:
+        from datetime import date
+        from src.modules import market_calendar
+        from src.modules.market_calendar import (
+            FIRST_YEAR, IDD_UL_FITR, IDD_UL_FITR_HIJRI, LAST_YEAR, default_calendar, idd_dates, kenyan_holidays,
+        )
+        
+        calendar = default_calendar()
+        days = idd_dates(FIRST_YEAR, LAST_YEAR, IDD_UL_FITR_HIJRI, IDD_UL_FITR)
+        missing = sorted(set(range(FIRST_YEAR, LAST_YEAR + 1)) - {day.year for day in days})
+        gaps = {(later - earlier).days for earlier, later in zip(days, days[1:])}
+        if missing or not gaps <= set(range(352, 357)):
+            print(f"✗ Idd-ul-Fitr: no date in {missing}, or Islamic years of {sorted(gaps)} days")
+            return False
+        open_days = [day for day in days if calendar.is_business_day(day)]
+        if open_days:
+            print(f"✗ Idd-ul-Fitr: {open_days} are business days")
+            return False
+        print(f"✓ Idd-ul-Fitr: a holiday every year {FIRST_YEAR}-{LAST_YEAR} ({len(days)} dates)")
+        
+        listed = {date.fromisoformat(text) for text in IDD_UL_FITR}
+        if not listed <= set(days):
+            print("✗ Listed Idd-ul-Fitr dates were not used")
+            return False
+        print("✓ Listed dates replace the tabular ones")
+        
+        # Idd-ul-Azha (10 Dhul Hijja) is a holiday only on the dates gazetted:
+        # take a tabular date on a weekday no other holiday falls on
+        azha = next(day for day in idd_dates(FIRST_YEAR, LAST_YEAR, (12, 10))
+                    if day.weekday() < 5 and day not in kenyan_holidays(day.year, day.year))
+        if not calendar.is_business_day(azha):
+            print(f"✗ Idd-ul-Azha on {azha} is a holiday without a gazette notice")
+            return False
+        baseline = set(kenyan_holidays())
+        saved = market_calendar.IDD_UL_AZHA
+        try:
+            market_calendar.IDD_UL_AZHA = [azha.isoformat()]
+            added = set(kenyan_holidays()) - baseline
+        finally:
+            market_calendar.IDD_UL_AZHA = saved
+        if added != {azha}:
+            print(f"✗ Gazetting Idd-ul-Azha on {azha} adds {sorted(added)}")
+            return False
+        print("✓ Idd-ul-Azha is a holiday only on gazetted dates")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in market calendar: {e}")
+        return False
+
+def test_ladder_simulator():
+    """Test that ladders start from the engine's rates and stagger their rungs"""
+    print("\n" + "=" * 70)
+    print("TEST 16: VALIDATING LADDER SIMULATOR")
+    print("=" * 70)
+    
+    try:
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.ladder_simulator import RolloverSimulator
+        from src.modules.recommendation_engine import RecommendationEngine
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        engine = RecommendationEngine(data, {})
+        # Without rate volatility every path rolls at today's rates
+        simulator = RolloverSimulator(data, sigma=0.0, seed=0)
+        
+        for amount in (50_000, 5_000_000, 60_000_000):
+            quoted = engine.generate_fixed_deposit_option(
+                {'amount': amount, 'duration_months': 6, 'risk_appetite': 'Low'}).expected_return_percent
+            result = simulator.simulate(amount, 12, 'fixed_deposit', {6: 1.0}, paths=10)
+            if abs(result.annualized_return(result.expected_value) - quoted) > 0.005 + 1e-9:
+                print(f"✗ KES {amount:,} rolled in 6m deposits earns "
+                      f"{result.annualized_return(result.expected_value):.3f}%, the engine quotes {quoted}%")
+                return False
+        print("✓ Fixed deposit rungs earn the blended rate the engine quotes for their amount")
+        
+        # Four tranches of 364-day bills, bought 0, 3, 6 and 9 months in, after 91-day bills
+        short, long = data['treasury']['91_day_tb']['yield'] / 100, data['treasury']['364_day_tb']['yield'] / 100
+        expected = sum(25_000 * (1 + short) ** (3 * i / 12) * (1 + long) ** ((12 - 3 * i) / 12) for i in range(4))
+        staggered = simulator.simulate(100_000, 12, 'treasury', {12: 1.0}, paths=10).expected_value
+        if abs(staggered - expected) > 1e-6 * expected:
+            print(f"✗ A staggered 364-day rung is worth KES {staggered:,.2f}, expected KES {expected:,.2f}")
+            return False
+        print("✓ Long rungs are bought in tranches a shortest tenor apart")
+        
+        # The engine's rollover cases are ordered percentiles of the same ladder
+        user_input = {'amount': 100_000, 'duration_months': 24, 'risk_appetite': 'Low'}
+        for instrument in ('treasury', 'fixed_deposit'):
+            cases = engine.simulate_rollover(user_input, instrument, paths=2_000)
+            values = [cases[name]['final_value'] for name in ('worst_case', 'base_case', 'best_case')]
+            returns = [cases[name]['return_percent'] for name in ('worst_case', 'base_case', 'best_case')]
+            implied = [((value / 100_000) ** (12 / 24) - 1) * 100 for value in values]
+            if values != sorted(values) or max(abs(a - b) for a, b in zip(returns, implied)) > 1e-9:
+                print(f"✗ {instrument} rollover cases are inconsistent: {cases}")
+                return False
+        print("✓ Rollover worst/base/best cases are the 5th/50th/95th percentile outcomes")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in ladder simulator: {e}")
+        return False
+
+def test_instrumentation():
+    """Test that metrics are free when disabled and well-formed when recorded"""
+    print("\n" + "=" * 70)
+    print("TEST 17: VALIDATING INSTRUMENTATION")
+    print("=" * 70)
+    
+    try:
+        from src.modules import instrumentation
+        
+        if not instrumentation.METRICS_ENABLED:
+            def work():
+                return 42
+            shared = instrumentation.stage('validate') is instrumentation.stage('other')
+            if instrumentation.timed('validate')(work) is not work or not shared:
+                print("✗ Disabled instrumentation still wraps functions or blocks")
+                return False
+            print("✓ Disabled instrumentation adds no wrappers")
+        
+        instrumentation.reset()
+        for seconds in (0.0000005, 0.003, 0.003, 20.0):
+            instrumentation.observe('stage', 'validate', seconds)
+        for hit in (True, True, True, False):
+            instrumentation.increment('finapp_cache_requests', cache='validate', result='hit' if hit else 'miss')
+        text = instrumentation.export_openmetrics()
+        rates = instrumentation.cache_hit_rates()
+        instrumentation.reset()
+        
+        buckets = [int(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+                   if line.startswith('finapp_stage_latency_seconds_bucket{stage="validate"')]
+        if buckets != sorted(buckets) or buckets[0] != 1 or buckets[-2] != 3 or buckets[-1] != 4:
+            print(f"✗ Histogram buckets are not cumulative: {buckets}")
+            return False
+        if not text.endswith("# EOF\n") or rates != {'validate': 0.75}:
+            print(f"✗ OpenMetrics text or cache hit rates are wrong: {rates}")
+            return False
+        print("✓ Histograms, counters and hit rates export as OpenMetrics")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in instrumentation: {e}")
+        return False
+
+def test_circuit_breakers():
+    """Test that a failing source is served stale, then skipped, then probed"""
+    print("\n" + "=" * 70)
+    print("TEST 18: VALIDATING CIRCUIT BREAKERS")
+    print("=" * 70)
+    
+    try:
+        import logging
+        from src.modules.circuit_breaker import CircuitBreaker
+        from src.modules.data_collector import KenyanMarketDataCollector
+        
+        logging.disable(logging.WARNING)  # the failures below are expected
+        now = [0.0]
+        collector = KenyanMarketDataCollector(failure_threshold=3, reset_timeout=30.0)
+        collector.breakers['treasury'] = CircuitBreaker('treasury', 3, 30.0, clock=lambda: now[0])
+        good = collector.fetch_treasury_data()
+        
+        calls = []
+        def failing():
+            calls.append(now[0])
+            raise ConnectionError("upstream down")
+        simulated, collector._simulated_treasury_data = collector._simulated_treasury_data, failing
+        
+        for _ in range(5):
+            if collector.fetch_treasury_data() != good:
+                print("✗ A failing source was not served from its last good data")
+                return False
+        error = collector.get_all_market_data()['errors'][0]
+        if len(calls) != 3 or collector.breakers['treasury'].state != 'open' or not error['served_stale']:
+            print(f"✗ Expected 3 attempts then an open circuit, got {len(calls)} attempts, "
+                  f"{collector.breakers['treasury'].state} circuit")
+            return False
+        print("✓ Failures are served stale data, and the circuit opens after 3 of them")
+        
+        now[0] = 31.0
+        collector._simulated_treasury_data = simulated
+        collector.fetch_treasury_data()
+        if collector.breakers['treasury'].state != 'closed' or collector.get_all_market_data()['errors']:
+            print("✗ A successful probe after the reset timeout did not close the circuit")
+            return False
+        print("✓ A successful probe after the reset timeout closes the circuit")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in circuit breakers: {e}")
+        return False
+    
+    finally:
+        logging.disable(logging.NOTSET)
+
+def test_lazy_imports():
+    """Test that the package imports nothing heavy up front and resolves every public name"""
+    print("\n" + "=" * 70)
+    print("TEST 19: VALIDATING LAZY PACKAGE IMPORTS")
+    print("=" * 70)
+    
+    try:
+        import subprocess
+        import src.modules as modules
+        
+        code = "import sys, src.modules; print(' '.join(m for m in ('numpy', 'requests') if m in sys.modules))"
+        loaded = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.split()
+        if loaded:
+            print(f"✗ Importing the package loaded {', '.join(loaded)}")
+            return False
+        print("✓ Importing the package loads neither numpy nor requests")
+        
+        missing = [name for name in modules.__all__ if not hasattr(modules, name)]
+        if missing:
+            print(f"✗ Public names that do not resolve: {missing}")
+            return False
+        print(f"✓ All {len(modules.__all__)} public names resolve on first access")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in lazy imports: {e}")
+        return False
+
+def test_yield_curve():
+    """Test that the fitted curve honours its quotes, shape and reported support"""
+    print("\n" + "=" * 70)
+    print("TEST 20: VALIDATING YIELD CURVE")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.yield_curve import YieldCurve
+        
+        treasury = KenyanMarketDataCollector().get_all_market_data()['treasury']
+        curve = YieldCurve.from_treasury_data(treasury)
+        
+        if not np.allclose(curve.yield_at_years(curve.tenors), curve.yields):
+            print("✗ The curve does not pass through its quoted yields")
+            return False
+        months = np.arange(1, 361)
+        vector = curve.yield_at_months(months)
+        scalar = np.array([curve.yield_at_months(int(m)) for m in months])
+        if not np.allclose(vector, scalar):
+            print("✗ Scalar and vectorized yields differ")
+            return False
+        years = months / 12
+        i = np.clip(np.searchsorted(curve.tenors, years) - 1, 0, len(curve.tenors) - 2)
+        low = np.minimum(curve.yields[i], curve.yields[i + 1])
+        high = np.maximum(curve.yields[i], curve.yields[i + 1])
+        inside = (years >= curve.tenors[0]) & (years <= curve.tenors[-1])
+        if np.any(inside & ((vector < low - 1e-9) | (vector > high + 1e-9))):
+            print("✗ The curve overshoots between quoted tenors")
+            return False
+        print("✓ Passes through every quote, never overshoots, scalar and vector paths agree")
+        
+        for m in (18, 30, 84, 200):
+            support = set(curve.support(m / 12))
+            for key in treasury:
+                if key in support or 'yield' not in treasury[key]:
+                    continue
+                bumped = {**treasury, key: {**treasury[key], 'yield': treasury[key]['yield'] + 1}}
+                if YieldCurve.from_treasury_data(bumped).yield_at_months(m) != curve.yield_at_months(m):
+                    print(f"✗ {key} moves the {m}m yield but is not in its support {sorted(support)}")
+                    return False
+        print("✓ Yields depend only on the tenors support() reports")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in yield curve: {e}")
+        return False
+
+def test_fd_allocator():
+    """Test that deposits split within DCDC cover and blend as the scalar split does"""
+    print("\n" + "=" * 70)
+    print("TEST 21: VALIDATING FIXED DEPOSIT ALLOCATOR")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.fd_allocator import FixedDepositAllocator
+        
+        deposits = KenyanMarketDataCollector().get_all_market_data()['fixed_deposits']
+        allocator = FixedDepositAllocator(deposits)
+        cover = allocator.coverage
+        amounts = np.concatenate([
+            np.linspace(allocator.min_deposit, cover * (len(deposits) + 2), 400),
+            cover * np.arange(1, len(deposits) + 1) + allocator.min_deposit / 2,
+        ])
+        
+        for term in ('6m', '12m'):
+            blended = allocator.blended_rates(amounts, term)
+            for amount, rate in zip(amounts, blended):
+                plan = allocator.allocate(float(amount), term)
+                if abs(sum(a.amount for a in plan.allocations) - amount) > 1e-6:
+                    print(f"✗ {term} split of {amount:,.0f} does not add up")
+                    return False
+                if abs(plan.blended_rate - rate) > 1e-9:
+                    print(f"✗ {term} blended rate for {amount:,.0f}: {plan.blended_rate} vs {rate}")
+                    return False
+                if amount <= cover * len(deposits) and plan.uninsured_amount > 1e-6:
+                    print(f"✗ {amount:,.0f} leaves {plan.uninsured_amount:,.0f} uninsured within total cover")
+                    return False
+                if any(0 < a.amount < min(allocator.min_deposit, cover) for a in plan.allocations):
+                    print(f"✗ {amount:,.0f} opens a deposit below the minimum")
+                    return False
+        print(f"✓ {len(amounts)} amounts per term split within cover, above the minimum")
+        print("✓ Vectorized blended rates match the per-bank split")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in fixed deposit allocator: {e}")
+        return False
+
+def test_mmf_ranker():
+    """Test that fund rankings match a brute-force ranking of the eligible funds"""
+    print("\n" + "=" * 70)
+    print("TEST 22: VALIDATING MONEY MARKET RANKER")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.mmf_ranker import MoneyMarketRanker
+        
+        funds = KenyanMarketDataCollector().get_all_market_data()['money_market']
+        ranker = MoneyMarketRanker(funds)
+        minimums = sorted({fund['min_investment'] for fund in funds.values()})
+        amounts = sorted({0, *minimums, *(m - 1 for m in minimums), *(m + 1 for m in minimums), 1_000_000})
+        
+        best = ranker.best_net_yields(np.array(amounts, dtype=float))
+        for amount, vectorized in zip(amounts, best):
+            open_funds = sorted(
+                ((round(fund['yield'] - fund.get('management_fee', 0.0), 4), name)
+                 for name, fund in funds.items() if fund['min_investment'] <= amount), reverse=True)
+            if ranker.eligible_count(amount) != len(open_funds):
+                print(f"✗ {ranker.eligible_count(amount)} funds open to {amount:,} instead of {len(open_funds)}")
+                return False
+            top = ranker.top_funds(amount, 12, k=len(funds))
+            if [(q.net_yield, q.fund) for q in top] != open_funds:
+                print(f"✗ Ranking for {amount:,} differs from a brute-force ranking")
+                return False
+            expected = open_funds[0][0] if open_funds else np.nan
+            if not np.isclose(vectorized, expected, equal_nan=True):
+                print(f"✗ Best net yield for {amount:,}: {vectorized} vs {expected}")
+                return False
+        print(f"✓ Rankings and best net yields match brute force at {len(amounts)} amounts around each minimum")
+        
+        quote = ranker.top_funds(100_000, 24, k=1)[0]
+        if not np.isclose(quote.projected_value, 100_000 * (1 + quote.net_yield / 100) ** 2):
+            print("✗ Projected value is not compounded at the net yield")
+            return False
+        print(f"✓ Best fund for KES 100,000: {quote.display_name} at {quote.net_yield:.2f}% net")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in money market ranker: {e}")
+        return False
+
+def test_equity_basket():
+    """Test that baskets buy whole lots within the amount and price as build() does"""
+    print("\n" + "=" * 70)
+    print("TEST 23: VALIDATING EQUITY BASKETS")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.equity_basket import EquityBasketBuilder
+        
+        nse = KenyanMarketDataCollector().get_all_market_data()['nse']
+        builder = EquityBasketBuilder(nse)
+        amounts = np.concatenate([builder.lot_costs - 1, builder.lot_costs, np.geomspace(1_000, 10_000_000, 200)])
+        
+        vectorized = builder.expected_returns_for(amounts)
+        for amount, expected in zip(amounts, vectorized):
+            basket = builder.build(float(amount))
+            if not basket.holdings:
+                if not np.isnan(expected):
+                    print(f"✗ KES {amount:,.0f} buys no lot but has a return of {expected}")
+                    return False
+                continue
+            lots = [h.shares / builder.lot_sizes[builder.tickers.index(h.ticker)] for h in basket.holdings]
+            if any(n != int(n) or n < 1 for n in lots):
+                print(f"✗ KES {amount:,.0f} buys part of a board lot")
+                return False
+            if basket.cash < -1e-6 or abs(basket.invested - sum(h.value for h in basket.holdings)) > 1e-6:
+                print(f"✗ KES {amount:,.0f} spends {basket.invested:,.2f} it does not have")
+                return False
+            if not np.isclose(basket.expected_return, expected):
+                print(f"✗ KES {amount:,.0f}: build() returns {basket.expected_return}, "
+                      f"expected_returns_for {expected}")
+                return False
+        print(f"✓ {len(amounts)} baskets hold whole lots within their amount")
+        print("✓ expected_returns_for matches build() at every amount, including lot-cost boundaries")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in equity baskets: {e}")
+        return False
+
+def test_reits():
+    """Test that the REIT option picks the best open REIT and is never offered to low risk"""
+    print("\n" + "=" * 70)
+    print("TEST 24: VALIDATING REIT OPTIONS")
+    print("=" * 70)
+    
+    try:
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.recommendation_engine import RecommendationEngine
+        
+        market_data = KenyanMarketDataCollector().get_all_market_data()
+        reits = market_data['reits']
+        engine = RecommendationEngine(market_data, {})
+        minimums = sorted({reit.get('min_investment', 0) for reit in reits.values()})
+        amounts = sorted({*(m - 1 for m in minimums if m > 0), *minimums, 10_000_000})
+        
+        for amount in amounts:
+            user_input = {'amount': amount, 'duration_months': 36, 'risk_appetite': 'Medium'}
+            total = {key: reit['dividend_yield'] + ((1 + reit.get('change_6m', 0.0) / 100) ** 2 - 1) * 100
+                     for key, reit in reits.items() if reit.get('min_investment', 0) <= amount}
+            option = engine.generate_reit_option(user_input)
+            if not total:
+                if option is not None:
+                    print(f"✗ KES {amount:,} is offered a REIT it cannot buy")
+                    return False
+                continue
+            best = max(total, key=total.get)
+            if option is None or option.name != f"REIT: {reits[best]['name']}":
+                print(f"✗ KES {amount:,}: expected {reits[best]['name']}, got {option and option.name}")
+                return False
+            if abs(option.expected_return_percent - round(total[best], 2)) > 1e-9:
+                print(f"✗ KES {amount:,}: return {option.expected_return_percent} vs {total[best]:.2f}")
+                return False
+        print(f"✓ Best open REIT and its return match at {len(amounts)} amounts around each minimum")
+        
+        for risk in ('Low', 'Medium', 'High'):
+            rec = engine.generate_recommendation({'amount': 10_000_000, 'duration_months': 36, 'risk_appetite': risk})
+            offered = [rec['primary_recommendation']] + rec['alternatives']
+            has_reit = any(option['category'] == "Real Estate Investment Trusts" for option in offered)
+            if has_reit == (risk == 'Low'):
+                print(f"✗ {risk} risk {'is' if has_reit else 'is not'} offered a REIT")
+                return False
+        print("✓ REITs offered to medium and high risk only")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in REIT options: {e}")
+        return False
+
+def test_stress_testing():
+    """Test that stress sweeps leave the baseline unchanged and do not depend on chunking"""
+    print("\n" + "=" * 70)
+    print("TEST 25: VALIDATING STRESS TESTING")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.stress_testing import INSTRUMENTS, PASS_THROUGH, StressTester, UserBook
+        from src.modules.suitability import recommended_instruments
+        
+        data = KenyanMarketDataCollector().get_all_market_data()
+        book = UserBook.synthetic(2000, seed=7)
+        tester = StressTester(data)
+        report = tester.run(book)
+        
+        baseline = report.book[0]
+        if abs(baseline['change_pct']) > 1e-9 or baseline['downgraded_users']:
+            print(f"✗ Baseline moves the book by {baseline['change_pct']:.4f}% "
+                  f"and downgrades {baseline['downgraded_users']} users")
+            return False
+        print(f"✓ Baseline leaves the book at KES {baseline['book_value']:,.0f} with no downgrades")
+        
+        chunked = StressTester(data, chunk_size=333).run(book)
+        for whole, part in zip(report.book + report.instruments, chunked.book + chunked.instruments):
+            for key, value in whole.items():
+                if isinstance(value, float) and not np.isclose(value, part[key]):
+                    print(f"✗ {whole['scenario']} {key} changes with the chunk size")
+                    return False
+        print("✓ Chunked and single-pass sweeps agree")
+        
+        held = recommended_instruments(tester, book.amounts, book.months, book.risk)
+        rows = np.flatnonzero(held >= 0)
+        base = tester.base_returns(book.amounts, book.months)[rows, held[rows]]
+        for s, scenario in enumerate(tester.scenarios):
+            shocked = base + (PASS_THROUGH @ scenario.factors(data['macro']))[held[rows]]
+            expected = (book.amounts[rows] * (1 + shocked / 100) ** (book.months[rows] / 12)).sum()
+            if not np.isclose(report.book[s]['book_value'], expected):
+                print(f"✗ {scenario.name}: book value {report.book[s]['book_value']:,.0f} vs {expected:,.0f}")
+                return False
+        print(f"✓ Book values match a per-user repricing in all {len(tester.scenarios)} scenarios "
+              f"across {len(INSTRUMENTS)} instruments")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in stress testing: {e}")
+        return False
+
+def test_incremental():
+    """Test that re-scoring only the affected users matches re-scoring the whole book"""
+    print("\n" + "=" * 70)
+    print("TEST 26: VALIDATING INCREMENTAL RE-SCORING")
+    print("=" * 70)
+    
+    try:
+        import copy
+        import numpy as np
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.incremental import IncrementalScorer
+        from src.modules.recommendation_engine import NoEligibleInstrumentError, RecommendationEngine
+        from src.modules.stress_testing import UserBook
+        
+        market_data = KenyanMarketDataCollector().get_all_market_data()
+        book = UserBook.synthetic(300, seed=3)
+        # Profiles eligible for no instrument, each leading its (risk, duration) group
+        book = UserBook(np.concatenate([[50, 500], book.amounts]), np.concatenate([[12, 24], book.months]),
+                        np.concatenate([[1, 2], book.risk]).astype(np.int8))
+        scorer = IncrementalScorer(market_data, book)
+        scorer.score()
+        if scorer.recommendations[0] is not None or scorer.recommendations[1] is not None:
+            print("✗ Profiles eligible for no instrument were given a recommendation")
+            return False
+        print("✓ A book with profiles eligible for no instrument is indexed, and they score None")
+        
+        updates = [
+            ('the 364-day yield', lambda data: data['treasury']['364_day_tb'].__setitem__('yield', 16.5)),
+            ('a fund fee', lambda data: data['money_market']['absa_mmf'].__setitem__('management_fee', 0.5)),
+            ('a bank rate', lambda data: data['fixed_deposits']['co_op_bank'].__setitem__('12m', 17.5)),
+            ('a REIT price change', lambda data: data['reits']['acorn_ireit'].__setitem__('change_6m', 9.0)),
+            ('inflation', lambda data: data['macro'].__setitem__('inflation_rate', 9.5)),
+        ]
+        for label, update in updates:
+            updated = copy.deepcopy(scorer.market_data)
+            update(updated)
+            rescored = scorer.apply(updated)
+            engine = RecommendationEngine(updated, {})
+            for user in range(len(book)):
+                try:
+                    expected = engine.generate_recommendation(scorer.user_input(user))
+                except NoEligibleInstrumentError:
+                    expected = None
+                if scorer.recommendations[user] != expected:
+                    print(f"✗ After changing {label}, user {user} differs from a full re-score")
+                    return False
+            print(f"✓ {label}: re-scored {len(rescored)} of {len(book)} users, matching a full re-score")
+        
+        if len(scorer.apply(copy.deepcopy(scorer.market_data), set())):
+            print("✗ An empty change set re-scores users")
+            return False
+        print("✓ An empty change set re-scores no one")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in incremental re-scoring: {e}")
+        return False
+
+def test_settings():
+    """Test that config.ini parses and that edits are picked up, and bad edits ignored"""
+    print("\n" + "=" * 70)
+    print("TEST 27: VALIDATING SETTINGS")
+    print("=" * 70)
+    
+    try:
+        import logging
+        import tempfile
+        from src.modules.settings import CONFIG_PATH, Settings, SettingsStore
+        
+        if not os.path.exists(CONFIG_PATH):
+            print(f"✗ {CONFIG_PATH} not found")
+            return False
+        settings = Settings.from_file(CONFIG_PATH)
+        print(f"✓ config.ini parsed: FD minimum KES {settings.min_investment_fd:,}, "
+              f"DCDC cover KES {settings.dcdc_max_coverage_per_bank:,} per bank")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.ini')
+            with open(path, 'w') as f:
+                f.write("MIN_INVESTMENT_FD=10000\nFD_INTEREST_TAX_RATE=0.30\n")
+            store = SettingsStore(path, check_interval=0)
+            seen = []
+            store.on_change(seen.append, fields=['min_investment_fd'])
+            
+            with open(path, 'w') as f:
+                f.write("MIN_INVESTMENT_FD=20000\nFD_INTEREST_TAX_RATE=0.30\n")
+            os.utime(path, ns=(0, 1))  # a new mtime even within the clock's resolution
+            if store.current.min_investment_fd != 20000 or seen != [{'min_investment_fd'}]:
+                print(f"✗ Edit not picked up: FD minimum {store.current.min_investment_fd}, listeners saw {seen}")
+                return False
+            print("✓ Edits are reloaded and reported to listeners")
+            
+            with open(path, 'w') as f:
+                f.write("MIN_INVESTMENT_FD=lots\n")
+            os.utime(path, ns=(0, 2))
+            logging.disable(logging.ERROR)  # the parse error below is expected
+            if store.current.min_investment_fd != 20000 or len(seen) != 1:
+                print("✗ A file that fails to parse replaced the settings in force")
+                return False
+            print("✓ A file that fails to parse leaves the previous settings in force")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in settings: {e}")
+        return False
+    
+    finally:
+        logging.disable(logging.NOTSET)
+
+def test_bond_pricing():
+    """Test par pricing, yield round trips and duration against full repricing"""
+    print("\n" + "=" * 70)
+    print("TEST 28: VALIDATING BOND PRICING")
+    print("=" * 70)
+    
+    try:
+        import numpy as np
+        from src.modules.bond_pricing import BondSet
+        from src.modules.data_collector import KenyanMarketDataCollector
+        
+        coupons = np.array([10.0, 12.5, 14.0, 15.75, 17.0, 18.5])
+        years = np.array([0.4, 2.0, 2.3, 5.75, 10.0, 24.9])
+        bonds = BondSet(coupons, years)
+        
+        # On a coupon date exactly par; between them, compounding the dirty
+        # price against linear accrual leaves the clean price just under par
+        on_coupon_date = years * bonds.frequency % 1 == 0
+        clean = bonds.clean_prices(coupons)
+        if not np.allclose(clean[on_coupon_date], 100) or np.any(np.abs(clean - 100) > 0.1):
+            print(f"✗ Clean prices at the coupon yield: {clean}")
+            return False
+        print("✓ A bond yielding its coupon is priced at par on coupon dates, within 0.1 between them")
+        
+        yields = np.array([[9.0, 13.0, 15.0, 14.0, 18.5, 16.0], [20.0, 11.0, 12.0, 17.5, 15.0, 19.0]])
+        if not np.allclose(bonds.dirty_prices(yields), bonds.risk(yields).dirty_price):
+            print("✗ Closed-form prices differ from discounting the cash-flow grid")
+            return False
+        if not np.allclose(bonds.yields(bonds.clean_prices(yields)), yields, atol=1e-8):
+            print("✗ Yield to maturity does not recover the yields prices were computed at")
+            return False
+        print("✓ Closed-form and grid prices agree, and yields round-trip through prices")
+        
+        risk = bonds.risk(coupons)
+        for shift_bp in (-50, 50):
+            actual = (bonds.dirty_prices(coupons + shift_bp / 100) / risk.dirty_price - 1) * 100
+            approximate = risk.price_change(shift_bp / 100)
+            if not np.allclose(actual, approximate, atol=0.05):
+                print(f"✗ Duration and convexity miss a {shift_bp:+d}bp repricing: {approximate} vs {actual}")
+                return False
+        print("✓ Duration and convexity track a full repricing of the cash price within 0.05 for ±50bp")
+        
+        treasury = KenyanMarketDataCollector().get_all_market_data()['treasury']
+        listed = BondSet.from_treasury_data(treasury)
+        quoted = np.array([treasury[name]['yield'] for name in listed.names])
+        if not np.allclose(listed.yields(np.full(len(listed), 100.0)), quoted):
+            print("✗ Snapshot bonds without a coupon do not yield their quote at par")
+            return False
+        print(f"✓ {len(listed)} snapshot bonds yield their quoted yield at par")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in bond pricing: {e}")
+        return False
+
+def test_snapshot_distribution():
+    """Test that deltas rebuild the leader's snapshot and that a lost delta is repaired"""
+    print("\n" + "=" * 70)
+    print("TEST 29: VALIDATING SNAPSHOT DISTRIBUTION")
+    print("=" * 70)
+    
+    try:
+        import copy
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.snapshot_distribution import (SnapshotFollower, SnapshotLeader, apply_delta,
+                                                       decode_message, encode_message, snapshot_delta)
+        
+        old = KenyanMarketDataCollector().get_all_market_data()
+        new = copy.deepcopy(old)
+        new['treasury']['364_day_tb']['yield'] += 0.25
+        new['reits'].pop('acorn_ireit')
+        new['macro']['cbr'] = new['macro'].get('cbr', 0) + 0.5
+        
+        delta = decode_message(encode_message(snapshot_delta(old, new)))
+        rebuilt = apply_delta(old, delta)
+        if encode_message(rebuilt) != encode_message(new):
+            print("✗ Applying the delta does not rebuild the new snapshot")
+            return False
+        if rebuilt['money_market'] is not old['money_market'] or rebuilt['treasury'] is old['treasury']:
+            print("✗ apply_delta copies unchanged sections or shares changed ones")
+            return False
+        print(f"✓ A {len(delta['set'])}-set, {len(delta['delete'])}-delete delta rebuilds the snapshot "
+              f"and shares unchanged sections")
+        
+        class Loopback:
+            """
+            Leader and follower channels in one process: messages go through the
+            wire encoding and queue until pump() delivers them, as a socket would
+            """
+            drop_next_delta = False
+            
+            def __init__(self):
+                self.to_follower, self.to_leader = [], []
+            
+            def start(self, on_request):
+                self.on_request = on_request
+            
+            def broadcast(self, message):
+                if message['type'] == 'delta' and self.drop_next_delta:
+                    self.drop_next_delta = False
+                    return
+                self.to_follower.append(encode_message(message))
+            
+            def send(self, message):
+                self.to_leader.append(encode_message(message))
+            
+            def pump(self, follower):
+                while self.to_follower or self.to_leader:
+                    if self.to_leader:
+                        self.on_request(decode_message(self.to_leader.pop(0)), self.broadcast)
+                    else:
+                        follower.handle(decode_message(self.to_follower.pop(0)))
+            
+            def close(self):
+                pass
+        
+        channel = Loopback()
+        leader = SnapshotLeader(channel, fetch=lambda: old)
+        follower = SnapshotFollower(channel, heartbeat=0.0)
+        leader.publish(old)
+        follower.handle({'type': 'connected'})
+        channel.pump(follower)
+        channel.drop_next_delta = True
+        leader.publish(new)
+        channel.pump(follower)
+        if follower.version == leader.version:
+            print("✗ The follower caught up without the dropped delta")
+            return False
+        leader.send_heartbeat()
+        channel.pump(follower)
+        if follower.version != leader.version or encode_message(follower.market_data) != encode_message(new):
+            print(f"✗ Follower at version {follower.version} after a heartbeat, leader at {leader.version}")
+            return False
+        print(f"✓ A dropped delta is repaired on the next heartbeat ({follower.resyncs} resyncs)")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in snapshot distribution: {e}")
+        return False
+
+def test_prefetch():
+    """Test that the CLI fetches market data in the background and surfaces its errors"""
+    print("\n" + "=" * 70)
+    print("TEST 30: VALIDATING MARKET DATA PREFETCH")
+    print("=" * 70)
+    
+    try:
+        import contextlib
+        import io
+        import time
+        from app import FinAppCLI
+        
+        cli = FinAppCLI()
+        fetch = cli.data_collector.get_all_market_data
+        
+        def slow_fetch():
+            time.sleep(0.3)
+            return fetch()
+        
+        cli.data_collector.get_all_market_data = slow_fetch
+        started = time.perf_counter()
+        cli.start_prefetch()
+        if time.perf_counter() - started > 0.1:
+            print("✗ start_prefetch blocks on the fetch")
+            return False
+        time.sleep(0.5)  # the user answering the prompts
+        waiting_since = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            market_data = cli._join_prefetch()
+        if time.perf_counter() - waiting_since > 0.1 or 'treasury' not in market_data:
+            print("✗ The prefetched snapshot was not ready after the prompts")
+            return False
+        print("✓ The snapshot is fetched while the prompts run and ready when needed")
+        
+        def failing_fetch():
+            raise ConnectionError("upstream down")
+        
+        cli.data_collector.get_all_market_data = failing_fetch
+        cli.start_prefetch()
+        try:
+            cli._join_prefetch()
+        except ConnectionError:
+            print("✓ A failed prefetch raises when the snapshot is needed")
+        else:
+            print("✗ A failed prefetch was swallowed")
+            return False
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in market data prefetch: {e}")
+        return False
+
+def test_benchmarks():
+    """Test that every benchmark runs, has a committed baseline, and that the gate catches regressions"""
+    print("\n" + "=" * 70)
+    print("TEST 31: VALIDATING BENCHMARK SUITE")
+    print("=" * 70)
+    
+    ctx = {}
+    try:
+        import json
+        sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+        import run_benchmarks
+        from src.modules.data_collector import KenyanMarketDataCollector
+        from src.modules.recommendation_engine import RecommendationEngine
+        from src.modules.risk_analyzer import RiskAnalyzer
+        
+        with open(run_benchmarks.BASELINE_PATH) as f:
+            baseline = json.load(f)['results']
+        missing = sorted(set(run_benchmarks.BENCHMARKS) - set(baseline))
+        stale = sorted(set(baseline) - set(run_benchmarks.BENCHMARKS))
+        if missing or stale:
+            print(f"✗ Benchmarks without a baseline: {missing}; baselines without a benchmark: {stale}")
+            return False
+        print(f"✓ All {len(baseline)} benchmarks have a committed baseline")
+        
+        market_data = KenyanMarketDataCollector().get_all_market_data()
+        ctx.update(market_data=market_data, engine=RecommendationEngine(market_data, {}),
+                   analyzer=RiskAnalyzer(market_data))
+        for name, (factory, _, _) in run_benchmarks.BENCHMARKS.items():
+            factory(ctx)()
+        print("✓ Every benchmark builds and runs once")
+        
+        isolated = run_benchmarks.measure_isolated('calculate_final_value', repeats=10)
+        if set(isolated) != set(baseline['calculate_final_value']):
+            print(f"✗ A benchmark measured in a fresh process reports {sorted(isolated)}")
+            return False
+        print("✓ Benchmarks are measured in a fresh process")
+        
+        # Beyond every per-benchmark allowance, the noisiest being 2x
+        slower = {name: {**result, 'throughput_per_s': result['throughput_per_s'] / 3}
+                  for name, result in baseline.items()}
+        if run_benchmarks.compare(baseline, baseline, 0.25):
+            print("✗ The baseline regresses against itself")
+            return False
+        if len(run_benchmarks.compare(slower, baseline, 0.25)) != len(baseline):
+            print("✗ A 3x slowdown is not flagged for every benchmark")
+            return False
+        print("✓ The gate passes the baseline and flags a 3x slowdown in every benchmark")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Error in benchmark suite: {e}")
+        return False
+    
+    finally:
+        for cleanup in ctx.get('cleanup', []):
+            cleanup()
+
 def main():
     """Run all tests"""
     print("\n")
@@ -263,6 +1532,31 @@ def main():
         ("Risk Analysis", test_risk_analysis),
         ("Recommendations", test_recommendations),
         ("Calculations", test_calculations),
+        ("Batch Returns", test_batch_returns),
+        ("Suitability", test_suitability),
+        ("Goal Solver", test_goal_solver),
+        ("Savings Plans", test_contributions),
+        ("Cost Projections", test_costs),
+        ("Sensitivities", test_sensitivities),
+        ("Shared Snapshots", test_shared_snapshot),
+        ("Columnar Export", test_columnar_export),
+        ("Market Calendar", test_market_calendar),
+        ("Ladder Simulator", test_ladder_simulator),
+        ("Instrumentation", test_instrumentation),
+        ("Circuit Breakers", test_circuit_breakers),
+        ("Lazy Imports", test_lazy_imports),
+        ("Yield Curve", test_yield_curve),
+        ("FD Allocator", test_fd_allocator),
+        ("MMF Ranker", test_mmf_ranker),
+        ("Equity Baskets", test_equity_basket),
+        ("REITs", test_reits),
+        ("Stress Testing", test_stress_testing),
+        ("Incremental Re-scoring", test_incremental),
+        ("Settings", test_settings),
+        ("Bond Pricing", test_bond_pricing),
+        ("Snapshot Distribution", test_snapshot_distribution),
+        ("Prefetch", test_prefetch),
+        ("Benchmarks", test_benchmarks),
     ]
     
     results = []